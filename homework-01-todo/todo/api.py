@@ -0,0 +1,210 @@
+"""JSON API over ``Todo`` for sync jobs and other services.
+
+- ``GET /api/todos/`` streams todos as NDJSON, one object per line, in id
+  order. ``?status=`` and ``?updated_since=<ISO timestamp>`` narrow the list.
+  Rows are read ``TODO_STREAM_CHUNK_SIZE`` at a time with ``iterator()``, or
+  ``aiterator()`` under ASGI, so memory stays flat however long the list is.
+- The list carries an ETag over ``MAX(updated_at)``, read from the end of
+  ``todo_updated_at_idx``, and the list version from ``caching``. A delete
+  leaves ``MAX(updated_at)`` alone but still changes the version. A poll with
+  ``If-None-Match`` and no changes is therefore one indexed query and a 304.
+  The ETag covers the whole table, so any write changes it for every filter.
+- ``POST /api/todos/`` creates a todo. ``GET``/``PUT``/``PATCH``/``DELETE``
+  ``/api/todos/<id>/`` reads, replaces, updates or deletes one. Both validate
+  with ``TodoForm``.
+- ``POST /api/todos/bulk/<action>/`` runs a bulk action. It takes the same
+  fields as the HTML form.
+
+Writes must be sent as ``application/json``. A cross-site form cannot send
+that, so the API is exempt from CSRF checks.
+"""
+import hashlib
+import json
+from datetime import date, datetime, timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max
+from django.forms.models import model_to_dict
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+
+from . import bulk
+from .caching import list_version
+from .decorators import condition, csrf_exempt, require_http_methods, require_POST
+from .forms import BulkActionForm, TodoForm
+from .models import STATUSES, Todo
+
+
+
+
+STREAM_CHUNK_SIZE = getattr(settings, 'TODO_STREAM_CHUNK_SIZE', 2000)
+FIELDS = ('id', 'title', 'description', 'due_date', 'resolved', 'created_at', 'updated_at')
+LINES_PER_CHUNK = 200
+NDJSON = 'application/x-ndjson'
+
+
+
+
+class TodoEncoder(json.JSONEncoder):
+    """Dates and full-precision timestamps as ISO 8601, so ``updated_since`` can round-trip them"""
+
+    def default(self, o):
+        if isinstance(o, (date, datetime)):
+            return o.isoformat()
+        return super().default(o)
+
+
+
+
+def _error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+def _json_body(request):
+    """``(object, None)`` from a JSON request body, or ``(None, error response)``"""
+    if request.content_type != 'application/json':
+        return None, _error('Send a JSON body with Content-Type: application/json.', status=415)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None, _error('Malformed JSON.')
+    if not isinstance(data, dict):
+        return None, _error('Expected a JSON object.')
+    return data, None
+
+
+def _todo_json(todo, status=200):
+    return JsonResponse({field: getattr(todo, field) for field in FIELDS}, encoder=TodoEncoder, status=status)
+
+
+def _invalid(form):
+    return _error('Invalid todo.', errors=form.errors.get_json_data())
+
+
+
+
+def _list_etag(request):
+    latest = Todo.objects.aggregate(latest=Max('updated_at'))['latest']
+    raw = f'{latest}|{list_version()}|{request.get_full_path()}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _list_queryset(request):
+    """``(rows, None)`` for the list's filters, or ``(None, error response)``"""
+    status = request.GET.get('status', 'all')
+    if status not in STATUSES:
+        return None, _error(f'status must be one of {", ".join(STATUSES)}.')
+    todos = Todo.objects.with_status(status)
+    if 'updated_since' in request.GET:
+        try:
+            since = parse_datetime(request.GET['updated_since'])
+        except ValueError:
+            since = None
+        if since is None:
+            return None, _error('updated_since must be an ISO 8601 timestamp.')
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        todos = todos.filter(updated_at__gt=since)
+    return todos.order_by('id').values(*FIELDS), None
+
+
+_encode = TodoEncoder().encode
+
+
+def _lines(rows):
+    """NDJSON in blocks of ``LINES_PER_CHUNK`` lines, not one write per row"""
+    block = []
+    for row in rows:
+        block.append(_encode(row))
+        if len(block) == LINES_PER_CHUNK:
+            yield '\n'.join(block) + '\n'
+            block = []
+    if block:
+        yield '\n'.join(block) + '\n'
+
+
+async def _alines(rows):
+    block = []
+    async for row in rows:
+        block.append(_encode(row))
+        if len(block) == LINES_PER_CHUNK:
+            yield '\n'.join(block) + '\n'
+            block = []
+    if block:
+        yield '\n'.join(block) + '\n'
+
+
+@condition(etag_func=_list_etag)
+async def _stream(request):
+    rows, error = _list_queryset(request)
+    if error:
+        return error
+    if isinstance(request, ASGIRequest):
+        # Under ASGI, Django reads a sync iterator into memory before sending it
+        lines = _alines(rows.aiterator(chunk_size=STREAM_CHUNK_SIZE))
+    else:
+        lines = _lines(rows.iterator(chunk_size=STREAM_CHUNK_SIZE))
+    return StreamingHttpResponse(lines, content_type=NDJSON)
+
+
+async def _create(request):
+    data, error = _json_body(request)
+    if error:
+        return error
+    form = TodoForm(data)
+    if not form.is_valid():
+        return _invalid(form)
+    todo = form.save(commit=False)
+    await todo.asave()
+    return _todo_json(todo, status=201)
+
+
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+async def todo_list(request):
+    if request.method == 'POST':
+        return await _create(request)
+    return await _stream(request)
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'PUT', 'PATCH', 'DELETE'])
+async def todo_detail(request, pk):
+    try:
+        todo = await Todo.objects.aget(pk=pk)
+    except Todo.DoesNotExist:
+        return _error('No Todo matches the given query.', status=404)
+    if request.method == 'DELETE':
+        await todo.adelete()
+        return HttpResponse(status=204)
+    if request.method in ('PUT', 'PATCH'):
+        data, error = _json_body(request)
+        if error:
+            return error
+        if request.method == 'PATCH':
+            data = {**model_to_dict(todo, fields=TodoForm.Meta.fields), **data}
+        form = TodoForm(data, instance=todo)
+        if not form.is_valid():
+            return _invalid(form)
+        todo = form.save(commit=False)
+        await todo.asave()
+    return _todo_json(todo)
+
+
+@csrf_exempt
+@require_POST
+async def todo_bulk(request, action):
+    if action not in bulk.ACTIONS:
+        return _error('Unknown bulk action.', status=404)
+    data, error = _json_body(request)
+    if error:
+        return error
+    form = BulkActionForm(data, action=action)
+    if not form.is_valid():
+        return _error('Invalid bulk action.', errors=form.errors.get_json_data())
+    changed = await sync_to_async(bulk.apply)(action, **form.cleaned_data)
+    return JsonResponse({'action': action, 'changed': changed})
\ No newline at end of file
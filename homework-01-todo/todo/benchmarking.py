@@ -0,0 +1,100 @@
+"""Helpers for the ``bench_*`` management commands.
+
+Benchmarks run against a throwaway test database, created and migrated like
+``manage.py test`` does, so they never touch the real one.
+"""
+import io
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from .models import Todo
+
+
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    # DEBUG off as under "manage.py test", so queries are not logged in memory
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def create_todos(count, batch_size=5000):
+    """Insert ``count`` todos with spread-out timestamps, due dates and states"""
+    now = timezone.now()
+    today = now.date()
+    for start in range(0, count, batch_size):
+        Todo.objects.bulk_create(
+            Todo(
+                title=f'Task {i}',
+                description=f'Description for task {i} ' * 3,
+                due_date=today + timedelta(days=i % 60 - 30) if i % 3 else None,
+                resolved=i % 4 == 0,
+            )
+            for i in range(start, min(start + batch_size, count))
+        )
+    # auto_now_add gives every batch the same timestamp; spread them out
+    for start in range(0, count, batch_size):
+        ids = list(Todo.objects.order_by('id').values_list('id', flat=True)[start:start + batch_size])
+        Todo.objects.filter(id__in=ids).update(created_at=now - timedelta(seconds=start))
+
+
+def timed(fn, repeat):
+    """``(mean, p95)`` seconds of ``repeat`` calls"""
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    return statistics.mean(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def percentile(samples, q):
+    """The ``q`` quantile of sorted ``samples``"""
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def wsgi_request(application, path, method='GET', body=b'', content_type=''):
+    """Status code of one request sent straight into a WSGI application, as a WSGI server would"""
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver', 'REMOTE_ADDR': '127.0.0.1',
+        'CONTENT_TYPE': content_type, 'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = []
+    response = application(environ, lambda line, headers, exc_info=None: status.append(line))
+    try:
+        b''.join(response)
+    finally:
+        # Sends request_finished, which closes the connection unless CONN_MAX_AGE keeps it
+        response.close()
+    return int(status[0][:3])
+
+
+def peak_mb(fn):
+    """Peak traced allocation of one call, in MB"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""Caches for the todo pages, invalidated by changing a list version on every write.
+
+Every cached value built from the list has the current version in its key:
+counts, the rendered list fragment and the ETag of the list page.
+``bump_list_version`` is called in two places:
+
+- The ``post_save``/``post_delete`` signals (see ``todo/signals.py``).
+- Any code that writes with ``QuerySet.update``/``bulk_create``, since those
+  send no signals.
+
+Entries under the old version then age out of the cache.
+
+The version is a random token stored with the time of the write, not a
+counter. Two processes bumping at once through a file or database cache
+(where ``incr`` is a read and a write) therefore still leave a new value.
+"""
+from datetime import date, datetime, time as day_start, timezone
+import hashlib
+import time
+import uuid
+
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+
+from . import counters
+
+
+
+
+VERSION_KEY = 'todo:list-version'
+COUNTS_TIMEOUT = 300
+FRAGMENT_TIMEOUT = 600
+
+
+
+
+def _new_state():
+    return uuid.uuid4().hex, time.time()
+
+
+def _list_state():
+    state = cache.get(VERSION_KEY)
+    if state is None:
+        state = _new_state()
+        if not cache.add(VERSION_KEY, state, timeout=None):
+            state = cache.get(VERSION_KEY) or state
+    return state
+
+
+def list_version():
+    return _list_state()[0]
+
+
+def list_modified():
+    """Time of the last write, or midnight if that is later (the overdue filter changes then)"""
+    modified = datetime.fromtimestamp(_list_state()[1], tz=timezone.utc)
+    midnight = datetime.combine(date.today(), day_start.min, tzinfo=timezone.utc)
+    return max(modified, midnight).replace(microsecond=0)
+
+
+def bump_list_version():
+    cache.set(VERSION_KEY, _new_state(), timeout=None)
+
+
+def todo_counts():
+    """Totals for each list filter, summed from the bucket counters and cached"""
+    today = date.today()
+    key = f'todo:counts:{list_version()}:{today.isoformat()}'
+    totals = cache.get(key)
+    if totals is None:
+        totals = counters.counts(today)
+        cache.set(key, totals, COUNTS_TIMEOUT)
+    return totals
+
+
+def list_fragment_key(*parts):
+    raw = '|'.join(str(part) for part in parts)
+    return f'todo:list:{list_version()}:{date.today().isoformat()}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def page_etag(request, *parts):
+    """ETag for a page built from the list.
+
+    It covers the list version, today's date, the full URL and the CSRF
+    secret, because the page embeds a token derived from that secret.
+    ``get_token`` creates the secret for a first visit, so the ETag of that
+    first response already matches the cookie it sets.
+    """
+    get_token(request)
+    raw = '|'.join([
+        list_version(),
+        date.today().isoformat(),
+        request.get_full_path(),
+        request.META.get('CSRF_COOKIE', ''),
+        *(str(part) for part in parts),
+    ])
+    return hashlib.md5(raw.encode()).hexdigest()
\ No newline at end of file
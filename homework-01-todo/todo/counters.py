@@ -0,0 +1,110 @@
+"""Per-bucket todo counts kept current by the database.
+
+``TodoCounter`` has one row per ``(resolved, due_date)`` holding the number
+of todos in it. Triggers on ``todo_todo`` (migration 0005) keep it current.
+They add or subtract one on every insert, delete, and change of ``resolved``
+or ``due_date``, whatever made the write: a form, ``QuerySet.update``, a raw
+delete or the admin.
+
+Each header count is then a sum over one row per distinct due date, not a
+COUNT over ``todo_todo``. That covers all, open, resolved, overdue, due today
+and due this week. Because rows are per date, "overdue" and "today" roll over
+at midnight with no write needed. ``count_for`` does the same for any
+queryset that filters only on ``resolved`` and ``due_date``, such as the
+admin's filters.
+
+On SQLite, a migration that rebuilds ``todo_todo`` drops these triggers and
+must recreate them, as 0004 does for the search triggers. Other databases
+have no triggers, and the counts come from one aggregate over ``todo_todo``.
+"""
+from datetime import date
+
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.expressions import Col
+from django.db.models.lookups import Lookup
+from django.db.models.sql.where import AND, WhereNode
+
+from .models import STATUSES, Todo, TodoCounter, status_filter
+
+
+
+
+_triggers = {}
+
+
+def counters_available():
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    key = (connection.alias, str(connection.settings_dict['NAME']))
+    if not _triggers.get(key):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'todo_counter_insert'")
+            _triggers[key] = cursor.fetchone() is not None
+    return _triggers[key]
+
+
+def _totals(model, total, today):
+    # Suffixed aliases: an aggregate named like a field ("resolved") clashes with it
+    totals = model.objects.aggregate(**{
+        f'{status}_count': total(filter=status_filter(status, today) or None) for status in STATUSES
+    })
+    # SUM over no rows is NULL
+    return {status: int(totals[f'{status}_count'] or 0) for status in STATUSES}
+
+
+def count_rows(today=None):
+    """The same totals counted over ``todo_todo``, for databases without the triggers"""
+    return _totals(Todo, lambda **kwargs: Count('id', **kwargs), today or date.today())
+
+
+def counts(today=None):
+    """Number of todos under each of ``STATUSES``, in one query"""
+    if not counters_available():
+        return count_rows(today)
+    return _totals(TodoCounter, lambda **kwargs: Sum('count', **kwargs), today or date.today())
+
+
+def _bucket_lookups(where):
+    """``[(lookup, value)]`` equal to ``where`` if it only compares ``resolved``/``due_date`` to values; else None"""
+    if where.negated or (where.connector != AND and len(where.children) > 1):
+        return None
+    lookups = []
+    for child in where.children:
+        if isinstance(child, WhereNode):
+            inner = _bucket_lookups(child)
+            if inner is None:
+                return None
+            lookups += inner
+            continue
+        if not (isinstance(child, Lookup) and isinstance(child.lhs, Col)
+                and child.lhs.target.model is Todo and child.lhs.target.name in ('resolved', 'due_date')
+                and not hasattr(child.rhs, 'resolve_expression')):
+            return None
+        lookups.append((f'{child.lhs.target.name}__{child.lookup_name}', child.rhs))
+    return lookups
+
+
+def count_for(todos):
+    """``todos.count()`` summed from the counters, or None unless ``todos`` filters only on the bucket fields"""
+    query = todos.query
+    if query.is_sliced or query.distinct or query.combinator or query.extra or len(query.alias_map) > 1:
+        return None
+    lookups = _bucket_lookups(query.where)
+    if lookups is None or not counters_available():
+        return None
+    buckets = TodoCounter.objects.all()
+    for lookup, value in lookups:
+        buckets = buckets.filter(**{lookup: value})
+    return buckets.aggregate(total=Sum('count'))['total'] or 0
+
+
+def rebuild():
+    """Recount every bucket from ``todo_todo``; only needed if the triggers were missing for a while"""
+    TodoCounter.objects.all().delete()
+    TodoCounter.objects.bulk_create(
+        TodoCounter(resolved=row['resolved'], due_date=row['due_date'], count=row['count'])
+        for row in Todo.objects.order_by().values('resolved', 'due_date').annotate(count=Count('id'))
+    )
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""``condition``, ``require_http_methods`` and ``csrf_exempt`` for ``async def`` views.
+
+Django 4.2's versions call the view synchronously, so wrapping a coroutine
+function with them breaks it under ASGI. These behave the same and await
+the view.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.utils.log import log_response
+from django.views.decorators import http
+
+
+
+
+def condition(etag_func=None, last_modified_func=None):
+    """Answer 304/412 before the view runs, and add ``ETag``/``Last-Modified`` to its response.
+
+    The check is Django's own ``condition`` around an empty response. It runs
+    in a thread because the ETag and Last-Modified functions read the cache.
+    """
+    def decorator(view):
+        check = sync_to_async(http.condition(etag_func, last_modified_func)(
+            lambda request, *args, **kwargs: HttpResponse()
+        ))
+
+        @functools.wraps(view)
+        async def inner(request, *args, **kwargs):
+            precondition = await check(request, *args, **kwargs)
+            if precondition.status_code != 200:
+                return precondition
+            response = await view(request, *args, **kwargs)
+            for header in ('ETag', 'Last-Modified'):
+                if precondition.has_header(header):
+                    response.headers.setdefault(header, precondition[header])
+            return response
+        return inner
+    return decorator
+
+
+def require_http_methods(methods):
+    def decorator(view):
+        @functools.wraps(view)
+        async def inner(request, *args, **kwargs):
+            if request.method not in methods:
+                response = HttpResponseNotAllowed(methods)
+                log_response('Method Not Allowed (%s): %s', request.method, request.path,
+                             response=response, request=request)
+                return response
+            return await view(request, *args, **kwargs)
+        return inner
+    return decorator
+
+
+require_POST = require_http_methods(['POST'])
+
+
+def csrf_exempt(view):
+    # Django 4.2's csrf_exempt wraps the view in a sync function; the
+    # middleware only looks at this attribute
+    view.csrf_exempt = True
+    return view
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Todo
+from .models import STATUSES, Todo
 
 
 
@@ -10,4 +10,50 @@ class TodoForm(forms.ModelForm):
         fields = ['title', 'description', 'due_date', 'resolved']
         widgets = {
             'due_date': forms.DateInput(attrs={'type': 'date'}),
-        }
\ No newline at end of file
+        }
+
+
+
+
+class IdListField(forms.Field):
+    """Todo ids from repeated ``ids`` inputs or one comma-separated value"""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        if isinstance(value, (str, int)):
+            value = [value]
+        try:
+            return sorted({int(v) for item in value for v in str(item).split(',') if v.strip()})
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Enter a list of todo ids.', code='invalid')
+
+
+
+
+class BulkActionForm(forms.Form):
+    ids = IdListField(required=False)
+    status = forms.ChoiceField(choices=[(s, s) for s in STATUSES], required=False)
+    days = forms.IntegerField(required=False, min_value=-3650, max_value=3650)
+    due_date = forms.DateField(required=False)
+
+    def __init__(self, *args, action=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.action = action
+
+    def clean(self):
+        cleaned = super().clean()
+        if not cleaned.get('ids') and not cleaned.get('status'):
+            raise forms.ValidationError('Select some todos or a status.')
+        if self.action == 'reschedule' and cleaned.get('days') is None and not cleaned.get('due_date'):
+            raise forms.ValidationError('Give a number of days or a new due date.')
+        return cleaned
+
+
+
+
+class ImportForm(forms.Form):
+    file = forms.FileField()
+    # Blank: guessed from the file name
+    format = forms.ChoiceField(choices=[('', 'From file name'), ('csv', 'CSV'), ('json', 'JSON Lines')], required=False)
\ No newline at end of file
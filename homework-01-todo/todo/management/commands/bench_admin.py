@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from todo.benchmarking import benchmark_database, create_todos, timed
+from todo.models import Todo
+
+
+
+
+class Command(BaseCommand):
+    help = 'Time the admin todo changelist (filters, search, deep pages) and count its queries at a large todo count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, todos, repeat, **options):
+        with benchmark_database():
+            create_todos(todos)
+            client = Client()
+            client.force_login(User.objects.create_superuser('bench', 'bench@example.com', 'bench'))
+            url = reverse('admin:todo_todo_changelist')
+            today = date.today()
+
+            cases = {
+                'first page': {},
+                'page 50': {'p': 50},
+                'open': {'resolved__exact': 0},
+                'resolved': {'resolved__exact': 1},
+                'overdue': {'resolved__exact': 0, 'due_date__lt': str(today)},
+                'open, due this week': {'resolved__exact': 0, 'due_date__gte': str(today),
+                                        'due_date__lt': str(today + timedelta(days=7))},
+                'no due date': {'due_date__isnull': 'True'},
+                'search': {'q': 'task 1234'},
+                'broad search': {'q': 'task'},
+            }
+            for name, params in cases.items():
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url, params)
+                # Read them now: the next request clears the query log
+                sql = [query['sql'] for query in queries]
+                source = ('counters' if any('todo_todocounter' in q for q in sql)
+                          else 'COUNT' if any('COUNT(' in q for q in sql) else 'no count')
+                uncached, p95 = timed(lambda: (cache.clear(), client.get(url, params)), repeat)
+                self.stdout.write(
+                    f'{name}: {uncached * 1000:.1f}ms (p95 {p95 * 1000:.1f}ms), {len(sql)} queries, '
+                    f'{response.context["cl"].result_count} rows from {source}'
+                )
+
+            exact, _ = timed(lambda: (Todo.objects.count(), Todo.objects.filter(resolved=False).count()), repeat)
+            self.stdout.write(f'Django default (COUNT of all + COUNT of open): {exact * 1000:.1f}ms')
\ No newline at end of file
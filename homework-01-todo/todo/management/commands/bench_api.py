@@ -0,0 +1,54 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from todo.api import FIELDS, TodoEncoder
+from todo.benchmarking import benchmark_database, create_todos, peak_mb, timed
+from todo.models import Todo
+
+
+
+
+class Command(BaseCommand):
+    help = 'Time and trace memory of streaming the todo list as NDJSON, and the cost of an unchanged poll'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, default=200_000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, todos, repeat, **options):
+        with benchmark_database():
+            create_todos(todos)
+            client = Client()
+            url = reverse('api_todo_list')
+
+            def stream():
+                for _ in client.get(url).streaming_content:
+                    pass
+
+            def buffered():
+                # What a JSON array response would do: every row in memory at once
+                json.dumps(list(Todo.objects.order_by('id').values(*FIELDS)), cls=TodoEncoder)
+
+            for name, fn in (('streamed ndjson', stream), ('buffered json', buffered)):
+                fn()
+                t = time.perf_counter()
+                fn()
+                elapsed = time.perf_counter() - t
+                # Traced separately: tracemalloc slows allocation down several times
+                peak = peak_mb(fn)
+                self.stdout.write(f'{name}: {elapsed:.2f}s ({todos / elapsed:,.0f} rows/s), peak {peak:.1f}MB')
+
+            etag = client.get(url)['ETag']
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url, HTTP_IF_NONE_MATCH=etag)
+            # Read them now: the next request clears the query log
+            sql = [query['sql'] for query in queries]
+            mean, p95 = timed(lambda: client.get(url, HTTP_IF_NONE_MATCH=etag), repeat)
+            self.stdout.write(f'unchanged poll: {mean * 1000:.2f}ms (p95 {p95 * 1000:.2f}ms), '
+                              f'{len(sql)} query: {"; ".join(sql)}')
\ No newline at end of file
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.shortcuts import get_object_or_404
+
+from todo import bulk
+from todo.benchmarking import benchmark_database, create_todos
+from todo.models import Todo
+
+
+
+
+def per_row_toggle(ids):
+    # The old todo_toggle_resolved: SELECT, flip in Python, save every column
+    for pk in ids:
+        todo = get_object_or_404(Todo, pk=pk)
+        todo.resolved = not todo.resolved
+        todo.save()
+
+
+def per_row_delete(ids):
+    for pk in ids:
+        get_object_or_404(Todo, pk=pk).delete()
+
+
+
+
+class Command(BaseCommand):
+    help = 'Compare per-row and set-based resolve/delete over many todos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=10_000)
+
+    def run(self, name, fn):
+        statements = []
+
+        def count(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            t = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - t
+        self.stdout.write(f'{name}: {elapsed * 1000:.0f}ms, {len(statements)} statements')
+
+    def handle(self, *args, items, **options):
+        with benchmark_database():
+            create_todos(items * 2)
+            ids = list(Todo.objects.order_by('id').values_list('id', flat=True))
+            first, second = ids[:items], ids[items:]
+
+            self.run(f'per-row toggle x{items}', lambda: per_row_toggle(first))
+            self.run(f'bulk resolve x{items}', lambda: bulk.apply('resolve', ids=second))
+            self.run(f'per-row delete x{items}', lambda: per_row_delete(first))
+            self.run(f'bulk delete x{items}', lambda: bulk.apply('delete', ids=second))
\ No newline at end of file
@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from todo.benchmarking import benchmark_database, create_todos, percentile, wsgi_request
+from todo.models import Todo
+from todo_project.wsgi import application
+
+
+
+
+# (database settings, pragmas; None for TODO_SQLITE_PRAGMAS). The first is
+# how the project used to connect: no options, so sqlite3's 5s lock timeout
+PROFILES = {
+    'new connection per request, no pragmas': ({'CONN_MAX_AGE': 0, 'OPTIONS': {}}, {}),
+    'persistent connections': ({'CONN_MAX_AGE': 60}, {}),
+    'pragmas': ({'CONN_MAX_AGE': 0}, None),
+    'persistent connections + pragmas': ({'CONN_MAX_AGE': 60}, None),
+}
+
+
+
+
+def _request(i, pks, writes):
+    """A read of one todo through the API, or for ``writes`` percent of requests an update"""
+    pk = pks[i % len(pks)]
+    if i * writes % 100 < writes:
+        body = json.dumps({'resolved': i % 2 == 0}).encode()
+        return wsgi_request(application, f'/api/todos/{pk}/', 'PATCH', body, 'application/json')
+    return wsgi_request(application, f'/api/todos/{pk}/')
+
+
+def _run(pks, clients, requests, writes):
+    """Each client is a worker thread of a threaded WSGI server; returns (seconds, samples, failures)"""
+    def client(offset):
+        samples, failures = [], 0
+        try:
+            for i in range(offset, offset + requests // clients):
+                t = time.perf_counter()
+                if _request(i, pks, writes) >= 500:
+                    failures += 1
+                samples.append(time.perf_counter() - t)
+        finally:
+            connection.close()
+        return samples, failures
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(client, [n * (requests // clients) for n in range(clients)]))
+    return (time.perf_counter() - started, sorted(s for samples, _ in results for s in samples),
+            sum(failures for _, failures in results))
+
+
+
+
+class Command(BaseCommand):
+    help = ('Compare request latency and "database is locked" failures of a mixed read/write load on an '
+            'SQLite file with and without persistent connections and the SQLite pragmas')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, default=10_000)
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--writes', type=int, default=20, help='percent of requests that update a todo')
+
+    def handle(self, *args, todos, clients, requests, writes, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark compares SQLite setups; run it with TODO_DB=sqlite.')
+        # Shared by every thread's connection, so changing it here reaches the workers
+        settings_dict = connection.settings_dict
+        saved = {key: settings_dict[key] for key in ('CONN_MAX_AGE', 'OPTIONS')}, settings_dict['TEST'].get('NAME')
+        try:
+            for name, (database, pragmas) in PROFILES.items():
+                pragmas = settings.TODO_SQLITE_PRAGMAS if pragmas is None else pragmas
+                # A new file each time: journal_mode=wal is stored in it
+                with tempfile.TemporaryDirectory() as tmp, override_settings(TODO_SQLITE_PRAGMAS=pragmas):
+                    settings_dict.update(saved[0], **database)
+                    settings_dict['TEST']['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+                    with benchmark_database():
+                        create_todos(todos)
+                        pks = list(Todo.objects.values_list('pk', flat=True)[:200])
+                        # Leave the file to the worker threads
+                        connection.close()
+                        _run(pks, clients, clients * 10, writes)
+                        elapsed, samples, failures = _run(pks, clients, max(requests, clients), writes)
+                    self.stdout.write(
+                        f'{name}: {len(samples) / elapsed:.0f} req/s '
+                        f'p50={percentile(samples, 0.5) * 1000:.1f}ms '
+                        f'p95={percentile(samples, 0.95) * 1000:.1f}ms '
+                        f'p99={percentile(samples, 0.99) * 1000:.1f}ms '
+                        f'failed={failures}'
+                    )
+        finally:
+            settings_dict.update(saved[0])
+            settings_dict['TEST']['NAME'] = saved[1]
\ No newline at end of file
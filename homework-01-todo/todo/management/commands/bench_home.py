@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from todo import counters
+from todo.benchmarking import benchmark_database, create_todos, timed
+
+
+
+
+class Command(BaseCommand):
+    help = 'Time rendering of the home page (first, deep and filtered pages) and its counts at a large todo count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, todos, repeat, **options):
+        with benchmark_database():
+            create_todos(todos)
+            client = Client()
+            url = reverse('home')
+
+            # Follow "Next" links to reach a deep page
+            deep = {}
+            for _ in range(20):
+                cursor = client.get(url, deep).context['page'].next_cursor
+                deep = {'after': cursor}
+
+            cases = {
+                'first page': {},
+                'page 21': deep,
+                'overdue': {'status': 'overdue'},
+                'open': {'status': 'open'},
+                'due this week': {'status': 'week'},
+            }
+            for name, params in cases.items():
+                response = client.get(url, params)
+                etag = response['ETag']
+                cold, _ = timed(lambda: (cache.clear(), client.get(url, params)), repeat)
+                warm, p95 = timed(lambda: client.get(url, params), repeat)
+                not_modified, _ = timed(lambda: client.get(url, params, HTTP_IF_NONE_MATCH=etag), repeat)
+                self.stdout.write(f'{name}: uncached={cold * 1000:.1f}ms cached={warm * 1000:.1f}ms '
+                                  f'(p95 {p95 * 1000:.1f}ms) 304={not_modified * 1000:.2f}ms '
+                                  f'size={len(response.content) / 1024:.0f}KB')
+
+            counted, _ = timed(counters.count_rows, repeat)
+            summed, _ = timed(counters.counts, repeat)
+            self.stdout.write(f'header counts: COUNT over todos={counted * 1000:.1f}ms '
+                              f'sum of counters={summed * 1000:.2f}ms')
\ No newline at end of file
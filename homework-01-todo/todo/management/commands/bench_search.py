@@ -0,0 +1,34 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from todo import search
+from todo.benchmarking import benchmark_database, create_todos, timed
+from todo.models import Todo
+
+
+
+
+class Command(BaseCommand):
+    help = 'Compare FTS and LIKE search latency as the todo table grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='comma-separated table sizes to measure at')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, sizes, repeat, **options):
+        rng = random.Random(0)
+        with benchmark_database():
+            for size in sorted(int(s) for s in sizes.split(',')):
+                create_todos(size - Todo.objects.count())
+                # Selective terms: a word in every row costs O(rows) with any index
+                queries = [str(rng.randrange(size)) for _ in range(repeat)]
+                words = iter(queries * 2)
+
+                fts, _ = timed(lambda: search.search(next(words)), repeat)
+                like, _ = timed(
+                    lambda: list(Todo.objects.filter(search._fallback_filter(search.terms(next(words))))[:50]),
+                    repeat,
+                )
+                self.stdout.write(f'{size} todos: fts={fts * 1000:.2f}ms like={like * 1000:.2f}ms')
\ No newline at end of file
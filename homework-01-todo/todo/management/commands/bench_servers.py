@@ -0,0 +1,101 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from todo.benchmarking import benchmark_database, create_todos, percentile, wsgi_request
+from todo.models import Todo
+from todo_project.asgi import application as asgi_application
+from todo_project.wsgi import application as wsgi_application
+
+
+
+
+async def _asgi_get(path):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await asgi_application(scope, receive, send)
+    return status[0]
+
+
+def _run_wsgi(paths, clients, requests):
+    """Each client is a worker thread, as in a threaded WSGI server"""
+    def client(count):
+        samples = []
+        for i in range(count):
+            t = time.perf_counter()
+            if wsgi_request(wsgi_application, paths[i % len(paths)]) != 200:
+                raise CommandError(f'WSGI request to {paths[i % len(paths)]} failed')
+            samples.append(time.perf_counter() - t)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(client, [requests // clients] * clients))
+    return time.perf_counter() - started, [s for samples in results for s in samples]
+
+
+def _run_asgi(paths, clients, requests):
+    """Each client is a task on one event loop, as in an ASGI server"""
+    async def client(count):
+        samples = []
+        for i in range(count):
+            t = time.perf_counter()
+            if await _asgi_get(paths[i % len(paths)]) != 200:
+                raise CommandError(f'ASGI request to {paths[i % len(paths)]} failed')
+            samples.append(time.perf_counter() - t)
+        return samples
+
+    async def run():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(client(requests // clients) for _ in range(clients)))
+        return time.perf_counter() - started, [s for samples in results for s in samples]
+
+    return asyncio.run(run())
+
+
+
+
+class Command(BaseCommand):
+    help = ('Compare throughput and tail latency of the WSGI and ASGI applications under concurrent clients. '
+            'Requests go straight into each application, so this measures Django, not a web server.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, default=10_000)
+        parser.add_argument('--clients', default='1,8,32', help='comma-separated concurrency levels')
+        parser.add_argument('--requests', type=int, default=2000, help='requests per run')
+
+    def handle(self, *args, todos, clients, requests, **options):
+        levels = [int(level) for level in clients.split(',')]
+        with benchmark_database():
+            create_todos(todos)
+            pk = Todo.objects.values_list('pk', flat=True).first()
+            paths = ['/', '/?status=overdue', f'/todo/{pk}/edit/', '/search/?q=1234']
+            for path in paths:
+                wsgi_request(wsgi_application, path)
+                asyncio.run(_asgi_get(path))
+
+            for level in levels:
+                for name, run in (('wsgi', _run_wsgi), ('asgi', _run_asgi)):
+                    elapsed, samples = run(paths, level, max(requests, level))
+                    samples.sort()
+                    self.stdout.write(
+                        f'{name} clients={level}: {len(samples) / elapsed:.0f} req/s '
+                        f'p50={percentile(samples, 0.5) * 1000:.1f}ms '
+                        f'p95={percentile(samples, 0.95) * 1000:.1f}ms '
+                        f'p99={percentile(samples, 0.99) * 1000:.1f}ms'
+                    )
\ No newline at end of file
@@ -0,0 +1,61 @@
+import csv
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from todo import transfer
+from todo.benchmarking import benchmark_database, peak_mb
+
+
+
+
+def _write_csv(path, rows):
+    today = date.today()
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['title', 'description', 'due_date', 'resolved'])
+        for i in range(rows):
+            due = (today + timedelta(days=i % 60 - 30)).isoformat() if i % 3 else ''
+            writer.writerow([f'Task {i}', f'Description for task {i}', due, i % 4 == 0])
+
+
+
+
+class Command(BaseCommand):
+    help = 'Time and trace memory of importing a large CSV file of todos and exporting them again'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=transfer.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, todos, batch_size, **options):
+        with tempfile.TemporaryDirectory() as tmp, benchmark_database():
+            source, target = os.path.join(tmp, 'todos.csv'), os.path.join(tmp, 'export.csv')
+            _write_csv(source, todos)
+
+            def import_file():
+                with open(source, 'rb') as f:
+                    return transfer.import_todos(f, 'csv', batch_size=batch_size)
+
+            def export_file():
+                with open(target, 'w', encoding='utf-8', newline='') as out:
+                    out.writelines(transfer.export_lines(transfer.export_queryset(), 'csv'))
+
+            t = time.perf_counter()
+            imported = import_file().imported
+            elapsed = time.perf_counter() - t
+            # Traced separately: tracemalloc slows allocation down several times
+            peak = peak_mb(import_file)
+            self.stdout.write(f'import {os.path.getsize(source) / 2 ** 20:.0f}MB: {imported} rows in {elapsed:.2f}s '
+                              f'({imported / elapsed:,.0f} rows/s), peak {peak:.1f}MB')
+
+            t = time.perf_counter()
+            export_file()
+            elapsed = time.perf_counter() - t
+            peak = peak_mb(export_file)
+            # The second import doubled the table
+            self.stdout.write(f'export: {imported * 2} rows in {elapsed:.2f}s '
+                              f'({imported * 2 / elapsed:,.0f} rows/s), peak {peak:.1f}MB')
\ No newline at end of file
@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from todo import transfer
+from todo.models import STATUSES
+
+
+
+
+class Command(BaseCommand):
+    help = 'Export todos as CSV or JSON Lines, to a file or stdout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-')
+        parser.add_argument('--format', choices=transfer.FORMATS, help='default: from the file extension, else csv')
+        parser.add_argument('--status', choices=STATUSES, default='all')
+
+    def handle(self, *args, path, format, status, **options):
+        fmt = format or transfer.format_for(path)
+        lines = transfer.export_lines(transfer.export_queryset(status), fmt)
+        # newline='': the csv module already ends rows with \r\n
+        out = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        try:
+            out.writelines(lines)
+        finally:
+            if out is not sys.stdout:
+                out.close()
\ No newline at end of file
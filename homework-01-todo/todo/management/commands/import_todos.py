@@ -0,0 +1,39 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from todo import transfer
+
+
+
+
+class Command(BaseCommand):
+    help = 'Import todos from a CSV or JSON Lines file ("-" reads stdin), validated like the todo form'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=transfer.FORMATS, help='default: from the file extension, else csv')
+        parser.add_argument('--batch-size', type=int, default=transfer.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, path, format, batch_size, **options):
+        fmt = format or transfer.format_for(path)
+        started = time.perf_counter()
+        try:
+            stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as e:
+            raise CommandError(e)
+        with stream:
+            result = transfer.import_todos(stream, fmt, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+
+        for line, errors in result.errors:
+            messages = '; '.join(f'{name}: {" ".join(m)}' for name, m in errors.items())
+            self.stderr.write(f'line {line}: {messages}')
+        reported = len(result.errors) - result.stopped
+        if result.skipped > reported:
+            self.stderr.write(f'... and {result.skipped - reported} more invalid rows')
+        self.stdout.write(
+            f'Imported {result.imported} todos in {elapsed:.2f}s ({result.imported / elapsed:,.0f} rows/s), '
+            f'skipped {result.skipped}'
+        )
\ No newline at end of file
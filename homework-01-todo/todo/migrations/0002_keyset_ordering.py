@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='todo',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['-created_at', '-id'], name='todo_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import migrations
+
+
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE todo_search USING fts5(
+        title, description,
+        content='todo_todo', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER todo_search_insert AFTER INSERT ON todo_todo BEGIN
+        INSERT INTO todo_search(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todo_search_delete AFTER DELETE ON todo_todo BEGIN
+        INSERT INTO todo_search(todo_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todo_search_update AFTER UPDATE OF title, description ON todo_todo BEGIN
+        INSERT INTO todo_search(todo_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todo_search(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO todo_search(todo_search) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS todo_search_update',
+    'DROP TRIGGER IF EXISTS todo_search_delete',
+    'DROP TRIGGER IF EXISTS todo_search_insert',
+    'DROP TABLE IF EXISTS todo_search',
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX todo_search_idx ON todo_todo USING GIN "
+    "((to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))))",
+]
+
+POSTGRES_REVERSE = ['DROP INDEX IF EXISTS todo_search_idx']
+
+
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor not in statements:
+            return
+        if vendor == 'sqlite' and not _has_fts5(schema_editor.connection):
+            # Search falls back to icontains without FTS5
+            return
+        for sql in statements[vendor]:
+            schema_editor.execute(sql)
+    return run
+
+
+def _has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE temp.todo_fts5_probe USING fts5(x)')
+            cursor.execute('DROP TABLE temp.todo_fts5_probe')
+            return True
+        except Exception:
+            return False
+
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0002_keyset_ordering'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
\ No newline at end of file
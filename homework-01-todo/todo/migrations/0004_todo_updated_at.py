@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:05
+
+import importlib
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+search_migration = importlib.import_module('todo.migrations.0003_todo_search')
+SEARCH_TRIGGERS = [
+    sql.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS')
+    for sql in search_migration.SQLITE_FORWARD if 'CREATE TRIGGER' in sql
+]
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Untouched rows were last changed when they were created
+    Todo = apps.get_model('todo', 'Todo')
+    Todo.objects.using(schema_editor.connection.alias).update(updated_at=F('created_at'))
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite adds or drops a NOT NULL column by rebuilding todo_todo, which
+    # drops the triggers that keep todo_search in step. The rows keep their
+    # ids, so the index itself is still valid.
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todo_search'")
+        if cursor.fetchone() is None:
+            return
+    for sql in SEARCH_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0003_todo_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='todo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['updated_at'], name='todo_updated_at_idx'),
+        ),
+    ]
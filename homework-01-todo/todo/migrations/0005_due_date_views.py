@@ -0,0 +1,119 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:42
+
+from django.db import migrations, models
+
+
+FILL = (
+    'INSERT INTO todo_todocounter (resolved, due_date, count)'
+    ' SELECT resolved, due_date, COUNT(*) FROM todo_todo GROUP BY resolved, due_date'
+)
+
+# SQLite runs one writer at a time, so "insert the bucket if missing, then
+# bump it" cannot race
+SQLITE_BUMP = """
+    INSERT INTO todo_todocounter (resolved, due_date, count)
+    SELECT {row}.resolved, {row}.due_date, 0
+    WHERE NOT EXISTS (
+        SELECT 1 FROM todo_todocounter WHERE resolved = {row}.resolved AND due_date IS {row}.due_date
+    );
+    UPDATE todo_todocounter SET count = count {sign} 1
+    WHERE resolved = {row}.resolved AND due_date IS {row}.due_date;
+"""
+
+SQLITE_FORWARD = [
+    FILL,
+    'CREATE TRIGGER todo_counter_insert AFTER INSERT ON todo_todo BEGIN'
+    + SQLITE_BUMP.format(row='new', sign='+') + 'END',
+    'CREATE TRIGGER todo_counter_delete AFTER DELETE ON todo_todo BEGIN'
+    + SQLITE_BUMP.format(row='old', sign='-') + 'END',
+    'CREATE TRIGGER todo_counter_update AFTER UPDATE OF resolved, due_date ON todo_todo'
+    ' WHEN old.resolved IS NOT new.resolved OR old.due_date IS NOT new.due_date BEGIN'
+    + SQLITE_BUMP.format(row='old', sign='-') + SQLITE_BUMP.format(row='new', sign='+') + 'END',
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS todo_counter_update',
+    'DROP TRIGGER IF EXISTS todo_counter_delete',
+    'DROP TRIGGER IF EXISTS todo_counter_insert',
+]
+
+# Concurrent writers upsert through a unique index; a NULL due date is keyed
+# as 'infinity' because NULLs never conflict
+POSTGRES_FORWARD = [
+    "CREATE UNIQUE INDEX todo_counter_key ON todo_todocounter (resolved, coalesce(due_date, 'infinity'))",
+    FILL,
+    """
+    CREATE FUNCTION todo_counter_bump(bucket_resolved boolean, bucket_due date, delta integer) RETURNS void AS $$
+        INSERT INTO todo_todocounter (resolved, due_date, count) VALUES (bucket_resolved, bucket_due, delta)
+        ON CONFLICT (resolved, coalesce(due_date, 'infinity'))
+        DO UPDATE SET count = todo_todocounter.count + EXCLUDED.count
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE FUNCTION todo_counter_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND OLD.resolved = NEW.resolved AND OLD.due_date IS NOT DISTINCT FROM NEW.due_date THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM todo_counter_bump(OLD.resolved, OLD.due_date, -1);
+        END IF;
+        IF TG_OP IN ('UPDATE', 'INSERT') THEN
+            PERFORM todo_counter_bump(NEW.resolved, NEW.due_date, 1);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    'CREATE TRIGGER todo_counter AFTER INSERT OR DELETE OR UPDATE OF resolved, due_date ON todo_todo'
+    ' FOR EACH ROW EXECUTE FUNCTION todo_counter_trigger()',
+]
+
+POSTGRES_REVERSE = [
+    'DROP TRIGGER IF EXISTS todo_counter ON todo_todo',
+    'DROP FUNCTION IF EXISTS todo_counter_trigger()',
+    'DROP FUNCTION IF EXISTS todo_counter_bump(boolean, date, integer)',
+    'DROP INDEX IF EXISTS todo_counter_key',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0004_todo_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolved', models.BooleanField()),
+                ('due_date', models.DateField(null=True)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('resolved', False)), fields=['due_date', 'id'], name='todo_open_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('resolved', False)), fields=['-created_at', '-id'], name='todo_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todocounter',
+            index=models.Index(fields=['resolved', 'due_date'], name='todo_counter_bucket_idx'),
+        ),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
\ No newline at end of file
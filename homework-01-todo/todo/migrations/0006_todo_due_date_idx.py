@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0005_due_date_views'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['due_date', 'id'], name='todo_due_date_idx'),
+        ),
+    ]
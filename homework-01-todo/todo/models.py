@@ -1,4 +1,64 @@
+from datetime import date, timedelta
+
 from django.db import models
+from django.db.models import Q
+
+
+
+
+def end_of_week(day):
+    """The Sunday on or after ``day``"""
+    return day + timedelta(days=6 - day.weekday())
+
+
+def status_filter(status, today=None):
+    """``Q`` for the todos listed under one of ``STATUSES``"""
+    today = today or date.today()
+    return {
+        'all': Q(),
+        'open': Q(resolved=False),
+        'resolved': Q(resolved=True),
+        'overdue': Q(resolved=False, due_date__lt=today),
+        'today': Q(resolved=False, due_date=today),
+        'week': Q(resolved=False, due_date__range=(today, end_of_week(today))),
+    }[status]
+
+
+
+
+class TodoQuerySet(models.QuerySet):
+    def open(self):
+        return self.filter(status_filter('open'))
+
+    def resolved(self):
+        return self.filter(status_filter('resolved'))
+
+    def overdue(self, today=None):
+        return self.filter(status_filter('overdue', today))
+
+    def today(self, today=None):
+        return self.filter(status_filter('today', today))
+
+    def week(self, today=None):
+        return self.filter(status_filter('week', today))
+
+    def with_status(self, status):
+        """Todos shown under one of ``STATUSES``"""
+        if status == 'all':
+            return self.all()
+        return getattr(self, status)()
+
+
+
+
+STATUSES = ('all', 'open', 'resolved', 'overdue', 'today', 'week')
+STATUS_LABELS = {'today': 'Due today', 'week': 'This week'}
+
+# Page order of each list. Due-date lists walk todo_open_due_idx; the
+# others walk todo_created_id_idx or todo_open_created_idx.
+NEWEST_FIRST = ('-created_at', '-id')
+SOONEST_DUE = ('due_date', 'id')
+STATUS_ORDERING = {'overdue': SOONEST_DUE, 'today': SOONEST_DUE, 'week': SOONEST_DUE}
 
 
 
@@ -9,9 +69,38 @@ class Todo(models.Model):
     due_date = models.DateField(null=True, blank=True)
     resolved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # QuerySet.update skips auto_now, so set-based writes pass it explicitly
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TodoQuerySet.as_manager()
 
     class Meta:
-        ordering = ['-created_at']
+        # id breaks ties so keyset pagination on (created_at, id) is stable
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='todo_created_id_idx'),
+            models.Index(fields=['updated_at'], name='todo_updated_at_idx'),
+            # Partial rather than leading with resolved: Django writes
+            # resolved=False as NOT resolved, which SQLite cannot seek on
+            models.Index(fields=['due_date', 'id'], condition=Q(resolved=False), name='todo_open_due_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=Q(resolved=False), name='todo_open_created_idx'),
+            # Due date ranges over every todo, for the admin's due date filter
+            models.Index(fields=['due_date', 'id'], name='todo_due_date_idx'),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+
+
+class TodoCounter(models.Model):
+    """How many todos have one ``(resolved, due_date)``; kept current by triggers (see ``todo/counters.py``)"""
+    resolved = models.BooleanField()
+    due_date = models.DateField(null=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resolved', 'due_date'], name='todo_counter_bucket_idx'),
+        ]
\ No newline at end of file
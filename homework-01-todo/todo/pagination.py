@@ -0,0 +1,117 @@
+"""Keyset pagination over an index-backed ordering of ``Todo``.
+
+A cursor encodes the ordering values of the row at the edge of a page, e.g.
+``(created_at, id)`` for ``NEWEST_FIRST``. The next page is
+``WHERE (created_at, id) < cursor``. It costs the same at page 1 and page
+1000 because it walks an index (``todo_created_id_idx``, or
+``todo_open_due_idx`` for ``SOONEST_DUE``) instead of skipping OFFSET
+rows.
+"""
+import base64
+from dataclasses import dataclass, field
+from functools import reduce
+from operator import or_
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from .models import NEWEST_FIRST, Todo
+
+
+
+
+PAGE_SIZE = getattr(settings, 'TODO_PAGE_SIZE', 50)
+
+
+
+
+def _names(ordering):
+    return [name.lstrip('-') for name in ordering]
+
+
+def encode_cursor(todo, ordering=NEWEST_FIRST):
+    raw = '|'.join(Todo._meta.get_field(name).value_to_string(todo) for name in _names(ordering))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering=NEWEST_FIRST):
+    """The ordering values from a cursor, or None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        parts = raw.split('|')
+        if len(parts) != len(ordering):
+            return None
+        return tuple(Todo._meta.get_field(name).to_python(part) for name, part in zip(_names(ordering), parts))
+    except (ValueError, UnicodeDecodeError, ValidationError):
+        return None
+
+
+
+
+@dataclass
+class KeysetPage:
+    items: List = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_cursor or self.prev_cursor)
+
+
+
+
+def _reverse(ordering):
+    return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+
+def _beyond(ordering, values):
+    """``Q`` for the rows that come after ``values`` in ``ordering``"""
+    names = _names(ordering)
+    return reduce(or_, (
+        Q(**dict(zip(names[:i], values[:i])),
+          **{f"{names[i]}__{'lt' if ordering[i].startswith('-') else 'gt'}": values[i]})
+        for i in range(len(ordering))
+    ))
+
+
+def _page_query(queryset, after, before, size, ordering):
+    """The one query for a page, and whether it walks backwards from ``before``"""
+    after = decode_cursor(after, ordering) if after else None
+    before = decode_cursor(before, ordering) if before else None
+    if before and not after:
+        backwards = _reverse(ordering)
+        return queryset.filter(_beyond(backwards, before)).order_by(*backwards)[:size + 1], True, False
+    if after:
+        queryset = queryset.filter(_beyond(ordering, after))
+    return queryset.order_by(*ordering)[:size + 1], False, bool(after)
+
+
+def _page(rows, backwards, has_previous, size, ordering):
+    if backwards:
+        items = rows[:size][::-1]
+        return KeysetPage(
+            items=items,
+            next_cursor=encode_cursor(items[-1], ordering) if items else None,
+            prev_cursor=encode_cursor(items[0], ordering) if len(rows) > size else None,
+        )
+    items = rows[:size]
+    return KeysetPage(
+        items=items,
+        next_cursor=encode_cursor(items[-1], ordering) if len(rows) > size else None,
+        prev_cursor=encode_cursor(items[0], ordering) if has_previous and items else None,
+    )
+
+
+def paginate(queryset, after=None, before=None, size=PAGE_SIZE, ordering=NEWEST_FIRST):
+    """One page of ``queryset`` in ``ordering`` after or before a cursor, in one query"""
+    query, backwards, has_previous = _page_query(queryset, after, before, size, ordering)
+    return _page(list(query), backwards, has_previous, size, ordering)
+
+
+async def apaginate(queryset, after=None, before=None, size=PAGE_SIZE, ordering=NEWEST_FIRST):
+    """``paginate`` for async views, fetching the page with the async ORM"""
+    query, backwards, has_previous = _page_query(queryset, after, before, size, ordering)
+    return _page([todo async for todo in query], backwards, has_previous, size, ordering)
\ No newline at end of file
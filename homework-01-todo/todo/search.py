@@ -0,0 +1,155 @@
+"""Ranked full-text search over todo titles and descriptions.
+
+On SQLite the index is an FTS5 table, ``todo_search``, over ``todo_todo``.
+It is created by migration 0003, and triggers keep it in step with every
+insert, update and delete, including ``QuerySet.update`` and bulk deletes.
+On PostgreSQL the migration adds a GIN index on the same ``tsvector``
+expression the query uses. Either way:
+
+- Results are ranked: bm25 on SQLite, ts_rank_cd on PostgreSQL.
+- Every word is matched as a prefix.
+- Matches are highlighted.
+
+If the database has no FTS support, search falls back to ``icontains``.
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Todo
+
+
+
+
+SEARCH_LIMIT = 50
+MAX_TERMS = 8
+# Sentinels survive escaping and become <mark> tags afterwards
+_OPEN, _CLOSE = '\u27e6', '\u27e7'
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+PG_DOCUMENT = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+
+
+
+@dataclass
+class SearchResult:
+    todo: Todo
+    rank: float
+    title: str
+    snippet: str
+
+
+
+
+def terms(query):
+    return _WORD.findall(query.lower())[:MAX_TERMS]
+
+
+def _marked(text):
+    return mark_safe(escape(text or '').replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+_fts_tables = {}
+
+
+def fts_available():
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    key = (connection.alias, str(connection.settings_dict['NAME']))
+    if not _fts_tables.get(key):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todo_search'")
+            _fts_tables[key] = cursor.fetchone() is not None
+    return _fts_tables[key]
+
+
+def _sqlite_match(words):
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _postgres_tsquery(words):
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def _sqlite_rows(words, limit):
+    match = _sqlite_match(words)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid, bm25(todo_search, 10.0, 1.0),"
+            " highlight(todo_search, 0, %s, %s),"
+            " snippet(todo_search, 1, %s, %s, '…', 16)"
+            " FROM todo_search WHERE todo_search MATCH %s"
+            " ORDER BY bm25(todo_search, 10.0, 1.0) LIMIT %s",
+            [_OPEN, _CLOSE, _OPEN, _CLOSE, match, limit],
+        )
+        # bm25 is lower-is-better; flip it so higher rank means a better match
+        return [(pk, -rank, title, snippet) for pk, rank, title, snippet in cursor.fetchall()]
+
+
+def _postgres_rows(words, limit):
+    tsquery = _postgres_tsquery(words)
+    options = f'StartSel={_OPEN}, StopSel={_CLOSE}, MaxWords=30, MinWords=10'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, ts_rank_cd({PG_DOCUMENT}, q),"
+            " ts_headline('simple', title, q, %s),"
+            " ts_headline('simple', description, q, %s)"
+            f" FROM todo_todo, to_tsquery('simple', %s) q WHERE {PG_DOCUMENT} @@ q"
+            f" ORDER BY ts_rank_cd({PG_DOCUMENT}, q) DESC LIMIT %s",
+            [options + ', HighlightAll=true', options, tsquery, limit],
+        )
+        return cursor.fetchall()
+
+
+def _fallback_filter(words):
+    condition = Q()
+    for word in words:
+        condition &= Q(title__icontains=word) | Q(description__icontains=word)
+    return condition
+
+
+def _fallback_rows(words, limit):
+    todos = Todo.objects.filter(_fallback_filter(words))
+    return [(todo.pk, 0.0, todo.title, todo.description[:200]) for todo in todos[:limit]]
+
+
+def search_filter(query):
+    """``Q`` for every todo matching ``query``, unranked, for filtering an existing queryset"""
+    words = terms(query)
+    if not words:
+        return Q()
+    if not fts_available():
+        return _fallback_filter(words)
+    if connection.vendor == 'postgresql':
+        return Q(pk__in=RawSQL(f"SELECT id FROM todo_todo WHERE {PG_DOCUMENT} @@ to_tsquery('simple', %s)",
+                               [_postgres_tsquery(words)]))
+    return Q(pk__in=RawSQL('SELECT rowid FROM todo_search WHERE todo_search MATCH %s', [_sqlite_match(words)]))
+
+
+def _rows(query, limit):
+    words = terms(query)
+    if not words:
+        return []
+    if not fts_available():
+        return _fallback_rows(words, limit)
+    if connection.vendor == 'postgresql':
+        return _postgres_rows(words, limit)
+    return _sqlite_rows(words, limit)
+
+
+def search(query, limit=SEARCH_LIMIT):
+    """Ranked ``SearchResult`` list with highlighted title and description snippet"""
+    rows = _rows(query, limit)
+    todos = Todo.objects.in_bulk([row[0] for row in rows])
+    return [
+        SearchResult(todo=todos[pk], rank=rank, title=_marked(title), snippet=_marked(snippet))
+        for pk, rank, title, snippet in rows if pk in todos
+    ]
\ No newline at end of file
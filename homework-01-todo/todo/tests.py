@@ -1,7 +1,27 @@
-from django.test import TestCase
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, models
+from django.db.models.deletion import Collector
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
-from .models import Todo
-from datetime import date
+from django.utils import timezone
+from . import bulk, counters, transfer
+from .models import SOONEST_DUE, STATUSES, Todo, end_of_week
+from .pagination import paginate
+from .search import search, search_filter
+from todo_project.asgi import application
+from datetime import date, timedelta
+from unittest import mock
+import csv
+import io
+import json
+import os
+import tempfile
 
 
 
@@ -44,4 +64,575 @@ class TodoViewsTests(TestCase):
     def test_delete(self):
         resp = self.client.post(reverse('todo_delete', args=[self.todo.pk]))
         self.assertEqual(resp.status_code, 302)
-        self.assertEqual(Todo.objects.count(), 0)
\ No newline at end of file
+        self.assertEqual(Todo.objects.count(), 0)
+
+
+
+
+class HomePaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Todo.objects.bulk_create(Todo(title=f'T{i}') for i in range(7))
+        # Identical timestamps force the id tie-breaker
+        Todo.objects.update(created_at=timezone.now())
+
+    def walk(self, size):
+        seen, page = [], paginate(Todo.objects.all(), size=size)
+        seen += [t.title for t in page.items]
+        while page.next_cursor:
+            page = paginate(Todo.objects.all(), after=page.next_cursor, size=size)
+            seen += [t.title for t in page.items]
+        return seen, page
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen, last = self.walk(3)
+        self.assertEqual(seen, [f'T{i}' for i in reversed(range(7))])
+        self.assertIsNotNone(last.prev_cursor)
+
+    def test_before_cursor_returns_previous_page(self):
+        first = paginate(Todo.objects.all(), size=3)
+        second = paginate(Todo.objects.all(), after=first.next_cursor, size=3)
+        back = paginate(Todo.objects.all(), before=second.prev_cursor, size=3)
+        self.assertEqual([t.pk for t in back.items], [t.pk for t in first.items])
+        self.assertIsNone(back.prev_cursor)
+
+    def test_bad_cursor_shows_first_page(self):
+        resp = self.client.get(reverse('home'), {'after': 'not-a-cursor'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'T6')
+
+    def test_home_is_two_queries_then_served_from_cache(self):
+        self.client.get(reverse('home'))
+        cache.clear()
+        with self.assertNumQueries(2):
+            self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse('home'))
+        self.assertContains(resp, '7 items')
+
+    def test_counts_are_invalidated_on_write(self):
+        self.client.get(reverse('home'))
+        self.client.post(reverse('todo_create'), {'title': 'Eighth', 'description': ''})
+        self.assertContains(self.client.get(reverse('home')), '8 items')
+
+    def test_overdue_filter(self):
+        Todo.objects.create(title='Late', due_date=date.today() - timedelta(days=1))
+        Todo.objects.create(title='LateButDone', due_date=date.today() - timedelta(days=1), resolved=True)
+        resp = self.client.get(reverse('home'), {'status': 'overdue'})
+        self.assertEqual([t.title for t in resp.context['todos']], ['Late'])
+        self.assertEqual(resp.context['counts']['overdue'], 1)
+
+
+
+
+class BulkActionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.todos = [Todo.objects.create(title=f'B{i}', due_date=date(2025, 1, 10 + i)) for i in range(4)]
+        self.ids = [t.pk for t in self.todos]
+
+    def test_toggle_is_one_update(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('todo_toggle', args=[self.ids[0]]))
+        self.todos[0].refresh_from_db()
+        self.assertTrue(self.todos[0].resolved)
+
+    def test_toggle_missing_todo_is_404(self):
+        resp = self.client.get(reverse('todo_toggle', args=[99999]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_bulk_resolve_then_unresolve(self):
+        resp = self.client.post(reverse('todo_bulk', args=['resolve']), {'ids': self.ids[:3]})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(Todo.objects.filter(resolved=True).count(), 3)
+        self.client.post(reverse('todo_bulk', args=['unresolve']), {'ids': ','.join(map(str, self.ids))})
+        self.assertEqual(Todo.objects.filter(resolved=True).count(), 0)
+
+    def test_bulk_delete_is_a_single_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            bulk.apply('delete', ids=self.ids[1:])
+        statements = [q['sql'].split()[0] for q in queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(statements, ['DELETE'])
+        self.assertEqual(list(Todo.objects.values_list('title', flat=True)), ['B0'])
+        # The reason for _raw_delete: with the post_delete receiver, delete() could not do this
+        self.assertFalse(Collector(using=connection.alias).can_fast_delete(Todo.objects.all()))
+
+    def test_bulk_reschedule_by_days_and_date(self):
+        self.client.post(reverse('todo_bulk', args=['reschedule']), {'ids': self.ids[:2], 'days': 3})
+        self.client.post(reverse('todo_bulk', args=['reschedule']), {'ids': self.ids[3:], 'due_date': '2030-05-01'})
+        due = dict(Todo.objects.values_list('title', 'due_date'))
+        self.assertEqual(due, {'B0': date(2025, 1, 13), 'B1': date(2025, 1, 14),
+                               'B2': date(2025, 1, 12), 'B3': date(2030, 5, 1)})
+
+    def test_bulk_by_status(self):
+        Todo.objects.filter(pk=self.ids[0]).update(due_date=date.today() - timedelta(days=2))
+        Todo.objects.filter(pk=self.ids[1]).update(due_date=date.today() + timedelta(days=2))
+        self.client.post(reverse('todo_bulk', args=['resolve']), {'status': 'overdue'})
+        self.assertEqual(list(Todo.objects.filter(resolved=False).values_list('title', flat=True).order_by('title')),
+                         ['B1'])
+
+    def test_bulk_invalidates_counts(self):
+        self.assertContains(self.client.get(reverse('home')), '4 items')
+        self.client.post(reverse('todo_bulk', args=['delete']), {'ids': self.ids[:1]})
+        self.assertContains(self.client.get(reverse('home')), '3 items')
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.post(reverse('todo_bulk', args=['resolve']), {}).status_code, 400)
+        self.assertEqual(self.client.post(reverse('todo_bulk', args=['reschedule']), {'ids': self.ids}).status_code,
+                         400)
+        self.assertEqual(self.client.post(reverse('todo_bulk', args=['explode']), {'ids': self.ids}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('todo_bulk', args=['resolve'])).status_code, 405)
+
+
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.groceries = Todo.objects.create(title='Buy groceries', description='milk, eggs and bread')
+        self.bread = Todo.objects.create(title='Call mom', description='ask about the bread recipe')
+        self.tax = Todo.objects.create(title='File taxes', description='<b>before April</b>')
+
+    def test_prefix_match_and_ranking(self):
+        Todo.objects.create(title='Bread machine', description='')
+        self.assertEqual([r.todo.title for r in search('brea')], ['Bread machine', 'Buy groceries', 'Call mom'])
+
+    def test_all_words_must_match(self):
+        self.assertEqual([r.todo for r in search('bread recipe')], [self.bread])
+
+    def test_highlight_is_escaped(self):
+        result = search('april')[0]
+        self.assertIn('<mark>April</mark>', result.snippet)
+        self.assertIn('&lt;b&gt;', result.snippet)
+        self.assertEqual(search('"); DROP TABLE todo_todo; --'), [])
+
+    def test_index_follows_writes(self):
+        Todo.objects.filter(pk=self.tax.pk).update(title='File receipts')
+        self.groceries.delete()
+        self.assertEqual([r.todo for r in search('receipts')], [self.tax])
+        self.assertEqual([r.todo for r in search('groceries')], [])
+
+    def test_search_view(self):
+        resp = self.client.get(reverse('todo_search'), {'q': 'groc'})
+        self.assertContains(resp, '<mark>groceries</mark>')
+        self.assertContains(resp, '1 result')
+
+    def test_admin_search_uses_index(self):
+        self.assertEqual(list(Todo.objects.filter(search_filter('milk'))), [self.groceries])
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        resp = self.client.get(reverse('admin:todo_todo_changelist'), {'q': 'taxes'})
+        self.assertContains(resp, 'File taxes')
+        self.assertNotContains(resp, 'Buy groceries')
+
+
+
+
+class CachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.todo = Todo.objects.create(title='Cached', description='first')
+
+    def test_list_fragment_is_invalidated_by_signals(self):
+        self.assertContains(self.client.get(reverse('home')), 'first')
+        self.todo.description = 'second'
+        self.todo.save()
+        resp = self.client.get(reverse('home'))
+        self.assertContains(resp, 'second')
+        self.assertNotContains(resp, 'first')
+
+    def test_list_fragment_is_invalidated_by_bulk_writes(self):
+        self.client.get(reverse('home'))
+        bulk.apply('delete', ids=[self.todo.pk])
+        self.assertContains(self.client.get(reverse('home')), 'No tasks yet')
+
+    def test_csrf_token_is_not_cached(self):
+        first = self.client.get(reverse('home'))
+        other = Client(enforce_csrf_checks=True)
+        second = other.get(reverse('home'))
+        token = second.cookies['csrftoken'].value
+        self.assertNotEqual(first.cookies['csrftoken'].value, token)
+        resp = other.post(reverse('todo_bulk', args=['resolve']),
+                          {'ids': [self.todo.pk], 'csrfmiddlewaretoken': second.context['csrf_token']})
+        self.assertEqual(resp.status_code, 302)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                           'LOCATION': 'todo_test_cache'}})
+    def test_home_with_database_cache(self):
+        # The card {% cache %} tags query the cache table, which an async view must do from a thread
+        call_command('createcachetable', verbosity=0)
+        self.assertContains(self.client.get(reverse('home')), 'first')
+        self.assertContains(self.client.get(reverse('home')), 'first')
+
+    def test_conditional_get(self):
+        first = self.client.get(reverse('home'))
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(0):
+            again = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        Todo.objects.create(title='Another')
+        changed = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_edit_page_conditional_get(self):
+        url = reverse('todo_edit', args=[self.todo.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.get(reverse('todo_toggle', args=[self.todo.pk]))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+
+
+class AsgiApplicationTests(TransactionTestCase):
+    async def test_asgi_application_serves_home(self):
+        # The handler queries from its own thread, so the todo must be committed
+        await Todo.objects.acreate(title='Served async', description='over ASGI')
+        await cache.aclear()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/', 'raw_path': b'/', 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 1234), 'server': ('testserver', 80),
+        }
+        communicator = ApplicationCommunicator(application, scope)
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output()
+        body = await communicator.receive_output()
+        await communicator.wait()
+        self.assertEqual(start['status'], 200)
+        self.assertIn(b'Served async', body['body'])
+
+
+
+
+class AsyncViewTests(TestCase):
+    async def test_async_client_round_trip(self):
+        await cache.aclear()
+        resp = await self.async_client.post(reverse('todo_create'), {'title': 'Made async', 'description': 'x'})
+        self.assertEqual(resp.status_code, 302)
+        todo = await Todo.objects.aget(title='Made async')
+        await self.async_client.get(reverse('todo_toggle', args=[todo.pk]))
+        await todo.arefresh_from_db()
+        self.assertTrue(todo.resolved)
+        self.assertEqual((await self.async_client.get(reverse('todo_edit', args=[0]))).status_code, 404)
+        self.assertEqual((await self.async_client.get(reverse('todo_bulk', args=['delete']))).status_code, 405)
+        await self.async_client.post(reverse('todo_delete', args=[todo.pk]))
+        self.assertFalse(await Todo.objects.filter(pk=todo.pk).aexists())
+
+
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.todos = [Todo.objects.create(title=f'Api {i}', description='d', resolved=i == 2) for i in range(3)]
+        self.url = reverse('api_todo_list')
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(url, json.dumps(data), content_type='application/json')
+
+    def rows(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_list_streams_ndjson(self):
+        resp = self.client.get(self.url)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        rows = self.rows(resp)
+        self.assertEqual([row['id'] for row in rows], [t.pk for t in self.todos])
+        self.assertEqual(set(rows[0]), {'id', 'title', 'description', 'due_date', 'resolved', 'created_at',
+                                        'updated_at'})
+
+    def test_list_filters(self):
+        self.assertEqual([r['title'] for r in self.rows(self.client.get(self.url, {'status': 'resolved'}))],
+                         ['Api 2'])
+        since = Todo.objects.get(pk=self.todos[0].pk).updated_at
+        Todo.objects.filter(pk=self.todos[0].pk).update(updated_at=since - timedelta(days=1))
+        rows = self.rows(self.client.get(self.url, {'updated_since': since.isoformat()}))
+        self.assertNotIn(self.todos[0].pk, [r['id'] for r in rows])
+        self.assertEqual(self.client.get(self.url, {'status': 'later'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'updated_since': 'yesterday'}).status_code, 400)
+
+    def test_unchanged_poll_is_one_query(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        bulk.apply('resolve', ids=[self.todos[0].pk])
+        resolved = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resolved.status_code, 200)
+        self.client.delete(reverse('api_todo_detail', args=[self.todos[1].pk]))
+        self.assertNotEqual(self.client.get(self.url)['ETag'], resolved['ETag'])
+
+    def test_create_update_delete(self):
+        created = self.send('post', self.url, {'title': 'From a job', 'due_date': '2030-01-02'})
+        self.assertEqual(created.status_code, 201)
+        pk = created.json()['id']
+        detail = reverse('api_todo_detail', args=[pk])
+
+        patched = self.send('patch', detail, {'resolved': True})
+        self.assertEqual(patched.json()['due_date'], '2030-01-02')
+        self.assertTrue(patched.json()['resolved'])
+        replaced = self.send('put', detail, {'title': 'Replaced'})
+        self.assertEqual((replaced.json()['title'], replaced.json()['due_date']), ('Replaced', None))
+
+        self.assertEqual(self.client.delete(detail).status_code, 204)
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+    def test_invalid_writes(self):
+        missing = self.send('post', self.url, {'description': 'no title'})
+        self.assertEqual(missing.status_code, 400)
+        self.assertIn('title', missing.json()['errors'])
+        self.assertEqual(self.client.post(self.url, {'title': 'form post'}).status_code, 415)
+        self.assertEqual(self.client.post(self.url, '[1', content_type='application/json').status_code, 400)
+        self.assertEqual(Todo.objects.count(), 3)
+
+    def test_bulk(self):
+        ids = [t.pk for t in self.todos[:2]]
+        resp = self.send('post', reverse('api_todo_bulk', args=['resolve']), {'ids': ids})
+        self.assertEqual(resp.json(), {'action': 'resolve', 'changed': 2})
+        self.assertEqual(Todo.objects.filter(resolved=True).count(), 3)
+        self.assertEqual(self.send('post', reverse('api_todo_bulk', args=['reschedule']), {'ids': ids}).status_code,
+                         400)
+        self.assertEqual(self.send('post', reverse('api_todo_bulk', args=['explode']), {'ids': ids}).status_code, 404)
+
+    async def test_list_streams_asynchronously_under_asgi(self):
+        resp = await self.async_client.get(self.url)
+        self.assertTrue(resp.is_async)
+        lines = [line async for chunk in resp.streaming_content for line in chunk.splitlines()]
+        self.assertEqual(len(lines), 3)
+
+
+
+
+class DueDateViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = date.today()
+        self.late = Todo.objects.create(title='Late', due_date=self.today - timedelta(days=1))
+        self.later = Todo.objects.create(title='Very late', due_date=self.today - timedelta(days=3))
+        self.due = Todo.objects.create(title='Due now', due_date=self.today)
+        self.sunday = Todo.objects.create(title='By Sunday', due_date=end_of_week(self.today))
+        Todo.objects.create(title='Next week', due_date=end_of_week(self.today) + timedelta(days=1))
+        Todo.objects.create(title='Done late', due_date=self.today - timedelta(days=2), resolved=True)
+        Todo.objects.create(title='Someday')
+
+    def expected_counts(self):
+        return {status: Todo.objects.with_status(status).count() for status in STATUSES}
+
+    def test_due_date_views(self):
+        overdue = self.client.get(reverse('todo_overdue'))
+        self.assertEqual([t.title for t in overdue.context['todos']], ['Very late', 'Late'])
+        week = self.client.get(reverse('todo_week'))
+        self.assertEqual([t.pk for t in week.context['todos']], [self.due.pk, self.sunday.pk])
+        self.assertIn(self.due, self.client.get(reverse('todo_today')).context['todos'])
+        self.assertEqual(len(self.client.get(reverse('todo_open')).context['todos']), 6)
+
+    def test_due_date_pages_follow_the_index(self):
+        Todo.objects.bulk_create(Todo(title=f'Tie {i}', due_date=self.today - timedelta(days=1)) for i in range(5))
+        overdue, page = [], paginate(Todo.objects.overdue(), size=2, ordering=SOONEST_DUE)
+        overdue += page.items
+        while page.next_cursor:
+            page = paginate(Todo.objects.overdue(), after=page.next_cursor, size=2, ordering=SOONEST_DUE)
+            overdue += page.items
+        self.assertEqual(overdue, list(Todo.objects.overdue().order_by('due_date', 'id')))
+        if connection.vendor == 'sqlite':
+            self.assertIn('todo_open_due_idx', Todo.objects.overdue().order_by(*SOONEST_DUE).explain())
+
+    def test_counters_follow_every_kind_of_write(self):
+        self.assertEqual(counters.counts(), self.expected_counts())
+        self.late.resolved = True
+        self.late.save()
+        Todo.objects.filter(pk=self.later.pk).update(due_date=self.today)
+        bulk.apply('reschedule', ids=[self.due.pk], days=-5)
+        bulk.apply('delete', ids=[self.sunday.pk])
+        Todo.objects.bulk_create([Todo(title='Imported', due_date=self.today)])
+        self.assertEqual(counters.counts(), self.expected_counts())
+
+        counters.rebuild()
+        self.assertEqual(counters.counts(), self.expected_counts())
+
+    def test_header_counts_read_the_counters(self):
+        self.client.get(reverse('home'))
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse('todo_week'))
+        self.assertIn('todo_todocounter', queries[0]['sql'])
+        counts = self.expected_counts()
+        self.assertContains(resp, f"{counts['overdue']} overdue")
+        self.assertEqual([tab['count'] for tab in resp.context['tabs']], [counts[s] for s in STATUSES])
+
+
+
+
+class TransferTests(TestCase):
+    CSV = (
+        'title,description,due_date,resolved\n'
+        'Pay rent,monthly,2030-01-01,False\n'
+        ',no title,,False\n'
+        'Call back,,someday,False\n'
+        '"Write, with a comma",,,True\n'
+    )
+
+    def test_csv_import_validates_like_the_form(self):
+        result = transfer.import_todos(io.BytesIO(self.CSV.encode()), 'csv', batch_size=1)
+        self.assertEqual((result.imported, result.skipped), (2, 2))
+        self.assertEqual([line for line, errors in result.errors], [3, 4])
+        self.assertIn('title', result.errors[0][1])
+        self.assertIn('due_date', result.errors[1][1])
+        rent = Todo.objects.get(title='Pay rent')
+        self.assertEqual((rent.due_date, rent.resolved), (date(2030, 1, 1), False))
+        self.assertTrue(Todo.objects.get(title='Write, with a comma').resolved)
+
+    def test_import_keeps_search_and_counters_current(self):
+        cache.clear()
+        self.client.get(reverse('home'))
+        transfer.import_todos(io.BytesIO(self.CSV.encode()), 'csv')
+        self.assertEqual([r.todo.title for r in search('rent')], ['Pay rent'])
+        self.assertEqual(counters.counts(), counters.count_rows())
+        self.assertContains(self.client.get(reverse('home')), 'Pay rent')
+
+    def test_json_lines_import(self):
+        lines = '{"title": "From JSON", "resolved": true, "due_date": null}\n\n[1, 2]\n{"title": "x" \n'
+        result = transfer.import_todos(io.BytesIO(lines.encode()), 'json')
+        self.assertEqual((result.imported, [line for line, _ in result.errors]), (1, [3, 4]))
+        self.assertTrue(Todo.objects.get(title='From JSON').resolved)
+
+    def test_unreadable_file_stops_the_import_at_its_line(self):
+        latin1 = 'title\nKept\nCaf\u00e9\nNever read\n'.encode('latin-1')
+        result = transfer.import_todos(io.BytesIO(latin1), 'csv')
+        self.assertEqual((result.imported, result.stopped), (1, True))
+        self.assertEqual(result.errors[0][0], 3)
+        self.assertIn('UTF-8', result.errors[0][1]['__all__'][0])
+        self.assertEqual(list(Todo.objects.values_list('title', flat=True)), ['Kept'])
+
+        result = transfer.import_todos(io.BytesIO(b'title\n"a\x00b"\n'), 'csv')
+        self.assertEqual((result.imported, result.errors[0][0]), (0, 2))
+
+        upload = SimpleUploadedFile('todos.csv', latin1, content_type='text/csv')
+        self.assertContains(self.client.post(reverse('todo_import'), {'file': upload}), 'Line 3: Not UTF-8 text')
+
+    def test_export_round_trips(self):
+        Todo.objects.create(title='Quoted "title"', description='two\nlines', due_date=date(2030, 5, 6))
+        Todo.objects.create(title='Done', resolved=True)
+        for fmt in transfer.FORMATS:
+            resp = self.client.get(reverse('todo_export'), {'format': fmt})
+            self.assertTrue(resp.streaming)
+            self.assertIn(f'todos.{transfer.EXTENSIONS[fmt]}', resp['Content-Disposition'])
+            exported = b''.join(resp.streaming_content)
+            before = list(Todo.objects.order_by('id').values('title', 'description', 'due_date', 'resolved'))
+            Todo.objects.all().delete()
+            self.assertEqual(transfer.import_todos(io.BytesIO(exported), fmt).imported, 2)
+            self.assertEqual(list(Todo.objects.order_by('id').values('title', 'description', 'due_date', 'resolved')),
+                             before)
+
+        resolved = self.client.get(reverse('todo_export'), {'status': 'resolved'})
+        rows = csv.DictReader(io.StringIO(b''.join(resolved.streaming_content).decode()))
+        self.assertEqual([row['title'] for row in rows], ['Done'])
+        self.assertEqual(self.client.get(reverse('todo_export'), {'format': 'xml'}).status_code, 400)
+
+    async def test_export_streams_asynchronously_under_asgi(self):
+        await Todo.objects.acreate(title='Async')
+        resp = await self.async_client.get(reverse('todo_export'))
+        self.assertTrue(resp.is_async)
+        lines = [line async for chunk in resp.streaming_content for line in chunk.splitlines()]
+        self.assertEqual(lines[1].split(b',')[1], b'Async')
+
+    def test_import_view(self):
+        upload = SimpleUploadedFile('todos.csv', self.CSV.encode(), content_type='text/csv')
+        resp = self.client.post(reverse('todo_import'), {'file': upload})
+        self.assertContains(resp, 'Imported 2 tasks, skipped 2 invalid rows.')
+        self.assertContains(resp, 'Line 4: due_date:')
+        jsonl = SimpleUploadedFile('todos.txt', b'{"title": "Uploaded"}\n')
+        self.client.post(reverse('todo_import'), {'file': jsonl, 'format': 'json'})
+        self.assertTrue(Todo.objects.filter(title='Uploaded').exists())
+        self.assertEqual(self.client.post(reverse('todo_import')).context['form'].errors['file'],
+                         ['This field is required.'])
+
+    def test_commands(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source, target = os.path.join(tmp, 'in.csv'), os.path.join(tmp, 'out.jsonl')
+            with open(source, 'w') as f:
+                f.write(self.CSV)
+            out, err = io.StringIO(), io.StringIO()
+            call_command('import_todos', source, stdout=out, stderr=err)
+            self.assertIn('Imported 2 todos', out.getvalue())
+            self.assertIn('line 3: title:', err.getvalue())
+
+            call_command('export_todos', target, '--status', 'open')
+            with open(target) as f:
+                self.assertEqual([json.loads(line)['title'] for line in f], ['Pay rent'])
+
+
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = date.today()
+        for i in range(12):
+            Todo.objects.create(title=f'Admin {i}', due_date=self.today + timedelta(days=i - 4) if i % 3 else None,
+                                resolved=i % 4 == 0)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.url = reverse('admin:todo_todo_changelist')
+
+    def test_filters_are_counted_from_the_counters(self):
+        cases = [
+            ({}, Todo.objects.all()),
+            ({'resolved__exact': 0}, Todo.objects.filter(resolved=False)),
+            ({'due_date__lt': str(self.today)}, Todo.objects.filter(due_date__lt=self.today)),
+            ({'due_date__lt': str(self.today), 'resolved__exact': 0}, Todo.objects.overdue()),
+            ({'due_date__isnull': 'True', 'resolved__exact': 1}, Todo.objects.filter(due_date=None, resolved=True)),
+        ]
+        for params, expected in cases:
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(self.url, params)
+            self.assertEqual(resp.context['cl'].result_count, expected.count())
+            self.assertFalse([q['sql'] for q in queries if 'COUNT(' in q['sql'].upper()])
+            self.assertLessEqual(len(queries), 5)
+
+    def test_due_date_filter_lists_soonest_first(self):
+        resp = self.client.get(self.url, {'due_date__gte': str(self.today)})
+        self.assertEqual(list(resp.context['cl'].result_list),
+                         list(Todo.objects.filter(due_date__gte=self.today).order_by(*SOONEST_DUE)))
+        self.assertContains(resp, 'This week')
+        self.assertContains(resp, 'Past due date')
+
+    def test_search_count_is_capped_and_cached(self):
+        with mock.patch('todo.admin.ADMIN_COUNT_LIMIT', 5):
+            resp = self.client.get(self.url, {'q': 'admin'})
+            self.assertEqual(resp.context['cl'].result_count, 5)
+            self.assertContains(resp, '5+ todos')
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.url, {'q': 'admin'})
+            self.assertFalse([q['sql'] for q in queries if 'COUNT(' in q['sql'].upper()])
+        self.assertEqual(self.client.get(self.url, {'q': 'admin 1'}).context['cl'].result_count, 3)
+
+    def test_count_for_only_answers_bucket_filters(self):
+        self.assertEqual(counters.count_for(Todo.objects.filter(resolved=True, due_date__gte=self.today)),
+                         Todo.objects.filter(resolved=True, due_date__gte=self.today).count())
+        self.assertIsNone(counters.count_for(Todo.objects.filter(title='Admin 1')))
+        self.assertIsNone(counters.count_for(Todo.objects.exclude(resolved=True)))
+        self.assertIsNone(counters.count_for(Todo.objects.filter(models.Q(resolved=True) | models.Q(due_date=None))))
+
+
+
+
+class DatabaseSettingsTests(TestCase):
+    def pragma(self, name):
+        # A connection of its own: the test's transaction would block changing some pragmas
+        other = connection.copy()
+        try:
+            with other.cursor() as cursor:
+                cursor.execute(f'PRAGMA {name}')
+                return cursor.fetchone()[0]
+        finally:
+            other.close()
+
+    def test_sqlite_pragmas_are_applied_on_connect(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        self.assertEqual(self.pragma('cache_size'), settings.TODO_SQLITE_PRAGMAS['cache_size'])
+        with override_settings(TODO_SQLITE_PRAGMAS={'cache_size': -1024, 'synchronous': 'off'}):
+            self.assertEqual((self.pragma('cache_size'), self.pragma('synchronous')), (-1024, 0))
\ No newline at end of file
@@ -0,0 +1,265 @@
+"""Import and export of todos as CSV or JSON Lines, streamed both ways.
+
+Import reads rows one at a time from an open file, so an upload or a file on
+disk of any size is never held in memory. Each row is checked with the
+fields of ``TodoForm``, the same checks a form submission gets. Todo has no
+unique or cross-field rules, so running each field's ``clean`` is the whole
+of the form's validation, without building a form per row. Valid rows are
+inserted ``IMPORT_BATCH_SIZE`` at a time, each batch in its own transaction,
+with ``bulk_create`` or, on SQLite, one ``INSERT`` (see ``_insert``). Invalid
+rows are skipped and reported by line number. A line that is not UTF-8, or
+not CSV, ends the import there and is reported the same way. Only ``TodoForm``'s fields are read; ids and timestamps are assigned anew.
+
+Export writes the same fields as the API, in id order. Rows are read with
+``iterator()``, or ``aiterator()`` under ASGI, and written in blocks of lines.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .api import FIELDS, LINES_PER_CHUNK, STREAM_CHUNK_SIZE, TodoEncoder
+from .caching import bump_list_version
+from .forms import TodoForm
+from .models import Todo
+
+
+
+
+FORMATS = ('csv', 'json')
+CONTENT_TYPES = {'csv': 'text/csv', 'json': 'application/x-ndjson'}
+EXTENSIONS = {'csv': 'csv', 'json': 'jsonl'}
+IMPORT_BATCH_SIZE = getattr(settings, 'TODO_IMPORT_BATCH_SIZE', 5000)
+MAX_REPORTED_ERRORS = 20
+
+_form_fields = TodoForm.base_fields
+
+
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+    stopped: bool = False
+
+    def add_error(self, line, messages):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, messages))
+
+    def stop(self, line, message):
+        """Record why reading stopped at ``line``; nothing after it is imported"""
+        self.stopped = True
+        self.errors.append((line, {'__all__': [message]}))
+
+
+
+
+def format_for(filename, default='csv'):
+    """``csv`` or ``json`` from a file name's extension"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('json', 'jsonl', 'ndjson'):
+        return 'json'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+class UnreadableFile(ValueError):
+    """The file cannot be read past ``line``: it is not UTF-8 there, or not CSV"""
+
+    def __init__(self, line, message):
+        super().__init__(message)
+        self.line, self.message = line, message
+
+
+def _lines(stream):
+    """``(line number, text)`` for each line of ``stream``, decoding bytes (an upload or a binary file) as UTF-8.
+
+    Each line is decoded on its own, so a byte that is not UTF-8 is reported
+    on its own line rather than somewhere in a block read ahead.
+    """
+    if isinstance(stream, io.TextIOBase):
+        yield from enumerate(stream, start=1)
+        return
+    for line_number, line in enumerate(stream, start=1):
+        try:
+            # utf-8-sig drops the byte order mark spreadsheet programs put on CSV files
+            yield line_number, line.decode('utf-8-sig' if line_number == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            raise UnreadableFile(line_number, 'Not UTF-8 text; save the file as UTF-8 and import it again.')
+
+
+def read_rows(stream, fmt):
+    """``(line number, dict or None)`` for each record; None marks a line that is not a JSON object.
+
+    Raises ``UnreadableFile`` where the file stops being readable.
+    """
+    lines = _lines(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(line for _, line in lines)
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        except csv.Error as e:
+            raise UnreadableFile(reader.line_num, f'Not valid CSV: {e}.')
+        return
+    for line_number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+class RowCleaner:
+    """``TodoForm``'s field checks for one row after another.
+
+    Due dates and flags repeat across rows, so each distinct raw value of
+    those is cleaned once and the outcome reused. Text is checked every time.
+    """
+
+    def __init__(self):
+        self._memo = {name: {} for name, form_field in _form_fields.items()
+                      if not isinstance(form_field, forms.CharField)}
+
+    def _clean(self, name, value):
+        memo = self._memo.get(name)
+        if memo is None:
+            return _form_fields[name].clean(value)
+        key = value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+        if key not in memo:
+            try:
+                memo[key] = _form_fields[name].clean(value), None
+            except ValidationError as e:
+                memo[key] = None, e
+        cleaned, error = memo[key]
+        if error:
+            raise error
+        return cleaned
+
+    def __call__(self, row):
+        """``(values, None)``, or ``(None, {field: [messages]})``"""
+        values, errors = {}, {}
+        for name in _form_fields:
+            try:
+                values[name] = self._clean(name, row.get(name))
+            except ValidationError as e:
+                errors[name] = e.messages
+        return (None, errors) if errors else (values, None)
+
+
+def _insert(rows):
+    """Insert cleaned rows in one transaction.
+
+    On SQLite the batch is one ``INSERT ... SELECT`` over a JSON array. The
+    search index (FTS5) writes out its pending entries at the end of every
+    statement, and ``bulk_create`` can only put 166 rows in a statement
+    there, so a statement per batch is several times faster. The triggers
+    still keep the search index and counters current.
+    """
+    with transaction.atomic():
+        if connection.vendor != 'sqlite':
+            Todo.objects.bulk_create(Todo(**row) for row in rows)
+            return
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        batch = json.dumps([
+            [row['title'], row['description'], connection.ops.adapt_datefield_value(row['due_date']), row['resolved']]
+            for row in rows
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO todo_todo (title, description, due_date, resolved, created_at, updated_at) '
+                "SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]'), "
+                "json_extract(value, '$[3]'), %s, %s FROM json_each(%s)",
+                [now, now, batch],
+            )
+
+
+def import_todos(stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """Validate and insert every row of ``stream``; returns an ``ImportResult``"""
+    result, batch, clean = ImportResult(), [], RowCleaner()
+    try:
+        try:
+            for line, row in read_rows(stream, fmt):
+                if row is None:
+                    result.add_error(line, {'__all__': ['Not a JSON object.']})
+                    continue
+                values, errors = clean(row)
+                if errors:
+                    result.add_error(line, errors)
+                    continue
+                batch.append(values)
+                if len(batch) == batch_size:
+                    _insert(batch)
+                    result.imported += len(batch)
+                    batch = []
+        except UnreadableFile as e:
+            # Earlier batches are committed, so the valid rows before the line are kept too
+            result.stop(e.line, e.message)
+        if batch:
+            _insert(batch)
+            result.imported += len(batch)
+    finally:
+        # Neither insert sends signals
+        if result.imported:
+            bump_list_version()
+    return result
+
+
+
+
+class _Echo:
+    """A file-like ``write`` that returns the line, so ``csv.writer`` formats without buffering"""
+
+    def write(self, value):
+        return value
+
+
+def _line_encoder(fmt):
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        return lambda row: writer.writerow([row[name] for name in FIELDS])
+    encode = TodoEncoder().encode
+    return lambda row: encode(row) + '\n'
+
+
+def _header(fmt):
+    return csv.writer(_Echo()).writerow(FIELDS) if fmt == 'csv' else ''
+
+
+def export_queryset(status='all'):
+    return Todo.objects.with_status(status).order_by('id').values(*FIELDS)
+
+
+def export_lines(rows, fmt):
+    """The export of ``rows`` in blocks of ``LINES_PER_CHUNK`` lines"""
+    encode, block = _line_encoder(fmt), [_header(fmt)]
+    for row in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        block.append(encode(row))
+        if len(block) >= LINES_PER_CHUNK:
+            yield ''.join(block)
+            block = []
+    if any(block):
+        yield ''.join(block)
+
+
+async def aexport_lines(rows, fmt):
+    encode, block = _line_encoder(fmt), [_header(fmt)]
+    async for row in rows.aiterator(chunk_size=STREAM_CHUNK_SIZE):
+        block.append(encode(row))
+        if len(block) >= LINES_PER_CHUNK:
+            yield ''.join(block)
+            block = []
+    if any(block):
+        yield ''.join(block)
\ No newline at end of file
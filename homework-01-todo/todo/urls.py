@@ -1,11 +1,23 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('open/', views.home, {'status': 'open'}, name='todo_open'),
+    path('resolved/', views.home, {'status': 'resolved'}, name='todo_resolved'),
+    path('overdue/', views.home, {'status': 'overdue'}, name='todo_overdue'),
+    path('today/', views.home, {'status': 'today'}, name='todo_today'),
+    path('week/', views.home, {'status': 'week'}, name='todo_week'),
+    path('search/', views.todo_search, name='todo_search'),
     path('todo/create/', views.todo_create, name='todo_create'),
     path('todo/<int:pk>/edit/', views.todo_edit, name='todo_edit'),
     path('todo/<int:pk>/delete/', views.todo_delete, name='todo_delete'),
     path('todo/<int:pk>/toggle/', views.todo_toggle_resolved, name='todo_toggle'),
+    path('todo/bulk/<str:action>/', views.todo_bulk, name='todo_bulk'),
+    path('todo/import/', views.todo_import, name='todo_import'),
+    path('todo/export/', views.todo_export, name='todo_export'),
+    path('api/todos/', api.todo_list, name='api_todo_list'),
+    path('api/todos/<int:pk>/', api.todo_detail, name='api_todo_detail'),
+    path('api/todos/bulk/<str:action>/', api.todo_bulk, name='api_todo_bulk'),
 ]
\ No newline at end of file
@@ -1,23 +1,110 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse
-from .models import Todo
-from .forms import TodoForm
+from django.utils.safestring import mark_safe
+from . import bulk, transfer
+from .caching import FRAGMENT_TIMEOUT, list_fragment_key, list_modified, page_etag, todo_counts
+from .decorators import condition, require_POST
+from .models import NEWEST_FIRST, STATUS_LABELS, STATUS_ORDERING, STATUSES, Todo
+from .forms import BulkActionForm, ImportForm, TodoForm
+from .pagination import apaginate
+from .search import search
 
 
 
 
-def home(request):
-    todos = Todo.objects.all()
-    return render(request, 'todo/home.html', {'todos': todos})
+def _status(request, status=None):
+    status = status or request.GET.get('status', 'all')
+    return status if status in STATUSES else 'all'
 
 
+def _tabs(counts):
+    return [
+        {
+            'name': name,
+            'label': STATUS_LABELS.get(name, name.capitalize()),
+            'url': reverse('home' if name == 'all' else f'todo_{name}'),
+            'count': counts[name],
+        }
+        for name in STATUSES
+    ]
 
 
-def todo_create(request):
+def _list_etag(request, *args, **kwargs):
+    return page_etag(request)
+
+
+def _list_modified(request, *args, **kwargs):
+    return list_modified()
+
+
+def _cached_list(status, after, before):
+    """Counts, list fragment key and cached fragment, read in one trip to a thread"""
+    key = list_fragment_key(status, after, before)
+    return todo_counts(), key, cache.get(key)
+
+
+def _render_list(context):
+    """The list fragment; its per-card {% cache %} tags read the cache synchronously, so this runs in a thread"""
+    return render_to_string('todo/todo_list.html', context)
+
+
+def _import_upload(request):
+    """Bind the upload form and import the file; request.FILES parses the body, so this runs in a thread"""
+    form = ImportForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return form, None
+    upload = form.cleaned_data['file']
+    fmt = form.cleaned_data['format'] or transfer.format_for(upload.name)
+    # The underlying file: a temporary file on disk once the upload passes FILE_UPLOAD_MAX_MEMORY_SIZE
+    return form, transfer.import_todos(upload.file, fmt)
+
+
+async def _get_todo(pk):
+    try:
+        return await Todo.objects.aget(pk=pk)
+    except Todo.DoesNotExist:
+        raise Http404('No Todo matches the given query.')
+
+
+
+
+@condition(etag_func=_list_etag, last_modified_func=_list_modified)
+async def home(request, status=None):
+    status = _status(request, status)
+    after, before = request.GET.get('after'), request.GET.get('before')
+    counts, key, fragment = await sync_to_async(_cached_list)(status, after, before)
+    context = {'counts': counts, 'status': status, 'tabs': _tabs(counts), 'todos': None, 'page': None}
+
+    # The rendered list is shared by everyone until the next write
+    if fragment is None:
+        page = await apaginate(Todo.objects.with_status(status), after=after, before=before,
+                               ordering=STATUS_ORDERING.get(status, NEWEST_FIRST))
+        context.update(todos=page.items, page=page)
+        fragment = await sync_to_async(_render_list)(context)
+        await cache.aset(key, fragment, FRAGMENT_TIMEOUT)
+    return render(request, 'todo/home.html', {**context, 'todo_list': mark_safe(fragment)})
+
+
+
+
+async def todo_search(request):
+    query = request.GET.get('q', '').strip()
+    results = await sync_to_async(search)(query) if query else []
+    return render(request, 'todo/search.html', {'query': query, 'results': results})
+
+
+
+
+async def todo_create(request):
     if request.method == 'POST':
         form = TodoForm(request.POST)
         if form.is_valid():
-            form.save()
+            await form.save(commit=False).asave()
             return redirect('home')
     else:
         form = TodoForm()
@@ -26,12 +113,13 @@ def todo_create(request):
 
 
 
-def todo_edit(request, pk):
-    todo = get_object_or_404(Todo, pk=pk)
+@condition(etag_func=lambda request, pk: page_etag(request, pk))
+async def todo_edit(request, pk):
+    todo = await _get_todo(pk)
     if request.method == 'POST':
         form = TodoForm(request.POST, instance=todo)
         if form.is_valid():
-            form.save()
+            await form.save(commit=False).asave()
             return redirect('home')
     else:
         form = TodoForm(instance=todo)
@@ -40,18 +128,59 @@ def todo_edit(request, pk):
 
 
 
-def todo_delete(request, pk):
-    todo = get_object_or_404(Todo, pk=pk)
+async def todo_delete(request, pk):
+    todo = await _get_todo(pk)
     if request.method == 'POST':
-        todo.delete()
+        await todo.adelete()
         return redirect('home')
     return render(request, 'todo/todo_form.html', {'form': None, 'action': 'Delete', 'todo': todo})
 
 
 
 
-def todo_toggle_resolved(request, pk):
-    todo = get_object_or_404(Todo, pk=pk)
-    todo.resolved = not todo.resolved
-    todo.save()
-    return redirect('home')
\ No newline at end of file
+async def todo_toggle_resolved(request, pk):
+    if not await bulk.atoggle_resolved(pk):
+        raise Http404('No Todo matches the given query.')
+    return redirect('home')
+
+
+
+
+@require_POST
+async def todo_bulk(request, action):
+    if action not in bulk.ACTIONS:
+        raise Http404('Unknown bulk action.')
+    form = BulkActionForm(request.POST, action=action)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    await sync_to_async(bulk.apply)(action, **form.cleaned_data)
+    status = form.cleaned_data['status'] or 'all'
+    return redirect(f"{reverse('home')}?status={status}")
+
+
+
+
+async def todo_import(request):
+    result = None
+    if request.method == 'POST':
+        form, result = await sync_to_async(_import_upload)(request)
+    else:
+        form = ImportForm()
+    return render(request, 'todo/import.html', {'form': form, 'result': result})
+
+
+
+
+async def todo_export(request):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in transfer.FORMATS:
+        return HttpResponseBadRequest(f'format must be one of {", ".join(transfer.FORMATS)}.')
+    rows = transfer.export_queryset(_status(request))
+    if isinstance(request, ASGIRequest):
+        # Under ASGI, Django reads a sync iterator into memory before sending it
+        lines = transfer.aexport_lines(rows, fmt)
+    else:
+        lines = transfer.export_lines(rows, fmt)
+    response = StreamingHttpResponse(lines, content_type=transfer.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="todos.{transfer.EXTENSIONS[fmt]}"'
+    return response
\ No newline at end of file
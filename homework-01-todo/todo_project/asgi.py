@@ -0,0 +1,9 @@
+import os
+from django.core.asgi import get_asgi_application
+
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_project.settings')
+# Each ASGI request runs its sync code in a new thread, so a connection kept
+# for the thread would never be reused (see DATABASES in settings.py)
+os.environ.setdefault('TODO_DB_CONN_MAX_AGE', '0')
+application = get_asgi_application()
\ No newline at end of file
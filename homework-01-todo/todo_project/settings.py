@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 
@@ -58,10 +59,77 @@ TEMPLATES = [
 WSGI_APPLICATION = 'todo_project.wsgi.application'
 
 
+ASGI_APPLICATION = 'todo_project.asgi.application'
+
+
+# SQLite by default. TODO_DB=postgres uses PostgreSQL instead (pip install
+# "psycopg[binary]"), configured by the TODO_DB_* variables.
+TODO_DB = os.environ.get('TODO_DB', 'sqlite')
+
+
+DATABASE_PROFILES = {
+'sqlite': {
+'ENGINE': 'django.db.backends.sqlite3',
+'NAME': os.environ.get('TODO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+# Seconds a write waits for another one to commit before "database is locked"
+'OPTIONS': {'timeout': float(os.environ.get('TODO_DB_TIMEOUT', 20))},
+},
+'postgres': {
+'ENGINE': 'django.db.backends.postgresql',
+'NAME': os.environ.get('TODO_DB_NAME', 'todo'),
+'USER': os.environ.get('TODO_DB_USER', ''),
+'PASSWORD': os.environ.get('TODO_DB_PASSWORD', ''),
+'HOST': os.environ.get('TODO_DB_HOST', ''),
+'PORT': os.environ.get('TODO_DB_PORT', ''),
+},
+}
+
+
+# A worker thread keeps its connection for CONN_MAX_AGE seconds instead of
+# opening one per request, and checks it still works before reusing it.
+# Under ASGI each request runs in a thread of its own, so asgi.py defaults it
+# to 0 there; put a pooler such as PgBouncer in front of PostgreSQL instead.
 DATABASES = {
 'default': {
-'ENGINE': 'django.db.backends.sqlite3',
-'NAME': BASE_DIR / 'db.sqlite3',
+**DATABASE_PROFILES[TODO_DB],
+'CONN_MAX_AGE': int(os.environ.get('TODO_DB_CONN_MAX_AGE', 60)),
+'CONN_HEALTH_CHECKS': True,
+}
+}
+
+
+# Run on every new SQLite connection (see todo/signals.py). WAL lets reads go
+# on while a write commits and, with synchronous=normal, makes a commit one
+# append to the log. mmap_size and cache_size (negative: KiB) last for the
+# connection, so they pay off with CONN_MAX_AGE.
+TODO_SQLITE_PRAGMAS = {
+'journal_mode': os.environ.get('TODO_SQLITE_JOURNAL_MODE', 'wal'),
+'synchronous': os.environ.get('TODO_SQLITE_SYNCHRONOUS', 'normal'),
+'mmap_size': int(os.environ.get('TODO_SQLITE_MMAP_SIZE', 256 * 2 ** 20)),
+'cache_size': int(os.environ.get('TODO_SQLITE_CACHE_SIZE', -64 * 1024)),
+'temp_store': 'memory',
+}
+
+
+# Rendered fragments, counts and the list version live here. The local-memory
+# default is per process, so with several WSGI workers use "file" or "db"
+# (run "python manage.py createcachetable" for "db") so a write in one worker
+# invalidates the others.
+TODO_CACHE = os.environ.get('TODO_CACHE', 'locmem')
+
+
+CACHE_BACKENDS = {
+'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'todo'),
+'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+'db': ('django.core.cache.backends.db.DatabaseCache', 'todo_cache'),
+}
+
+
+CACHES = {
+'default': {
+'BACKEND': CACHE_BACKENDS[TODO_CACHE][0],
+'LOCATION': os.environ.get('TODO_CACHE_LOCATION', CACHE_BACKENDS[TODO_CACHE][1]),
+'TIMEOUT': 600,
 }
 }
 
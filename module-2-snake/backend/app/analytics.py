@@ -0,0 +1,524 @@
+"""Columnar analytics over the ``games`` and ``leaderboard`` tables.
+
+Reports cover the whole history, so they never loop over ORM objects.
+Instead the rows they need are kept as NumPy column arrays:
+
+- ``games``: finished games only.
+- ``leaderboard``: every submitted score.
+
+Each table has the columns ``user_id``, ``score``, ``duration``, ``mode``
+(a small integer code) and ``at`` (epoch seconds).
+
+The snapshot lives under ``ANALYTICS_DIR`` as ``.npz`` parts plus a JSON
+manifest, so a restart does not reread the tables. A refresh reads only rows
+past the stored watermark, ``ANALYTICS_CHUNK_ROWS`` at a time by keyset:
+
+- ``games``: the id watermark. Games still active at that point are
+  remembered and picked up when they finish. They are forgotten after
+  ``ANALYTICS_OPEN_GAME_HOURS``.
+- ``leaderboard``: uses a ``(timestamp, id)`` watermark because its ids are
+  UUIDs. Rows newer than ``ANALYTICS_SETTLE_SECONDS`` are left for the next
+  refresh, so a slow commit is never skipped.
+
+Each refresh appends one part. Once there are more than ``MAX_PARTS``
+parts they are compacted into one.
+
+With ``DATABASE_SHARD_URLS`` set, every shard is read with its own
+watermark. Reports then run as vectorised NumPy over the concatenated
+columns.
+
+    python -m app.analytics refresh
+    python -m app.analytics report scores --mode walls
+
+NumPy is optional. Without it the admin routes return ``503``. It is imported
+on first use, not when a worker starts, since it adds about 70 ms to startup.
+"""
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import select, tuple_
+
+from app.database import SessionLocal
+from app.db_models import Game, LeaderboardEntryDB
+
+np = None  # imported on first use by _load_numpy
+
+try:
+    import fcntl
+except ImportError:  # optional, not on Windows
+    fcntl = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "./analytics")
+ANALYTICS_CHUNK_ROWS = int(os.getenv("ANALYTICS_CHUNK_ROWS", "50000"))
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "300"))
+ANALYTICS_SETTLE_SECONDS = float(os.getenv("ANALYTICS_SETTLE_SECONDS", "30"))
+ANALYTICS_OPEN_GAME_HOURS = float(os.getenv("ANALYTICS_OPEN_GAME_HOURS", "24"))
+
+MAX_PARTS = 16
+TABLES = ("games", "leaderboard")
+COLUMNS = {"user_id": "int64", "score": "int64", "duration": "int64", "mode": "int16", "at": "float64"}
+PERIODS = {"day": 86400, "week": 7 * 86400}
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+
+def _load_numpy() -> bool:
+    """Import NumPy into ``np`` if it is not already; False when it is not installed"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # optional
+            return False
+        np = numpy
+    return True
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    if value is None:
+        return float("nan")
+    if value.tzinfo is not None:
+        return value.timestamp()
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+def _utc_naive(epoch: float) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch)
+
+
+class ColumnSnapshot:
+    """One table's columns, stored as ``.npz`` parts under ``directory``"""
+
+    def __init__(self, directory: str, table: str):
+        self.directory = directory
+        self.table = table
+        self.meta = {"parts": [], "watermarks": {}, "open": {}, "modes": [], "refreshed_at": None}
+        self.columns = _empty_columns()
+        self._loaded_parts: List[str] = []
+
+    @property
+    def rows(self) -> int:
+        return len(self.columns["score"])
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def load(self):
+        """Read the manifest and any parts written since the last load"""
+        path = self._path(f"{self.table}.json")
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            self.meta = json.load(f)
+        parts = self.meta["parts"]
+        if parts[:len(self._loaded_parts)] != self._loaded_parts:
+            self.columns, self._loaded_parts = _empty_columns(), []
+        new = parts[len(self._loaded_parts):]
+        if new:
+            loaded = [self.columns]
+            for name in new:
+                with np.load(self._path(name)) as part:
+                    loaded.append({column: part[column] for column in COLUMNS})
+            self.columns = _concat(loaded)
+            self._loaded_parts = list(parts)
+
+    def mode_code(self, mode: Optional[str]) -> int:
+        modes = self.meta["modes"]
+        mode = mode or "walls"
+        if mode not in modes:
+            modes.append(mode)
+        return modes.index(mode)
+
+    def append(self, columns: Dict[str, "np.ndarray"]):
+        """Write ``columns`` as a new part (compacting if needed) and save the manifest"""
+        os.makedirs(self.directory, exist_ok=True)
+        stale: List[str] = []
+        if len(columns["score"]):
+            self.columns = _concat([self.columns, columns])
+            if len(self.meta["parts"]) >= MAX_PARTS:
+                stale, self.meta["parts"] = self.meta["parts"], []
+                columns = self.columns
+            name = f"{self.table}-{uuid.uuid4().hex[:12]}.npz"
+            np.savez(self._path(name), **columns)
+            self.meta["parts"].append(name)
+            self._loaded_parts = list(self.meta["parts"])
+        self.meta["refreshed_at"] = time.time()
+        tmp = self._path(f".{self.table}.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._path(f"{self.table}.json"))
+        for name in stale:
+            os.remove(self._path(name))
+
+
+def _empty_columns() -> Dict[str, "np.ndarray"]:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def _concat(parts: List[Dict[str, "np.ndarray"]]) -> Dict[str, "np.ndarray"]:
+    return {name: np.concatenate([part[name] for part in parts]).astype(dtype, copy=False)
+            for name, dtype in COLUMNS.items()}
+
+
+class _Columns:
+    """Accumulates row chunks as arrays"""
+
+    def __init__(self, snapshot: ColumnSnapshot):
+        self.snapshot = snapshot
+        self.chunks: List[Dict[str, "np.ndarray"]] = []
+
+    def add(self, rows: List[tuple]):
+        """Add ``(user_id, score, duration, mode, at)`` rows"""
+        if not rows:
+            return
+        user_ids, scores, durations, modes, at = zip(*rows)
+        self.chunks.append({
+            "user_id": np.array(user_ids, dtype="int64"),
+            "score": np.array(scores, dtype="int64"),
+            "duration": np.array([d or 0 for d in durations], dtype="int64"),
+            "mode": np.array([self.snapshot.mode_code(m) for m in modes], dtype="int16"),
+            "at": np.array([_epoch(t) for t in at], dtype="float64"),
+        })
+
+    def result(self) -> Dict[str, "np.ndarray"]:
+        return _concat(self.chunks) if self.chunks else _empty_columns()
+
+
+def _read_games(db, snapshot: ColumnSnapshot, source: str, out: _Columns, chunk: int, now: float) -> int:
+    """Finished games past the id watermark, plus remembered games that have since finished"""
+    watermark = snapshot.meta["watermarks"].get(source, 0)
+    still_open = []
+    added = 0
+    fields = (Game.id, Game.user_id, Game.score, Game.duration, Game.mode, Game.is_active,
+              Game.started_at, Game.ended_at)
+    abandon_before = now - ANALYTICS_OPEN_GAME_HOURS * 3600
+
+    def take(rows):
+        nonlocal added
+        finished = []
+        for game_id, user_id, score, duration, mode, is_active, started_at, ended_at in rows:
+            if not is_active:
+                finished.append((user_id, score, duration, mode, ended_at or started_at))
+            elif _epoch(started_at) >= abandon_before:
+                still_open.append(game_id)
+        out.add(finished)
+        added += len(finished)
+
+    previously_open = snapshot.meta["open"].get(source, [])
+    for start in range(0, len(previously_open), 500):
+        take(db.execute(select(*fields).where(Game.id.in_(previously_open[start:start + 500]))).all())
+    while True:
+        rows = db.execute(select(*fields).where(Game.id > watermark).order_by(Game.id).limit(chunk)).all()
+        take(rows)
+        if rows:
+            watermark = rows[-1][0]
+        if len(rows) < chunk:
+            break
+    snapshot.meta["watermarks"][source] = watermark
+    snapshot.meta["open"][source] = sorted(still_open)
+    return added
+
+
+def _read_leaderboard(db, snapshot: ColumnSnapshot, source: str, out: _Columns, chunk: int, now: float) -> int:
+    """Leaderboard rows past the ``(timestamp, id)`` watermark that are old enough to be settled"""
+    stored = snapshot.meta["watermarks"].get(source)
+    watermark: Optional[Tuple[datetime, str]] = (datetime.fromisoformat(stored[0]), stored[1]) if stored else None
+    settled = _utc_naive(now - ANALYTICS_SETTLE_SECONDS)
+    added = 0
+    key = tuple_(LeaderboardEntryDB.timestamp, LeaderboardEntryDB.id)
+    while True:
+        query = select(LeaderboardEntryDB.timestamp, LeaderboardEntryDB.id, LeaderboardEntryDB.user_id,
+                       LeaderboardEntryDB.score, LeaderboardEntryDB.duration, LeaderboardEntryDB.mode) \
+            .where(LeaderboardEntryDB.timestamp < settled)
+        if watermark is not None:
+            query = query.where(key > tuple_(*watermark))
+        rows = db.execute(query.order_by(LeaderboardEntryDB.timestamp, LeaderboardEntryDB.id).limit(chunk)).all()
+        out.add([(user_id, score, duration, mode, timestamp)
+                 for timestamp, _, user_id, score, duration, mode in rows])
+        added += len(rows)
+        if rows:
+            timestamp, entry_id = rows[-1][0], rows[-1][1]
+            watermark = (timestamp.replace(tzinfo=None), entry_id)
+        if len(rows) < chunk:
+            break
+    if watermark is not None:
+        snapshot.meta["watermarks"][source] = [watermark[0].isoformat(), watermark[1]]
+    return added
+
+
+READERS = {"games": _read_games, "leaderboard": _read_leaderboard}
+
+
+def default_sources() -> List[Tuple[str, Callable]]:
+    """``(name, session factory)`` for the main database or each shard"""
+    from app.sharding import shards
+
+    if shards.enabled:
+        return [(f"shard{i}", factory) for i, factory in enumerate(shards.sessions)]
+    return [("main", SessionLocal)]
+
+
+class Analytics:
+    """Columnar snapshots of both tables and the reports over them"""
+
+    def __init__(self, directory: str = ANALYTICS_DIR, sources: Optional[Callable] = None,
+                 refresh_interval: float = ANALYTICS_REFRESH_SECONDS, chunk_rows: int = ANALYTICS_CHUNK_ROWS):
+        self.directory = directory
+        self.sources = sources or default_sources
+        self.refresh_interval = refresh_interval
+        self.chunk_rows = chunk_rows
+        self._snapshots: Dict[str, ColumnSnapshot] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return _load_numpy()
+
+    @contextmanager
+    def _file_lock(self):
+        """Keep two processes from appending the same rows"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _snapshot(self, table: str) -> ColumnSnapshot:
+        snapshot = self._snapshots.get(table)
+        if snapshot is None:
+            snapshot = self._snapshots[table] = ColumnSnapshot(self.directory, table)
+        return snapshot
+
+    def refresh(self, tables=TABLES) -> Dict[str, int]:
+        """Append rows written since the last refresh; returns rows added per table"""
+        _load_numpy()
+        now = time.time()
+        added = {}
+        with self._lock, self._file_lock():
+            for table in tables:
+                snapshot = self._snapshot(table)
+                snapshot.load()
+                out = _Columns(snapshot)
+                added[table] = 0
+                for source, session_factory in self.sources():
+                    with session_factory() as db:
+                        added[table] += READERS[table](db, snapshot, source, out, self.chunk_rows, now)
+                snapshot.append(out.result())
+        return added
+
+    def snapshot(self, table: str) -> ColumnSnapshot:
+        """The table's snapshot, refreshed first if it is older than ``refresh_interval``"""
+        _load_numpy()
+        with self._lock:
+            snapshot = self._snapshot(table)
+            snapshot.load()
+            refreshed_at = snapshot.meta["refreshed_at"]
+        if refreshed_at is None or time.time() - refreshed_at > self.refresh_interval:
+            self.refresh([table])
+        return snapshot
+
+    def status(self) -> dict:
+        _load_numpy()
+        with self._lock:
+            tables = {}
+            for table in TABLES:
+                snapshot = self._snapshot(table)
+                snapshot.load()
+                tables[table] = {
+                    "rows": snapshot.rows,
+                    "parts": len(snapshot.meta["parts"]),
+                    "watermarks": snapshot.meta["watermarks"],
+                    "open_games": sum(len(ids) for ids in snapshot.meta["open"].values()),
+                    "refreshed_at": snapshot.meta["refreshed_at"],
+                }
+        return {"directory": self.directory, "tables": tables}
+
+    def report(self, name: str, table: str = "games", mode: Optional[str] = None, **params) -> dict:
+        _load_numpy()
+        snapshot = self.snapshot(table)
+        columns = snapshot.columns
+        modes = snapshot.meta["modes"]
+        if mode is None:
+            mask = np.ones(len(columns["score"]), dtype=bool)
+        elif mode in modes:
+            mask = columns["mode"] == modes.index(mode)
+        else:
+            mask = np.zeros(len(columns["score"]), dtype=bool)
+        selected = {column: values[mask] for column, values in columns.items()}
+        return {"table": table, "mode": mode, "rows": int(mask.sum()),
+                **REPORTS[name](selected, modes, **params)}
+
+
+def score_distribution(columns, modes, bins: int = 20) -> dict:
+    """Summary statistics, percentiles and a histogram of scores per mode"""
+    result = {}
+    for code, mode in enumerate(modes):
+        scores = columns["score"][columns["mode"] == code]
+        if not len(scores):
+            continue
+        cuts = np.percentile(scores, PERCENTILES)
+        top = max(float(cuts[-1]), 1.0)
+        counts, edges = np.histogram(np.clip(scores, 0, top), bins=bins, range=(0, top))
+        result[mode] = {
+            "games": int(len(scores)),
+            "mean": round(float(scores.mean()), 2),
+            "std": round(float(scores.std()), 2),
+            "min": int(scores.min()),
+            "max": int(scores.max()),
+            "percentiles": {f"p{p}": round(float(v), 1) for p, v in zip(PERCENTILES, cuts)},
+            # The last bin also holds everything above p99
+            "histogram": {"edges": [round(float(e), 1) for e in edges], "counts": counts.tolist()},
+        }
+    return {"modes": result}
+
+
+def duration_curve(columns, modes, bins: int = 10) -> dict:
+    """Mean and median score for equal-population duration bins"""
+    durations, scores = columns["duration"], columns["score"]
+    if not len(durations):
+        return {"bins": []}
+    edges = np.unique(np.quantile(durations, np.linspace(0, 1, bins + 1)))
+    if len(edges) == 1:
+        edges = np.array([edges[0], edges[0] + 1])
+    index = np.clip(np.searchsorted(edges, durations, side="right") - 1, 0, len(edges) - 2)
+    counts = np.bincount(index, minlength=len(edges) - 1)
+    sums = np.bincount(index, weights=scores, minlength=len(edges) - 1)
+    ordered = scores[np.lexsort((scores, index))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = []
+    for i, count in enumerate(counts):
+        if not count:
+            continue
+        middle = starts[i] + (count - 1) // 2
+        median = ordered[middle] if count % 2 else (ordered[middle] + ordered[middle + 1]) / 2
+        result.append({
+            "duration_from": float(edges[i]),
+            "duration_to": float(edges[i + 1]),
+            "games": int(count),
+            "mean_score": round(float(sums[i] / count), 2),
+            "median_score": float(median),
+        })
+    return {"bins": result}
+
+
+def retention_cohorts(columns, modes, period: str = "week", periods: int = 8) -> dict:
+    """Share of each first-play cohort still playing N periods later"""
+    length = PERIODS[period]
+    at = columns["at"]
+    valid = ~np.isnan(at)
+    user_ids, at = columns["user_id"][valid], at[valid]
+    if not len(at):
+        return {"period": period, "cohorts": []}
+    slot = (at // length).astype("int64")
+    users, inverse = np.unique(user_ids, return_inverse=True)
+    first = np.full(len(users), np.iinfo("int64").max)
+    np.minimum.at(first, inverse, slot)
+    offset = slot - first[inverse]
+    keep = offset < periods
+    # One (user, offset) pair per user per active period
+    pairs = np.unique(inverse[keep] * periods + offset[keep])
+    cohort_of_pair = first[pairs // periods]
+    cohorts, cohort_index = np.unique(cohort_of_pair, return_inverse=True)
+    matrix = np.bincount(cohort_index * periods + pairs % periods,
+                         minlength=len(cohorts) * periods).reshape(len(cohorts), periods)
+    current = int(time.time() // length)
+    result = []
+    for cohort, row in zip(cohorts, matrix):
+        observed = min(periods, current - int(cohort) + 1)
+        result.append({
+            "cohort": _utc_naive(int(cohort) * length).date().isoformat(),
+            "users": int(row[0]),
+            "retention": [round(float(n / row[0]), 4) for n in row[:observed]],
+        })
+    return {"period": period, "cohorts": result}
+
+
+def user_trends(columns, modes, min_games: int = 5, limit: int = 20, user_id: Optional[int] = None) -> dict:
+    """Per-player games, mean and best score, and score slope per game played"""
+    order = np.lexsort((columns["at"], columns["user_id"]))
+    players, scores = columns["user_id"][order], columns["score"][order].astype("float64")
+    if not len(scores):
+        return {"players": 0, "users": []}
+    users, starts, counts = np.unique(players, return_index=True, return_counts=True)
+    group = np.repeat(np.arange(len(users)), counts)
+    x = np.arange(len(scores)) - np.repeat(starts, counts)
+    n = counts.astype("float64")
+    sx, sy = np.bincount(group, x), np.bincount(group, scores)
+    sxx, sxy = np.bincount(group, x * x), np.bincount(group, x * scores)
+    denominator = n * sxx - sx * sx
+    slope = np.divide(n * sxy - sx * sy, denominator, out=np.zeros_like(n), where=denominator > 0)
+    best = np.maximum.reduceat(scores, starts)
+    chosen = np.flatnonzero(counts >= min_games)
+    if user_id is not None:
+        chosen = chosen[users[chosen] == user_id]
+    chosen = chosen[np.argsort(-slope[chosen], kind="stable")][:limit]
+    return {
+        "players": int((counts >= min_games).sum()),
+        "users": [{
+            "user_id": int(users[i]),
+            "games": int(counts[i]),
+            "mean_score": round(float(sy[i] / n[i]), 2),
+            "best_score": int(best[i]),
+            "slope": round(float(slope[i]), 4),
+        } for i in chosen],
+    }
+
+
+REPORTS = {
+    "scores": score_distribution,
+    "durations": duration_curve,
+    "retention": retention_cohorts,
+    "trends": user_trends,
+}
+
+analytics = Analytics()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar analytics over games and leaderboard")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("refresh", help="append rows written since the last refresh")
+    sub.add_parser("status", help="show snapshot sizes and watermarks")
+    report = sub.add_parser("report", help="print a report as JSON")
+    report.add_argument("name", choices=sorted(REPORTS))
+    report.add_argument("--table", choices=TABLES, default="games")
+    report.add_argument("--mode")
+    report.add_argument("--bins", type=int)
+    report.add_argument("--period", choices=sorted(PERIODS))
+    report.add_argument("--periods", type=int)
+    report.add_argument("--min-games", type=int)
+    report.add_argument("--limit", type=int)
+    report.add_argument("--user-id", type=int)
+    args = parser.parse_args(argv)
+
+    if not _load_numpy():
+        parser.exit(1, "analytics needs numpy (pip install numpy)\n")
+    if args.command == "refresh":
+        t = time.perf_counter()
+        added = analytics.refresh()
+        print(f"added {added} rows in {time.perf_counter() - t:.2f}s")
+    elif args.command == "status":
+        print(json.dumps(analytics.status(), indent=2))
+    else:
+        accepted = {
+            "scores": ("bins",), "durations": ("bins",), "retention": ("period", "periods"),
+            "trends": ("min_games", "limit", "user_id"),
+        }[args.name]
+        params = {name: getattr(args, name) for name in accepted if getattr(args, name) is not None}
+        print(json.dumps(analytics.report(args.name, table=args.table, mode=args.mode, **params), indent=2))
+
+
+if __name__ == "__main__":
+    main()
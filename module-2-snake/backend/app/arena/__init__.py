@@ -0,0 +1 @@
+# Multiplayer arena package
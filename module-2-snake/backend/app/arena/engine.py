@@ -0,0 +1,259 @@
+"""Authoritative snake simulation for a single arena room"""
+from collections import deque
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+Cell = Tuple[int, int]
+
+DIRECTIONS = {
+    "up": (0, -1),
+    "down": (0, 1),
+    "left": (-1, 0),
+    "right": (1, 0),
+}
+OPPOSITE = {"up": "down", "down": "up", "left": "right", "right": "left"}
+
+FOOD_SCORE = 10
+START_LENGTH = 3
+
+
+class SpatialHash:
+    """Bucketed grid index of occupied cells.
+
+    Cells are grouped into square buckets so that point lookups and
+    neighbourhood scans touch only a handful of small dicts regardless of
+    how many snakes share the room.
+    """
+
+    __slots__ = ("bucket_size", "_buckets")
+
+    def __init__(self, bucket_size: int = 8):
+        self.bucket_size = bucket_size
+        self._buckets: Dict[Cell, Dict[Cell, int]] = {}
+
+    def clear(self):
+        self._buckets.clear()
+
+    def insert(self, x: int, y: int, owner: int):
+        size = self.bucket_size
+        key = (x // size, y // size)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = {}
+        bucket[(x, y)] = owner
+
+    def get(self, x: int, y: int) -> Optional[int]:
+        """Return the owner of a cell, or None if it is free"""
+        size = self.bucket_size
+        bucket = self._buckets.get((x // size, y // size))
+        if bucket is None:
+            return None
+        return bucket.get((x, y))
+
+    def any_within(self, x: int, y: int, radius: int) -> bool:
+        """Check whether any occupied cell lies in the square around (x, y)"""
+        size = self.bucket_size
+        for bx in range((x - radius) // size, (x + radius) // size + 1):
+            for by in range((y - radius) // size, (y + radius) // size + 1):
+                bucket = self._buckets.get((bx, by))
+                if not bucket:
+                    continue
+                for cx, cy in bucket:
+                    if abs(cx - x) <= radius and abs(cy - y) <= radius:
+                        return True
+        return False
+
+
+class Snake:
+    """A single player's snake inside a world"""
+
+    __slots__ = (
+        "id", "name", "body", "direction", "next_direction",
+        "alive", "score", "spawn_tick",
+    )
+
+    def __init__(self, snake_id: int, name: str, body: List[Cell], direction: str, tick: int):
+        self.id = snake_id
+        self.name = name
+        self.body = deque(body)  # head first
+        self.direction = direction
+        self.next_direction = direction
+        self.alive = True
+        self.score = 0
+        self.spawn_tick = tick
+
+    @property
+    def head(self) -> Cell:
+        return self.body[0]
+
+    def steer(self, direction: str):
+        """Queue a direction change for the next tick, ignoring reversals"""
+        if direction in DIRECTIONS and direction != OPPOSITE[self.direction]:
+            self.next_direction = direction
+
+
+class TickEvents:
+    """Everything that changed during one world step"""
+
+    __slots__ = ("tick", "moved", "died", "spawned", "removed", "food_added", "food_removed")
+
+    def __init__(self, tick: int):
+        self.tick = tick
+        self.moved: List[Tuple[int, int, int, bool]] = []  # (id, head_x, head_y, grew)
+        self.died: List[Snake] = []
+        self.spawned: List[Snake] = []
+        self.removed: List[int] = []
+        self.food_added: List[Cell] = []
+        self.food_removed: List[Cell] = []
+
+
+class World:
+    """Grid, snakes and food for one room, advanced one tick at a time"""
+
+    def __init__(self, width: int = 48, height: int = 48, wrap: bool = False,
+                 bucket_size: int = 8, seed: Optional[int] = None):
+        self.width = width
+        self.height = height
+        self.wrap = wrap
+        self.tick = 0
+        self.snakes: Dict[int, Snake] = {}
+        self.food: Set[Cell] = set()
+        self.grid = SpatialHash(bucket_size)
+        self.rng = random.Random(seed)
+        self._pending_spawns: List[Snake] = []
+        self._pending_removals: List[int] = []
+
+    def _index(self):
+        grid = self.grid
+        grid.clear()
+        for snake in self.snakes.values():
+            sid = snake.id
+            for x, y in snake.body:
+                grid.insert(x, y, sid)
+
+    def _free_cell(self, clearance: int = 0, attempts: int = 64) -> Optional[Cell]:
+        rng = self.rng
+        margin = clearance if not self.wrap else 0
+        for _ in range(attempts):
+            x = rng.randrange(margin, self.width - margin)
+            y = rng.randrange(margin, self.height - margin)
+            if (x, y) in self.food:
+                continue
+            if clearance:
+                if not self.grid.any_within(x, y, clearance):
+                    return (x, y)
+            elif self.grid.get(x, y) is None:
+                return (x, y)
+        return None
+
+    def spawn(self, snake_id: int, name: str) -> Optional[Snake]:
+        """Place a new snake away from others; returns None if the room is too crowded"""
+        self._index()
+        cell = self._free_cell(clearance=START_LENGTH + 1)
+        if cell is None:
+            return None
+        direction = self.rng.choice(list(DIRECTIONS))
+        dx, dy = DIRECTIONS[direction]
+        x, y = cell
+        body = [(x - dx * i, y - dy * i) for i in range(START_LENGTH)]
+        snake = Snake(snake_id, name, body, direction, self.tick)
+        self.snakes[snake_id] = snake
+        self._pending_spawns.append(snake)
+        return snake
+
+    def remove(self, snake_id: int) -> Optional[Snake]:
+        snake = self.snakes.pop(snake_id, None)
+        if snake is not None:
+            self._pending_removals.append(snake_id)
+        return snake
+
+    def _ensure_food(self, events: TickEvents):
+        target = max(3, len(self.snakes))
+        while len(self.food) < target:
+            cell = self._free_cell()
+            if cell is None:
+                break
+            self.food.add(cell)
+            events.food_added.append(cell)
+
+    def _advance(self, snake: Snake) -> Optional[Cell]:
+        snake.direction = snake.next_direction
+        dx, dy = DIRECTIONS[snake.direction]
+        x, y = snake.head
+        x += dx
+        y += dy
+        if self.wrap:
+            return (x % self.width, y % self.height)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return (x, y)
+        return None
+
+    def step(self) -> TickEvents:
+        """Advance the world by one tick and report what changed"""
+        self.tick += 1
+        events = TickEvents(self.tick)
+        # A snake that joined and left within the same window is only sent as
+        # a removal, which clients that never saw it simply ignore
+        spawned_ids = {s.id for s in self._pending_spawns}
+        events.spawned = [s for s in self._pending_spawns if s.id in self.snakes]
+        events.removed = self._pending_removals
+        self._pending_spawns = []
+        self._pending_removals = []
+
+        heads: Dict[int, Cell] = {}
+        growing: Set[int] = set()
+        dead: Set[int] = set()
+        for snake in self.snakes.values():
+            head = self._advance(snake)
+            if head is None:
+                dead.add(snake.id)
+                continue
+            heads[snake.id] = head
+            if head in self.food:
+                growing.add(snake.id)
+
+        # Index bodies as they will be after this move: tails vacate their
+        # cell unless the snake is growing.
+        grid = self.grid
+        grid.clear()
+        for snake in self.snakes.values():
+            sid = snake.id
+            body = snake.body
+            keep = len(body) if sid in growing else len(body) - 1
+            for i, (x, y) in enumerate(body):
+                if i >= keep:
+                    break
+                grid.insert(x, y, sid)
+
+        head_owners: Dict[Cell, List[int]] = {}
+        for sid, (x, y) in heads.items():
+            if grid.get(x, y) is not None:
+                dead.add(sid)
+            head_owners.setdefault((x, y), []).append(sid)
+        for owners in head_owners.values():
+            if len(owners) > 1:
+                dead.update(owners)
+
+        for sid, head in heads.items():
+            if sid in dead:
+                continue
+            snake = self.snakes[sid]
+            snake.body.appendleft(head)
+            grew = sid in growing
+            if grew:
+                snake.score += FOOD_SCORE
+                self.food.discard(head)
+                events.food_removed.append(head)
+            else:
+                snake.body.pop()
+            if sid not in spawned_ids:
+                # Fresh snakes are sent whole, already including this move
+                events.moved.append((sid, head[0], head[1], grew))
+
+        for sid in dead:
+            snake = self.snakes.pop(sid)
+            snake.alive = False
+            events.died.append(snake)
+
+        self._ensure_food(events)
+        return events
@@ -0,0 +1,163 @@
+"""Per-worker registry that places players into arena rooms"""
+import asyncio
+import itertools
+import logging
+import os
+import uuid
+from typing import Callable, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from app.arena.room import ArenaResult, Player, Room
+from app.database import SessionLocal
+from app.db_models import Game, LeaderboardEntryDB
+from app.percentiles import epoch, score_sketches
+from app.response_cache import response_cache
+from app.sharding import shards
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ARENA_TICK_RATE = float(os.getenv("ARENA_TICK_RATE", "15"))
+ARENA_ROOM_CAPACITY = int(os.getenv("ARENA_ROOM_CAPACITY", "16"))
+# Default budget: a quarter of the tick period per room
+ARENA_TICK_BUDGET_MS = float(os.getenv("ARENA_TICK_BUDGET_MS", str(250.0 / ARENA_TICK_RATE)))
+
+
+def persist_results(results: List[ArenaResult], session_factory=SessionLocal):
+    """Write finished arena lives as completed games and leaderboard entries"""
+    if shards.enabled:
+        by_shard: Dict[int, List[ArenaResult]] = {}
+        for result in results:
+            if result.user_id is not None:
+                by_shard.setdefault(shards.shard_for(result.user_id), []).append(result)
+        for index, shard_results in by_shard.items():
+            _write_results(shard_results, shards.sessions[index])
+    else:
+        _write_results(results, session_factory)
+    response_cache.invalidate("games")
+    response_cache.invalidate("leaderboard")
+    for result in results:
+        if result.user_id is not None:
+            score_sketches.record(result.mode, result.score, epoch(result.ended_at))
+
+
+def _write_results(results: List[ArenaResult], session_factory):
+    db = session_factory()
+    try:
+        for result in results:
+            if result.user_id is None:
+                continue
+            db.add(Game(
+                user_id=result.user_id,
+                score=result.score,
+                duration=result.duration,
+                mode=result.mode,
+                is_active=False,
+                started_at=result.started_at,
+                ended_at=result.ended_at,
+            ))
+            db.add(LeaderboardEntryDB(
+                id=str(uuid.uuid4()),
+                user_id=result.user_id,
+                username=result.username,
+                score=result.score,
+                mode=result.mode,
+                duration=result.duration,
+                timestamp=result.ended_at,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+class ArenaManager:
+    """Hosts many rooms on the current event loop.
+
+    Players are placed into the fullest room of their mode that is still
+    accepting (under capacity and under CPU budget); a new room is opened
+    otherwise. Empty rooms are stopped immediately. Finished lives are
+    handed to ``result_sink`` on the default executor so database writes
+    never run on the tick loop.
+    """
+
+    def __init__(
+        self,
+        tick_rate: float = ARENA_TICK_RATE,
+        capacity: int = ARENA_ROOM_CAPACITY,
+        budget_ms: float = ARENA_TICK_BUDGET_MS,
+        result_sink: Optional[Callable[[List[ArenaResult]], None]] = persist_results,
+    ):
+        self.tick_rate = tick_rate
+        self.capacity = capacity
+        self.budget_ms = budget_ms
+        self.result_sink = result_sink
+        self.rooms: Dict[str, Room] = {}
+        self._room_ids = itertools.count(1)
+        self._writes: Set[asyncio.Future] = set()
+
+    def _handle_results(self, results: List[ArenaResult]):
+        if self.result_sink is None:
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, self.result_sink, results)
+        self._writes.add(future)
+        future.add_done_callback(self._write_done)
+
+    def _write_done(self, future: asyncio.Future):
+        self._writes.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("arena result write failed", exc_info=future.exception())
+
+    def open_room(self, mode: str) -> Room:
+        room = Room(
+            room_id=f"{mode}-{next(self._room_ids)}",
+            mode=mode,
+            tick_rate=self.tick_rate,
+            capacity=self.capacity,
+            budget_ms=self.budget_ms,
+            on_results=self._handle_results,
+        )
+        self.rooms[room.id] = room
+        room.start()
+        return room
+
+    def join(self, user_id: Optional[int], username: str, mode: str) -> Optional[Player]:
+        """Create a player and seat it in a room; None if no room could fit it"""
+        player = Player(user_id, username)
+        candidates = sorted(
+            (r for r in self.rooms.values() if r.mode == mode and r.accepting),
+            key=lambda r: len(r.players),
+            reverse=True,
+        )
+        for room in candidates:
+            if room.add_player(player):
+                return player
+        room = self.open_room(mode)
+        if room.add_player(player):
+            return player
+        return None
+
+    def leave(self, player: Player):
+        room = player.room
+        if room is None:
+            return
+        room.remove_player(player)
+        if not room.players:
+            self.rooms.pop(room.id, None)
+            asyncio.get_running_loop().create_task(room.stop())
+
+    async def shutdown(self):
+        rooms = list(self.rooms.values())
+        self.rooms.clear()
+        for room in rooms:
+            await room.stop()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def describe(self) -> List[dict]:
+        return [room.describe() for room in self.rooms.values()]
+
+
+arena_manager = ArenaManager()
@@ -0,0 +1,119 @@
+"""Wire format for arena state broadcasts.
+
+Clients receive one full snapshot (``"t": "f"``) when they join or fall
+behind, then per-tick deltas (``"t": "d"``). A snake moves by gaining a head
+cell and, unless it ate, losing its tail cell, so a delta only carries the
+new head and a growth flag per snake instead of whole bodies. When a room is
+over its CPU budget it coalesces several deltas into one batch frame
+(``"t": "b"``) that clients apply in order.
+"""
+import json
+from typing import Iterable
+
+from app.arena.engine import FOOD_SCORE, TickEvents, World
+
+_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def _snake_entry(snake) -> list:
+    return [snake.id, snake.name, [list(cell) for cell in snake.body], snake.score]
+
+
+def encode_full(world: World) -> str:
+    """Encode the complete room state"""
+    return _dumps({
+        "t": "f",
+        "k": world.tick,
+        "w": world.width,
+        "h": world.height,
+        "s": [_snake_entry(s) for s in world.snakes.values()],
+        "f": [list(cell) for cell in world.food],
+    })
+
+
+def encode_delta(events: TickEvents) -> str:
+    """Encode the changes produced by a single world step"""
+    message = {"t": "d", "k": events.tick}
+    if events.removed:
+        message["x"] = events.removed
+    if events.spawned:
+        message["s"] = [_snake_entry(s) for s in events.spawned]
+    if events.moved:
+        message["m"] = [[sid, x, y, 1 if grew else 0] for sid, x, y, grew in events.moved]
+    if events.died:
+        message["z"] = [s.id for s in events.died]
+    if events.food_removed:
+        message["fr"] = [list(cell) for cell in events.food_removed]
+    if events.food_added:
+        message["fa"] = [list(cell) for cell in events.food_added]
+    return _dumps(message)
+
+
+def encode_batch(deltas: Iterable[str]) -> str:
+    """Join already-encoded deltas into one frame without re-serialising them"""
+    return '{"t":"b","d":[' + ",".join(deltas) + "]}"
+
+
+def apply_message(state: dict, message: dict) -> dict:
+    """Apply a decoded frame to a client-side state dict.
+
+    ``state`` holds ``tick``, ``snakes`` (id -> {"name", "body", "score"})
+    and ``food`` (set of tuples). This is the reference client used by the
+    tests and the load generator.
+    """
+    kind = message["t"]
+    if kind == "f":
+        state["tick"] = message["k"]
+        state["snakes"] = {
+            sid: {"name": name, "body": [tuple(c) for c in body], "score": score}
+            for sid, name, body, score in message["s"]
+        }
+        state["food"] = {tuple(c) for c in message["f"]}
+        return state
+    if kind == "b":
+        for delta in message["d"]:
+            apply_message(state, delta)
+        return state
+
+    snakes = state["snakes"]
+    for sid in message.get("x", ()):
+        snakes.pop(sid, None)
+    for sid, name, body, score in message.get("s", ()):
+        snakes[sid] = {"name": name, "body": [tuple(c) for c in body], "score": score}
+    for sid, x, y, grew in message.get("m", ()):
+        snake = snakes[sid]
+        snake["body"].insert(0, (x, y))
+        if grew:
+            snake["score"] += FOOD_SCORE
+        else:
+            snake["body"].pop()
+    for sid in message.get("z", ()):
+        snakes.pop(sid, None)
+    food = state["food"]
+    for cell in message.get("fr", ()):
+        food.discard(tuple(cell))
+    for cell in message.get("fa", ()):
+        food.add(tuple(cell))
+    state["tick"] = message["k"]
+    return state
+
+
+def decode(text: str) -> dict:
+    return json.loads(text)
+
+
+def snapshot_state(world: World) -> dict:
+    """Server-side state in the same shape ``apply_message`` produces"""
+    return {
+        "tick": world.tick,
+        "snakes": {
+            s.id: {"name": s.name, "body": list(s.body), "score": s.score}
+            for s in world.snakes.values()
+        },
+        "food": set(world.food),
+    }
+
+
+def new_client_state() -> dict:
+    return {"tick": 0, "snakes": {}, "food": set()}
+
@@ -0,0 +1,278 @@
+"""Arena rooms: a world, its players and a fixed-rate tick loop"""
+import asyncio
+from datetime import datetime
+import itertools
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from app.arena.engine import World
+from app.arena.protocol import encode_batch, encode_delta, encode_full
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how many ticks an overloaded room may coalesce per broadcast
+MAX_COALESCE = 4
+
+_player_ids = itertools.count(1)
+
+
+class Player:
+    """A connected participant; outgoing frames queue up for its socket writer"""
+
+    def __init__(self, user_id: Optional[int], username: str, outbox_size: int = 32):
+        self.id = next(_player_ids)
+        self.user_id = user_id
+        self.username = username
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=outbox_size)
+        self.room: Optional["Room"] = None
+        self.snake = None
+        self.started_at: Optional[datetime] = None
+        self.needs_full = True
+
+    def deliver(self, frame: str) -> bool:
+        """Queue a frame without blocking the tick loop.
+
+        A full outbox means the client is not keeping up; its backlog is
+        dropped and False is returned so the room resyncs it with a snapshot.
+        """
+        try:
+            self.outbox.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            while not self.outbox.empty():
+                self.outbox.get_nowait()
+            return False
+
+    def steer(self, direction: str):
+        if self.snake is not None:
+            self.snake.steer(direction)
+
+
+class ArenaResult:
+    """Final outcome of one life in the arena, ready to persist"""
+
+    __slots__ = ("user_id", "username", "mode", "score", "duration", "started_at", "ended_at")
+
+    def __init__(self, player: Player, mode: str, score: int, ended_at: datetime):
+        self.user_id = player.user_id
+        self.username = player.username
+        self.mode = mode
+        self.score = score
+        self.started_at = player.started_at or ended_at
+        self.ended_at = ended_at
+        self.duration = int((ended_at - self.started_at).total_seconds())
+
+
+class RoomStats:
+    __slots__ = ("ticks", "late_ticks", "over_budget_ticks", "max_tick_ms",
+                 "frames_sent", "frames_dropped", "bytes_sent")
+
+    def __init__(self):
+        self.ticks = 0
+        self.late_ticks = 0
+        self.over_budget_ticks = 0
+        self.max_tick_ms = 0.0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+
+
+class Room:
+    """One arena match hosted on the worker's event loop.
+
+    Each tick steps the world, encodes a single delta and fans it out to
+    every player. Tick cost is tracked as an EWMA against ``budget_ms``;
+    while a room is over budget it stops accepting players and coalesces up
+    to ``MAX_COALESCE`` deltas per broadcast, so one busy room cannot starve
+    the others sharing the core.
+    """
+
+    def __init__(
+        self,
+        room_id: str,
+        mode: str,
+        tick_rate: float,
+        capacity: int,
+        budget_ms: float,
+        on_results: Callable[[List[ArenaResult]], None],
+        world: Optional[World] = None,
+    ):
+        self.id = room_id
+        self.mode = mode
+        self.tick_rate = tick_rate
+        self.period = 1.0 / tick_rate
+        self.capacity = capacity
+        self.budget = budget_ms / 1000.0
+        self.world = world or World(wrap=(mode == "pass-through"))
+        self.players: Set[Player] = set()
+        self.cost_ewma = 0.0
+        self.broadcast_interval = 1
+        self.stats = RoomStats()
+        self._on_results = on_results
+        self._by_snake: Dict[int, Player] = {}
+        self._snake_ids = itertools.count(1)
+        self._pending_deltas: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def accepting(self) -> bool:
+        return len(self.players) < self.capacity and self.cost_ewma <= self.budget
+
+    def _spawn(self, player: Player) -> bool:
+        snake = self.world.spawn(next(self._snake_ids), player.username)
+        if snake is None:
+            return False
+        player.snake = snake
+        player.started_at = datetime.utcnow()
+        self._by_snake[snake.id] = player
+        player.deliver(json.dumps({"t": "hello", "room": self.id, "id": snake.id}))
+        return True
+
+    def add_player(self, player: Player) -> bool:
+        if not self._spawn(player):
+            return False
+        player.room = self
+        self.players.add(player)
+        if self._pending_deltas:
+            # Mid-coalesce: the snapshot would already contain the pending
+            # deltas, so let the next flush send it instead
+            player.needs_full = True
+        else:
+            player.needs_full = not player.deliver(encode_full(self.world))
+        return True
+
+    def respawn(self, player: Player) -> bool:
+        if player.snake is not None or player not in self.players:
+            return False
+        return self._spawn(player)
+
+    def remove_player(self, player: Player):
+        self.players.discard(player)
+        player.room = None
+        snake = player.snake
+        if snake is not None:
+            self.world.remove(snake.id)
+            self._by_snake.pop(snake.id, None)
+            player.snake = None
+            self._on_results([ArenaResult(player, self.mode, snake.score, datetime.utcnow())])
+
+    def tick_once(self):
+        """Step the world, broadcast, and account the CPU time spent"""
+        started = time.perf_counter()
+        events = self.world.step()
+
+        results = []
+        if events.died:
+            now = datetime.utcnow()
+            for snake in events.died:
+                player = self._by_snake.pop(snake.id, None)
+                if player is None:
+                    continue
+                player.snake = None
+                results.append(ArenaResult(player, self.mode, snake.score, now))
+
+        self._pending_deltas.append(encode_delta(events))
+        if self.world.tick % self.broadcast_interval == 0:
+            self._flush()
+
+        cost = time.perf_counter() - started
+        self._account(cost)
+        if results:
+            self._on_results(results)
+
+    def _flush(self):
+        pending = self._pending_deltas
+        frame = pending[0] if len(pending) == 1 else encode_batch(pending)
+        self._pending_deltas = []
+        full = None
+        stats = self.stats
+        for player in self.players:
+            if player.needs_full:
+                if full is None:
+                    full = encode_full(self.world)
+                payload = full
+            else:
+                payload = frame
+            if player.deliver(payload):
+                player.needs_full = False
+                stats.frames_sent += 1
+                stats.bytes_sent += len(payload)
+            else:
+                player.needs_full = True
+                stats.frames_dropped += 1
+
+    def _account(self, cost: float):
+        stats = self.stats
+        stats.ticks += 1
+        cost_ms = cost * 1000.0
+        if cost_ms > stats.max_tick_ms:
+            stats.max_tick_ms = cost_ms
+        self.cost_ewma += 0.2 * (cost - self.cost_ewma)
+        if cost > self.budget:
+            stats.over_budget_ticks += 1
+        if self.cost_ewma > self.budget:
+            if self.broadcast_interval < MAX_COALESCE:
+                self.broadcast_interval *= 2
+                logger.warning(
+                    "arena room over budget",
+                    extra={"room": self.id, "tick_ms": round(self.cost_ewma * 1000, 3),
+                           "coalesce": self.broadcast_interval},
+                )
+        elif self.cost_ewma < self.budget / 2 and self.broadcast_interval > 1:
+            self.broadcast_interval //= 2
+
+    async def run(self):
+        """Tick at a fixed rate, skipping ahead rather than bursting when late"""
+        loop = asyncio.get_running_loop()
+        period = self.period
+        deadline = loop.time()
+        while True:
+            try:
+                self.tick_once()
+            except Exception:
+                logger.exception("arena tick failed", extra={"room": self.id})
+            deadline += period
+            delay = deadline - loop.time()
+            if delay < 0:
+                self.stats.late_ticks += 1
+                if -delay > period:
+                    deadline = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for player in list(self.players):
+            self.remove_player(player)
+
+    def describe(self) -> dict:
+        stats = self.stats
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "players": len(self.players),
+            "capacity": self.capacity,
+            "tick": self.world.tick,
+            "tick_rate": self.tick_rate,
+            "tick_ms_ewma": round(self.cost_ewma * 1000, 3),
+            "tick_ms_max": round(stats.max_tick_ms, 3),
+            "budget_ms": round(self.budget * 1000, 3),
+            "coalesce": self.broadcast_interval,
+            "late_ticks": stats.late_ticks,
+            "over_budget_ticks": stats.over_budget_ticks,
+            "frames_sent": stats.frames_sent,
+            "frames_dropped": stats.frames_dropped,
+            "bytes_sent": stats.bytes_sent,
+        }
@@ -1,13 +1,19 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from typing import Optional, Tuple
+from jose.exceptions import JWTError
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+import hashlib
+import hmac
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
-from app.database import get_db
+from app.database import SessionLocal, get_db, get_primary_db, is_replica_session
 from app.db_models import User
 from app.schemas import TokenData
 
@@ -17,8 +23,120 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt-secret-key-change-in-productio
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Shared secret for operator endpoints under /api/admin; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Verified-token cache sizing
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+TOKEN_CACHE_MAX_TTL = 15 * 60  # seconds, for tokens without an exp claim
+REJECTED_CACHE_SIZE = 1024
+REJECTED_CACHE_TTL = 30  # seconds
+REJECTED_CACHE_RATE = 50  # newly rejected tokens remembered per second
+
+logger = logging.getLogger(__name__)
+
 security = HTTPBearer()
 
+_MISS = object()
+
+
+def _jwt():
+    # jose.jwt loads its cryptography backend on import (~80 ms); defer that
+    # from worker boot to the first token
+    from jose import jwt
+    return jwt
+
+
+class TokenCache:
+    """Bounded LRU of verified tokens keyed by their SHA-256 digest.
+
+    Accepted tokens map to their ``TokenData`` until the token's ``exp``.
+    Rejected tokens are remembered in a separate, smaller map with a short
+    TTL; admissions to it go through a token bucket so a flood of garbage
+    tokens can neither grow memory nor churn out the useful entries.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = TOKEN_CACHE_SIZE,
+        rejected_maxsize: int = REJECTED_CACHE_SIZE,
+        rejected_ttl: float = REJECTED_CACHE_TTL,
+        rejected_rate: float = REJECTED_CACHE_RATE,
+    ):
+        self.maxsize = maxsize
+        self.rejected_maxsize = rejected_maxsize
+        self.rejected_ttl = rejected_ttl
+        self.rejected_rate = rejected_rate
+        self._entries: "OrderedDict[bytes, Tuple[float, TokenData]]" = OrderedDict()
+        self._rejected: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._allowance = rejected_rate
+        self._allowance_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.rejected_hits = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, key: bytes, now: float):
+        """Return cached ``TokenData``, None for a known-bad token, or ``_MISS``"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, token_data = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return token_data
+                del self._entries[key]
+            rejected_until = self._rejected.get(key)
+            if rejected_until is not None:
+                if now < rejected_until:
+                    self.rejected_hits += 1
+                    return None
+                del self._rejected[key]
+            self.misses += 1
+            return _MISS
+
+    def put(self, key: bytes, token_data: TokenData, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, token_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def reject(self, key: bytes, now: float) -> bool:
+        """Remember a bad token if the admission budget allows; returns whether it did"""
+        with self._lock:
+            tick = time.monotonic()
+            self._allowance = min(
+                self.rejected_rate,
+                self._allowance + (tick - self._allowance_at) * self.rejected_rate,
+            )
+            self._allowance_at = tick
+            if self._allowance < 1:
+                return False
+            self._allowance -= 1
+            self._rejected[key] = now + self.rejected_ttl
+            self._rejected.move_to_end(key)
+            while len(self._rejected) > self.rejected_maxsize:
+                self._rejected.popitem(last=False)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rejected.clear()
+            self.hits = self.misses = self.rejected_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -28,30 +146,58 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = _jwt().encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def decode_token(token: str) -> Tuple[TokenData, float]:
+    """Decode and verify a JWT, returning the token data and its expiry timestamp.
+
+    Raises ``JWTError`` or ``ValueError`` for invalid tokens.
+    """
+    payload = _jwt().decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    user_id_str = payload.get("sub")
+    if user_id_str is None:
+        raise ValueError("Token has no subject")
+    # Convert string back to int
+    user_id = int(user_id_str)
+    expires_at = payload.get("exp")
+    if expires_at is None:
+        expires_at = time.time() + TOKEN_CACHE_MAX_TTL
+    return TokenData(user_id=user_id), float(expires_at)
+
+
 def verify_token(token: str) -> Optional[TokenData]:
     """Verify a JWT token and return the token data"""
+    key = TokenCache.key(token)
+    now = time.time()
+    cached = token_cache.get(key, now)
+    if cached is not _MISS:
+        return cached
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id_str = payload.get("sub")
-        if user_id_str is None:
-            return None
-        # Convert string back to int
-        user_id = int(user_id_str)
-        return TokenData(user_id=user_id)
+        token_data, expires_at = decode_token(token)
     except (JWTError, ValueError) as e:
-        print(f"DEBUG: Token verification error: {e}")
+        # Only log rejections that were admitted to the cache, so a token
+        # flood cannot flood the logs as well
+        if token_cache.reject(key, now):
+            logger.info("Token rejected", extra={"error": type(e).__name__, "reason": str(e)})
         return None
 
+    token_cache.put(key, token_data, expires_at)
+    return token_data
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user from the JWT token"""
+
+def _load_user(db: Session, user_id: int) -> Optional[User]:
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None and is_replica_session(db):
+        # A token for a user the replica hasn't seen yet, e.g. right after signup
+        with SessionLocal() as primary:
+            user = primary.query(User).filter(User.id == user_id).first()
+    return user
+
+
+def _authenticate(credentials: HTTPAuthorizationCredentials, db: Session) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -64,7 +210,7 @@ async def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = _load_user(db, token_data.user_id)
     
     if user is None:
         raise credentials_exception
@@ -72,6 +218,22 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get the current authenticated user from the JWT token"""
+    return _authenticate(credentials, db)
+
+
+async def get_current_user_primary(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_primary_db)
+) -> User:
+    """Get the current user, always reading from the primary database"""
+    return _authenticate(credentials, db)
+
+
 async def get_optional_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
     db: Session = Depends(get_db)
@@ -84,4 +246,18 @@ async def get_optional_user(
     if token_data is None:
         return None
     
-    return db.query(User).filter(User.id == token_data.user_id).first()
+    return _load_user(db, token_data.user_id)
+
+
+def is_admin_token(token: Optional[str], expected: Optional[str]) -> bool:
+    """Constant-time check of an admin token; always False when none is configured"""
+    return bool(expected and token and hmac.compare_digest(token.encode(), expected.encode()))
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow the request only with a valid X-Admin-Token header"""
+    if not is_admin_token(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
@@ -0,0 +1,156 @@
+"""Username and email availability without a query per keystroke.
+
+Each worker keeps a Bloom filter of every taken username and email. A miss
+means the name is free. Only a hit, which is either a real clash or a
+false positive, is confirmed against the database. The filter is loaded
+from ``users`` on first use, in the thread pool so that the full scan does
+not hold up the event loop. After that, only rows with a higher id are
+read, at most every ``AVAILABILITY_REFRESH_SECONDS``, to pick up signups
+served by other workers. Signups on this worker are added straight away.
+
+The answer is advisory. The unique constraints on ``users`` still decide
+at signup.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from typing import List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from app.db_models import User
+
+load_dotenv()
+
+AVAILABILITY_REFRESH_SECONDS = float(os.getenv("AVAILABILITY_REFRESH_SECONDS", "5"))
+BLOOM_FALSE_POSITIVE_RATE = float(os.getenv("BLOOM_FALSE_POSITIVE_RATE", "0.01"))
+BLOOM_INITIAL_CAPACITY = 10_000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one BLAKE2b digest"""
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_FALSE_POSITIVE_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class ScalableBloomFilter:
+    """Bloom filter that adds a twice-as-large layer when the last one fills up.
+
+    Each new layer gets half the error rate of the previous one, so the
+    overall false-positive rate stays below twice the configured rate.
+    """
+
+    def __init__(self, capacity: int = BLOOM_INITIAL_CAPACITY, error_rate: float = BLOOM_FALSE_POSITIVE_RATE):
+        self.error_rate = error_rate
+        self.layers: List[BloomFilter] = [BloomFilter(capacity, error_rate / 2)]
+
+    def add(self, key: str):
+        layer = self.layers[-1]
+        if layer.count >= layer.capacity:
+            layer = BloomFilter(layer.capacity * 2, self.error_rate / 2 ** (len(self.layers) + 1))
+            self.layers.append(layer)
+        layer.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in layer for layer in self.layers)
+
+    def __len__(self) -> int:
+        return sum(layer.count for layer in self.layers)
+
+
+def normalize_username(username: str) -> str:
+    """The form signup stores; login, these checks and migration 0004 use it too"""
+    return username.strip()
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class AvailabilityFilter:
+    """Bloom filters of taken usernames and emails, kept in step with ``users``"""
+
+    def __init__(self, refresh_seconds: float = AVAILABILITY_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.usernames = ScalableBloomFilter()
+            self.emails = ScalableBloomFilter()
+            self.last_id = 0
+            self.synced_at: Optional[float] = None
+            # Signups added here that the next sync will read again
+            self._added: Set[int] = set()
+
+    def _add(self, username: str, email: str):
+        self.usernames.add(normalize_username(username))
+        self.emails.add(normalize_email(email))
+
+    def add(self, user_id: int, username: str, email: str):
+        with self._lock:
+            if user_id > self.last_id and user_id not in self._added:
+                self._added.add(user_id)
+                self._add(username, email)
+
+    def sync(self, db: Session, force: bool = False):
+        """Load users created since the last sync, if it is due"""
+        now = time.monotonic()
+        if not force and self.synced_at is not None and now - self.synced_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if not force and self.synced_at is not None and now - self.synced_at < self.refresh_seconds:
+                return
+            rows = db.query(User.id, User.username, User.email) \
+                .filter(User.id > self.last_id).order_by(User.id).yield_per(1000)
+            for user_id, username, email in rows:
+                # Re-adding would not change the bits but would inflate the count
+                if user_id not in self._added:
+                    self._add(username, email)
+                self.last_id = user_id
+            self._added = {user_id for user_id in self._added if user_id > self.last_id}
+            self.synced_at = now
+
+    def username_available(self, db: Session, username: str) -> Tuple[bool, bool]:
+        """``(available, checked_database)`` for a username"""
+        username = normalize_username(username)
+        self.sync(db)
+        if username not in self.usernames:
+            return True, False
+        taken = db.query(User.id).filter(User.username == username).first() is not None
+        return not taken, True
+
+    def email_available(self, db: Session, email: str) -> Tuple[bool, bool]:
+        """``(available, checked_database)`` for an email address"""
+        email = normalize_email(email)
+        self.sync(db)
+        if email not in self.emails:
+            return True, False
+        taken = db.query(User.id).filter(User.email == email).first() is not None
+        return not taken, True
+
+
+availability = AvailabilityFilter()
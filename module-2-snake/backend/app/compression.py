@@ -0,0 +1,200 @@
+"""Response compression.
+
+``CompressionMiddleware`` compresses JSON and text responses of at least
+``COMPRESSION_MIN_BYTES`` with the best encoding the client accepts:
+
+- brotli, if the ``brotli`` package is installed;
+- zstd, if ``zstandard`` is installed;
+- gzip, always.
+
+Responses that already carry ``Content-Encoding`` pass through untouched.
+That is how precompressed bodies from ``app.response_cache`` skip this step.
+Streaming responses are compressed incrementally.
+"""
+import gzip
+import os
+import zlib
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+load_dotenv()
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "text/", "application/javascript", "image/svg+xml")
+
+
+class _GzipStream:
+    def __init__(self):
+        self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdStream:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+# encoding -> (one-shot compress, streaming compressor factory), in server preference order
+ENCODERS: Dict[str, tuple] = {}
+if brotli is not None:
+    ENCODERS["br"] = (lambda data: brotli.compress(data, quality=BROTLI_QUALITY), _BrotliStream)
+if zstandard is not None:
+    ENCODERS["zstd"] = (lambda data: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), _ZstdStream)
+ENCODERS["gzip"] = (lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0), _GzipStream)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    return ENCODERS[encoding][0](data)
+
+
+def choose_encoding(accept_encoding: Optional[str], available=None) -> Optional[str]:
+    """Preferred encoding the client accepts (q > 0), or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    for encoding in (available if available is not None else ENCODERS):
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _header(headers: List[tuple], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _with_vary(headers: List[tuple]) -> List[tuple]:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return headers
+    return [(k, v) for k, v in headers if k.lower() != b"vary"] + [(b"vary", vary + b", Accept-Encoding")]
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing large text responses"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[dict] = None
+        stream = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, stream, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if _header(headers, b"content-encoding") is not None or not is_compressible(content_type):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = dict(message, headers=headers)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            headers = start["headers"]
+            if stream is None:
+                if not more:
+                    # Whole body in one message: compress it in one go if it is big enough
+                    if len(body) < self.minimum_size or start["status"] in (204, 304):
+                        passthrough = True
+                        await send(dict(start, headers=_with_vary(headers)))
+                        await send(message)
+                        return
+                    compressed = compress(body, encoding)
+                    headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                    headers += [(b"content-encoding", encoding.encode()),
+                                (b"content-length", str(len(compressed)).encode())]
+                    await send(dict(start, headers=_with_vary(headers)))
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                stream = ENCODERS[encoding][1]()
+                headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                await send(dict(start, headers=_with_vary(headers)))
+            chunk = stream.compress(body)
+            if not more:
+                chunk += stream.finish()
+            if chunk or not more:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
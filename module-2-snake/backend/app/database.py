@@ -1,28 +1,192 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from starlette.requests import HTTPConnection
+from typing import List, Optional
+import itertools
+import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./snake_game.db")
 
-# Handle SQLite connection args
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+# Read replicas, comma-separated. GET requests read from a healthy replica
+# whose heartbeat lag is within REPLICA_MAX_LAG_SECONDS, else the primary.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "1"))
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def _create_engine(url: str):
+    # Handle SQLite connection args
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(url)
+
+
+engine = _create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency to get database session"""
+def _refuse_flush(session, flush_context, instances):
+    raise RuntimeError("Replica sessions are read-only; use get_primary_db for writes")
+
+
+class Replica:
+    """A read replica and the result of its last health check"""
+
+    def __init__(self, url: str):
+        self.engine = _create_engine(url)
+        self.name = self.engine.url.render_as_string()  # password masked
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine,
+                                         info={"replica": self.name})
+        event.listen(self.SessionLocal, "before_flush", _refuse_flush)
+        event.listen(self.engine, "handle_error", self._on_error)
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+        self.error: Optional[str] = None
+
+    def _on_error(self, context):
+        # Stop routing reads here until the next successful health check
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+            self.healthy = False
+
+    def describe(self) -> dict:
+        return {
+            "replica": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "checked_at": self.checked_at,
+            "error": self.error,
+        }
+
+
+class ReplicaRouter:
+    """Picks the engine for read-only sessions.
+
+    Lag is measured the pt-heartbeat way: each check stamps the current time
+    into ``replication_heartbeat`` on the primary and reads the replicated
+    row back from every replica, so it works the same for a PostgreSQL
+    streaming replica and for a copied SQLite file. ``start()`` runs the
+    checks on a background thread; replicas are unused until their first
+    check passes.
+    """
+
+    def __init__(self, primary, urls: List[str], max_lag: float = REPLICA_MAX_LAG_SECONDS,
+                 check_interval: float = REPLICA_CHECK_SECONDS):
+        self.primary = primary
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        self._monitor: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def engines(self) -> list:
+        return [replica.engine for replica in self.replicas]
+
+    def _beat(self, now: float):
+        with self.primary.begin() as conn:
+            updated = conn.execute(text("UPDATE replication_heartbeat SET written_at = :now WHERE id = 1"),
+                                   {"now": now}).rowcount
+            if not updated:
+                conn.execute(text("INSERT INTO replication_heartbeat (id, written_at) VALUES (1, :now)"),
+                             {"now": now})
+
+    def check(self):
+        """Write a heartbeat to the primary and re-measure every replica"""
+        now = time.time()
+        try:
+            self._beat(now)
+        except exc.SQLAlchemyError:
+            logger.warning("Could not write replication heartbeat", exc_info=True)
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    written_at = conn.execute(
+                        text("SELECT written_at FROM replication_heartbeat WHERE id = 1")
+                    ).scalar()
+                replica.lag = None if written_at is None else max(0.0, now - written_at)
+                replica.error = None if written_at is not None else "no heartbeat row"
+                replica.healthy = written_at is not None
+            except exc.SQLAlchemyError as e:
+                replica.healthy, replica.lag, replica.error = False, None, type(e).__name__
+            replica.checked_at = now
+
+    def _monitor_loop(self):
+        while True:
+            self.check()
+            time.sleep(self.check_interval)
+
+    def start(self):
+        """Start health-checking replicas in the background"""
+        with self._lock:
+            if self.replicas and self._monitor is None:
+                self._monitor = threading.Thread(target=self._monitor_loop, name="replica-monitor",
+                                                 daemon=True)
+                self._monitor.start()
+
+    def choose(self) -> Optional[Replica]:
+        """Next healthy, caught-up replica, or None to read from the primary"""
+        if not self.replicas:
+            return None
+        candidates = [r for r in self.replicas if r.healthy and r.lag is not None and r.lag <= self.max_lag]
+        if not candidates:
+            return None
+        return candidates[next(self._next) % len(candidates)]
+
+    def read_session(self) -> Session:
+        replica = self.choose()
+        return replica.SessionLocal() if replica is not None else SessionLocal()
+
+    def describe(self) -> List[dict]:
+        return [replica.describe() for replica in self.replicas]
+
+
+replicas = ReplicaRouter(engine, DATABASE_REPLICA_URLS)
+
+
+def is_replica_session(db: Session) -> bool:
+    return "replica" in db.info
+
+
+def get_db(connection: HTTPConnection):
+    """Dependency to get database session; GET/HEAD requests may read from a replica"""
+    if connection.scope.get("method") in READ_METHODS:
+        db = replicas.read_session()
+    else:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_primary_db():
+    """Dependency for read-your-writes paths that must see the primary"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Dependency for explicitly read-only work, whatever the HTTP method"""
+    db = replicas.read_session()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum, Float, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import bcrypt
@@ -101,3 +101,24 @@ class LeaderboardEntryDB(Base):
             "duration": self.duration,
             "timestamp": self.timestamp.isoformat() if self.timestamp else None,
         }
+
+
+class ReplicationHeartbeat(Base):
+    """Single row stamped on the primary to measure read-replica lag"""
+    __tablename__ = "replication_heartbeat"
+
+    id = Column(Integer, primary_key=True)
+    written_at = Column(Float, nullable=False)
+
+
+class ScoreSketchRow(Base):
+    """Score histogram counts for one mode and time slot (see app/percentiles.py)"""
+    __tablename__ = "score_sketches"
+    __table_args__ = (UniqueConstraint("mode", "granularity", "slot", name="uq_score_sketches_slot"),)
+
+    id = Column(Integer, primary_key=True)
+    mode = Column(String(20), nullable=False)
+    granularity = Column(String(8), nullable=False)
+    slot = Column(Integer, nullable=False)
+    counts = Column(Text, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
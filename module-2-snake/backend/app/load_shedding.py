@@ -0,0 +1,248 @@
+"""Per-route-class admission control and load shedding.
+
+Every HTTP request is put in a route class:
+- ``write``: ending a game, submitting a score or starting a game.
+- ``auth``: bcrypt-bound signup and login.
+- ``read``: all other GETs.
+- ``exempt``: health, metrics, admin and docs; these are never shed.
+Other non-GET methods count as ``write``.
+
+Each class has its own concurrency limit and a FIFO wait queue. A request
+is shed with ``503`` and ``Retry-After`` in four cases:
+
+- the queue is full;
+- it waited longer than the class's queue budget;
+- the event loop has a standing delay above the class's lag target;
+- it is a read and writes are already queued (reads yield to writes).
+
+The standing delay is the *minimum* scheduling lag over the last window,
+as in CoDel. A single slow bcrypt call does not trip it; a backlog that
+never drains does. Writes have the most generous lag target, so cacheable
+reads are shed first and score submissions last.
+
+Route classes are looked up from the route template that ``MetricsMiddleware``
+publishes in ``current_route``. Configure a class with
+``LOAD_SHED_<CLASS>=limit:queue:budget_ms:lag_target_ms`` or turn shedding off
+with ``LOAD_SHED_ENABLED=0``.
+"""
+import asyncio
+from collections import deque
+import json
+import math
+import os
+import time
+from typing import Deque, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app import metrics
+
+load_dotenv()
+
+LOAD_SHED_ENABLED = os.getenv("LOAD_SHED_ENABLED", "1").lower() not in ("0", "false", "no")
+LAG_SAMPLE_INTERVAL = 0.05
+LAG_WINDOW = 1.0
+
+# limit:queue:budget_ms:lag_target_ms
+DEFAULT_CLASSES = {
+    "write": "32:512:2000:1000",
+    "auth": "4:64:1000:250",
+    "read": "64:256:250:100",
+}
+
+ROUTE_CLASSES = {
+    ("POST", "/api/game/{game_id}/end"): "write",
+    ("POST", "/api/leaderboard"): "write",
+    ("POST", "/api/game/start"): "write",
+    ("POST", "/api/auth/login"): "auth",
+    ("POST", "/api/auth/signup"): "auth",
+}
+# A class is shed while any class it yields to has requests queued
+YIELDS_TO = {"read": ("write",)}
+EXEMPT_PREFIXES = ("/health", "/metrics", "/api/admin", "/api/docs", "/api/redoc", "/openapi.json")
+
+
+class LagMonitor:
+    """Measures how late the event loop wakes a periodic sleeper"""
+
+    def __init__(self, interval: float = LAG_SAMPLE_INTERVAL, window: float = LAG_WINDOW):
+        self.interval = interval
+        self.window = window
+        self.standing_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sampling on the running event loop"""
+        if self._task is None or self._task.done():
+            self.standing_lag = 0.0
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        window_min = math.inf
+        window_end = time.perf_counter() + self.window
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            window_min = min(window_min, now - started - self.interval)
+            if now >= window_end:
+                self.standing_lag = max(0.0, window_min)
+                metrics.EVENT_LOOP_LAG.set((), self.standing_lag)
+                window_min, window_end = math.inf, now + self.window
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class RouteClass:
+    """Concurrency limit and FIFO wait queue for one class of routes"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_budget: float,
+                 lag_target: float, retry_after: int = 1):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_budget = queue_budget
+        self.lag_target = lag_target
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+    @classmethod
+    def from_spec(cls, name: str, spec: str) -> "RouteClass":
+        limit, queue, budget_ms, lag_ms = (float(part) for part in spec.split(":"))
+        return cls(name, int(limit), int(queue), budget_ms / 1000.0, lag_ms / 1000.0)
+
+    def _gauges(self):
+        metrics.LOAD_SHED_IN_FLIGHT.set((self.name,), self.active)
+        metrics.LOAD_SHED_QUEUE_DEPTH.set((self.name,), len(self.waiters))
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot; returns None when admitted, else the reason for shedding"""
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            self._gauges()
+            return None
+        if len(self.waiters) >= self.max_queue:
+            return "shed_queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self._gauges()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_budget)
+        except BaseException as e:
+            # Timed out or the client went away; give back a slot granted meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                try:
+                    self.waiters.remove(waiter)
+                except ValueError:
+                    pass
+                self._gauges()
+            if isinstance(e, asyncio.TimeoutError):
+                return "shed_queue_timeout"
+            raise
+        finally:
+            metrics.LOAD_SHED_QUEUE_WAIT.observe((self.name,), time.perf_counter() - started)
+        return None
+
+    def release(self):
+        """Hand the slot to the oldest waiter, or free it"""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._gauges()
+                return
+        self.active -= 1
+        self._gauges()
+
+    def describe(self) -> dict:
+        return {
+            "class": self.name,
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "max_queue": self.max_queue,
+            "queue_budget_ms": self.queue_budget * 1000,
+            "lag_target_ms": self.lag_target * 1000,
+        }
+
+
+def default_classes() -> Dict[str, RouteClass]:
+    return {
+        name: RouteClass.from_spec(name, os.getenv(f"LOAD_SHED_{name.upper()}", spec))
+        for name, spec in DEFAULT_CLASSES.items()
+    }
+
+
+lag_monitor = LagMonitor()
+route_limits = default_classes()
+
+
+class LoadShedMiddleware:
+    """Admit, queue or reject HTTP requests by route class"""
+
+    def __init__(self, app, classes: Optional[Dict[str, RouteClass]] = None,
+                 route_classes: Optional[Dict[tuple, str]] = None, monitor: Optional[LagMonitor] = None,
+                 yields_to: Optional[Dict[str, tuple]] = None):
+        self.app = app
+        self.classes = classes if classes is not None else route_limits
+        self.route_classes = route_classes if route_classes is not None else ROUTE_CLASSES
+        self.monitor = monitor if monitor is not None else lag_monitor
+        self.yields_to = yields_to if yields_to is not None else YIELDS_TO
+
+    def classify(self, scope) -> Optional[str]:
+        path = scope["path"]
+        if path.startswith(EXEMPT_PREFIXES):
+            return None
+        method = scope["method"]
+        name = self.route_classes.get((method, metrics.current_route.get()))
+        if name is None:
+            name = "read" if method in ("GET", "HEAD") else "write"
+        return name if name in self.classes else None
+
+    async def _reject(self, send, route_class: RouteClass, reason: str):
+        metrics.LOAD_SHED_DECISIONS.inc((route_class.name, reason))
+        retry_after = route_class.retry_after
+        if reason in ("shed_overload", "shed_priority"):
+            retry_after = max(retry_after, math.ceil(self.monitor.standing_lag))
+        body = json.dumps({"detail": "Server is overloaded, please retry"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        name = self.classify(scope) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.classes[name]
+        if self.monitor.standing_lag > route_class.lag_target:
+            await self._reject(send, route_class, "shed_overload")
+            return
+        if any(self.classes[other].waiters for other in self.yields_to.get(name, ()) if other in self.classes):
+            await self._reject(send, route_class, "shed_priority")
+            return
+        queued = route_class.active >= route_class.limit or bool(route_class.waiters)
+        reason = await route_class.acquire()
+        if reason is not None:
+            await self._reject(send, route_class, reason)
+            return
+        metrics.LOAD_SHED_DECISIONS.inc((name, "queued" if queued else "admitted"))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release()
@@ -1,17 +1,52 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
+import asyncio
+import logging
 
-from app.database import engine, Base
-from app.routers import auth, game, leaderboard
+from app.database import engine, replicas
+from app.routers import auth, game, leaderboard, arena, admin, players
+from app.arena.manager import arena_manager
+from app.percentiles import score_sketches
+from app import compression, load_shedding, metrics, profiling, schema
+from app.sharding import shards
+from app.slow_queries import slow_query_log
+
+logger = logging.getLogger(__name__)
+
+for _engine in (engine, *replicas.engines, *shards.engines):
+    metrics.instrument_engine(_engine)
+    slow_query_log.attach(_engine)
+    if profiling.profiler.enabled:
+        profiling.instrument_engine(_engine)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Startup: check the schema version (and migrate if allowed)
+    schema.ensure_schema(engine)
+    for shard_engine in shards.engines:
+        schema.ensure_schema(shard_engine, shard=True)
+    replicas.start()
+    load_shedding.lag_monitor.start()
+    flusher = None
+    if metrics.METRICS_DIR:
+        flusher = asyncio.create_task(metrics.flush_periodically())
+    sketch_flusher = asyncio.create_task(score_sketches.flush_periodically())
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop arena rooms and flush pending result writes
+    await arena_manager.shutdown()
+    load_shedding.lag_monitor.stop()
+    sketch_flusher.cancel()
+    try:
+        score_sketches.flush()
+    except Exception:
+        logger.warning("Could not flush score sketches on shutdown", exc_info=True)
+    if flusher is not None:
+        flusher.cancel()
+        metrics.write_snapshot()
 
 
 app = FastAPI(
@@ -28,6 +63,11 @@ app = FastAPI(
 import os
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:3001,http://localhost:3080,http://127.0.0.1:3000,http://localhost,http://frontend").split(",")
 
+# Admission control - innermost, so 503s still get CORS headers and are
+# counted by the metrics middleware, which also supplies the route template
+if load_shedding.LOAD_SHED_ENABLED:
+    app.add_middleware(load_shedding.LoadShedMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ORIGINS,
@@ -36,10 +76,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses (cached ones arrive precompressed)
+app.add_middleware(compression.CompressionMiddleware)
+
+# On-demand profiling - only installed when ADMIN_TOKEN or a sample rate is set
+if profiling.profiler.enabled:
+    app.add_middleware(profiling.ProfilingMiddleware, profiler=profiling.profiler)
+
+# Request metrics - outermost so latency covers the whole stack
+app.add_middleware(metrics.MetricsMiddleware, router=app.router)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(game.router, prefix="/api/game", tags=["Game"])
 app.include_router(leaderboard.router, prefix="/api/leaderboard", tags=["Leaderboard"])
+app.include_router(players.router, prefix="/api/players", tags=["Players"])
+app.include_router(arena.router, prefix="/api/arena", tags=["Arena"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 
 @app.get("/health", tags=["System"])
@@ -48,6 +101,14 @@ async def health_check():
     return {"status": "ok", "message": "Snake Arena Online API is running"}
 
 
+@app.get("/metrics", tags=["System"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics for all workers of this instance"""
+    # Reads and merges every worker's snapshot file; keep that off the event loop
+    body = await run_in_threadpool(metrics.collect)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api", tags=["System"])
 async def api_root():
     """API root endpoint"""
@@ -0,0 +1,399 @@
+"""Prometheus-style instrumentation for the API.
+
+Metrics live in a process-local registry and are rendered in the Prometheus
+text exposition format on ``/metrics``. When ``METRICS_DIR`` is set (one
+directory shared by all uvicorn workers), each worker periodically writes a
+snapshot of its registry there and ``/metrics`` merges every worker's
+snapshot, so a scrape that lands on either worker sees the whole process
+group. Counters and histograms of exited workers keep contributing; their
+gauges are dropped.
+"""
+import asyncio
+from bisect import bisect_left
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from starlette.routing import Match
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+Labels = Tuple[str, ...]
+
+# Route template of the request being served, for code that only sees the
+# database layer (e.g. the slow-query log)
+current_route: contextvars.ContextVar = contextvars.ContextVar("current_route", default="-")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Labels, object] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = [[list(labels), value] for labels, value in self.values.items()]
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labels": list(self.labelnames),
+            "samples": samples,
+        }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, labels: Labels = (), amount: float = 1.0):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) - amount
+
+    def set(self, labels: Labels = (), value: float = 0.0):
+        with self._lock:
+            self.values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: Labels, value: float):
+        # Per-bucket (non-cumulative) counts plus the running sum; the
+        # cumulative form is only built when rendering
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [0] * (len(self.buckets) + 2)
+            entry[index] += 1
+            entry[-1] += value
+
+    def snapshot(self) -> dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self._add(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self._add(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self._add(Histogram(*args, **kwargs))
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method", "route"))
+DB_QUERIES = REGISTRY.counter(
+    "db_queries_total", "SQL statements executed", ("operation",))
+DB_QUERY_LATENCY = REGISTRY.histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("operation",), DB_BUCKETS)
+DB_POOL_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", (), DB_BUCKETS)
+LOAD_SHED_DECISIONS = REGISTRY.counter(
+    "load_shed_requests_total", "Admission decisions by route class", ("class", "decision"))
+LOAD_SHED_QUEUE_WAIT = REGISTRY.histogram(
+    "load_shed_queue_wait_seconds", "Time queued for a concurrency slot", ("class",))
+LOAD_SHED_IN_FLIGHT = REGISTRY.gauge(
+    "load_shed_in_flight", "Requests holding a concurrency slot", ("class",))
+LOAD_SHED_QUEUE_DEPTH = REGISTRY.gauge(
+    "load_shed_queue_depth", "Requests waiting for a concurrency slot", ("class",))
+AVAILABILITY_CHECKS = REGISTRY.counter(
+    "signup_availability_checks_total", "Availability lookups by how they were answered", ("field", "outcome"))
+RESPONSE_CACHE = REGISTRY.counter(
+    "response_cache_requests_total", "Cached JSON response lookups", ("namespace", "result"))
+EVENT_LOOP_LAG = REGISTRY.gauge(
+    "event_loop_standing_lag_seconds", "Minimum event loop scheduling delay over the last window")
+
+
+# -- aggregation and rendering ----------------------------------------------
+
+def merge_snapshots(snapshots: Iterable[Dict[str, dict]]) -> Dict[str, dict]:
+    """Sum samples with identical labels across worker snapshots"""
+    merged: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, data in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = {**data, "samples": {}}
+            samples = target["samples"]
+            for labels, value in data["samples"]:
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    samples[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    samples[key] = current + value
+    for data in merged.values():
+        data["samples"] = sorted(data["samples"].items())
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(merged: Dict[str, dict]) -> str:
+    """Render merged snapshots in the Prometheus text format"""
+    lines: List[str] = []
+    for name, data in merged.items():
+        lines.append(f"# HELP {name} {data['help']}")
+        lines.append(f"# TYPE {name} {data['type']}")
+        labelnames = data["labels"]
+        for labels, value in data["samples"]:
+            if data["type"] != "histogram":
+                lines.append(f"{name}{_label_text(labelnames, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(data["buckets"]) + [float("inf")], value[:-1]):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{name}_bucket{_label_text(labelnames, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labelnames, labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_label_text(labelnames, labels)} {cumulative}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+# -- multi-worker support ---------------------------------------------------
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def write_snapshot(directory: Optional[str] = METRICS_DIR):
+    """Persist this worker's registry for the other workers to merge"""
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory, os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"pid": os.getpid(), "metrics": REGISTRY.snapshot()}, f)
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect(directory: Optional[str] = METRICS_DIR) -> str:
+    """Render metrics for this worker, or for every worker sharing ``directory``"""
+    if not directory:
+        return render(merge_snapshots([REGISTRY.snapshot()]))
+
+    write_snapshot(directory)
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        metrics = data["metrics"]
+        if not _pid_alive(data["pid"]):
+            metrics = {k: v for k, v in metrics.items() if v["type"] != "gauge"}
+        snapshots.append(metrics)
+    return render(merge_snapshots(snapshots))
+
+
+async def flush_periodically(interval: float = METRICS_FLUSH_INTERVAL):
+    """Keep this worker's snapshot fresh while the app runs"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            write_snapshot()
+        except OSError:
+            logger.exception("Could not write metrics snapshot")
+
+
+# -- HTTP middleware --------------------------------------------------------
+
+_NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route count, latency and in-flight.
+
+    Requests are labelled with the route template (``/api/game/{game_id}/end``)
+    rather than the raw path so label cardinality stays bounded. Route
+    lookups are memoised by exact path for static routes and by path shape
+    (numeric segments collapsed) for parameterised ones, so the route table
+    is only scanned on the first request of each shape.
+    """
+
+    MAX_CACHED_PATHS = 1024
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+        self._static: Dict[Tuple[str, str], str] = {}
+        self._shapes: Dict[Tuple[str, str], str] = {}
+
+    def _route_name(self, scope) -> str:
+        method = scope["method"]
+        path = scope["path"]
+        name = self._static.get((method, path))
+        if name is not None:
+            return name
+        shape = _NUMERIC_SEGMENT.sub("/#", path)
+        if shape != path:
+            name = self._shapes.get((method, shape))
+            if name is not None:
+                return name
+
+        name = "unmatched"
+        parameterised = False
+        for route in self.router.routes:
+            match, _ = route.matches(scope)
+            if match is not Match.NONE:
+                name = route.path
+                parameterised = bool(getattr(route, "param_convertors", None))
+                if match is Match.FULL:
+                    break
+        cache, key = (self._shapes, (method, shape)) if parameterised else (self._static, (method, path))
+        if (not parameterised or shape != path) and len(cache) < self.MAX_CACHED_PATHS:
+            cache[key] = name
+        return name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_name(scope)
+        labels = (method, route)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(labels)
+        token = current_route.set(route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_route.reset(token)
+            HTTP_LATENCY.observe(labels, time.perf_counter() - started)
+            HTTP_REQUESTS.inc(labels + (str(status_code),))
+            HTTP_IN_FLIGHT.dec(labels)
+
+
+# -- SQLAlchemy hooks -------------------------------------------------------
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:8].split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+def instrument_engine(engine):
+    """Attach query and pool-wait metrics to a SQLAlchemy engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        operation = (_operation(statement),)
+        DB_QUERIES.inc(operation)
+        DB_QUERY_LATENCY.observe(operation, elapsed)
+
+    # The pool has no "before checkout" event, so time Pool.connect itself.
+    # engine.dispose() swaps in a fresh pool; instrument again after that.
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_WAIT.observe((), time.perf_counter() - started)
+
+    pool.connect = timed_connect
+    return engine
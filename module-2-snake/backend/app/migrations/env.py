@@ -0,0 +1,31 @@
+"""Alembic environment.
+
+Runs against the connection passed in by ``app.schema`` when invoked from the
+app, or against ``DATABASE_URL`` when invoked through the ``alembic`` CLI.
+"""
+from alembic import context
+
+from app.database import Base, engine
+from app import db_models  # noqa: F401  (registers the tables on Base.metadata)
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite can't ALTER most things in place; batch mode rebuilds the table
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+connection = config.attributes.get("connection")
+if connection is not None:
+    run_migrations(connection)
+else:
+    with engine.connect() as connection:
+        run_migrations(connection)
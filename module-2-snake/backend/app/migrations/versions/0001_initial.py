@@ -0,0 +1,65 @@
+"""Initial schema: users, games, leaderboard
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(80), nullable=False),
+        sa.Column("email", sa.String(120), nullable=False),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "games",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("duration", sa.Integer(), nullable=False),
+        sa.Column("mode", sa.String(20)),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("ended_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_games_id", "games", ["id"])
+    op.create_index("ix_games_user_id", "games", ["user_id"])
+    op.create_index("ix_games_is_active", "games", ["is_active"])
+
+    op.create_table(
+        "leaderboard",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("username", sa.String(80), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+        sa.Column("mode", sa.String(20)),
+        sa.Column("duration", sa.Integer()),
+        sa.Column("timestamp", sa.DateTime()),
+    )
+    op.create_index("ix_leaderboard_id", "leaderboard", ["id"])
+    op.create_index("ix_leaderboard_user_id", "leaderboard", ["user_id"])
+    op.create_index("ix_leaderboard_score", "leaderboard", ["score"])
+    op.create_index("ix_leaderboard_mode", "leaderboard", ["mode"])
+    op.create_index("ix_leaderboard_timestamp", "leaderboard", ["timestamp"])
+
+
+def downgrade():
+    op.drop_table("leaderboard")
+    op.drop_table("games")
+    op.drop_table("users")
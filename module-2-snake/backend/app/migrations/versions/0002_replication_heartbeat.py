@@ -0,0 +1,26 @@
+"""Replication heartbeat for read-replica lag
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "replication_heartbeat",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("written_at", sa.Float(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("replication_heartbeat")
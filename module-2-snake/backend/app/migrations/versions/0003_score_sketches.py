@@ -0,0 +1,83 @@
+"""Score sketches for leaderboard percentiles, backfilled from leaderboard
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+import json
+import time
+from datetime import timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# Copied from app/percentiles.py as it was at this revision, so later changes
+# there cannot change what this migration writes
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+EXACT_LIMIT = SUB_BUCKETS * 2
+NUM_BUCKETS = SUB_BUCKETS * 28
+HOUR, DAY = 3600, 86400
+RETENTION = {"hour": 48, "day": 31}
+
+
+def bucket_index(score):
+    score = max(0, int(score))
+    if score < EXACT_LIMIT:
+        return score
+    shift = score.bit_length() - (SUB_BUCKET_BITS + 1)
+    return min(NUM_BUCKETS - 1, SUB_BUCKETS * (shift + 1) + (score >> shift) - SUB_BUCKETS)
+
+
+def build_slots(rows, now):
+    """Bucket counts per ``(mode, granularity, slot)``, dropping slots past retention"""
+    slots = {}
+    oldest = {"hour": int(now // HOUR) - RETENTION["hour"], "day": int(now // DAY) - RETENTION["day"]}
+    for mode, score, timestamp in rows:
+        mode = mode or "walls"
+        when = timestamp.replace(tzinfo=timestamp.tzinfo or timezone.utc).timestamp() if timestamp else 0.0
+        index = bucket_index(score)
+        for key in ((mode, "all", 0), (mode, "hour", int(when // HOUR)), (mode, "day", int(when // DAY))):
+            if key[1] != "all" and key[2] < oldest[key[1]]:
+                continue
+            counts = slots.setdefault(key, {})
+            counts[index] = counts.get(index, 0) + 1
+    return slots
+
+
+def encode_counts(counts):
+    return json.dumps({str(index): count for index, count in sorted(counts.items())}, separators=(",", ":"))
+
+
+def upgrade():
+    sketches = op.create_table(
+        "score_sketches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("mode", sa.String(20), nullable=False),
+        sa.Column("granularity", sa.String(8), nullable=False),
+        sa.Column("slot", sa.Integer(), nullable=False),
+        sa.Column("counts", sa.Text(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("mode", "granularity", "slot", name="uq_score_sketches_slot"),
+    )
+
+    leaderboard = sa.table("leaderboard", sa.column("mode", sa.String), sa.column("score", sa.Integer),
+                           sa.column("timestamp", sa.DateTime))
+    rows = op.get_bind().execute(sa.select(leaderboard.c.mode, leaderboard.c.score, leaderboard.c.timestamp))
+    slots = build_slots(rows, time.time())
+    if slots:
+        op.bulk_insert(sketches, [
+            {"mode": mode, "granularity": granularity, "slot": slot, "counts": encode_counts(counts),
+             "total": sum(counts.values())}
+            for (mode, granularity, slot), counts in slots.items()
+        ])
+
+
+def downgrade():
+    op.drop_table("score_sketches")
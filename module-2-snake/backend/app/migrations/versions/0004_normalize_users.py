@@ -0,0 +1,52 @@
+"""Store usernames trimmed and emails trimmed and lowercased, as signup does
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+Signup has always stored these forms, but rows written some other way may
+not be. Login and the availability check compare with the normalised form,
+so such rows are rewritten. A row whose normalised value is already taken
+keeps its spelling and is logged; merging accounts is left to an operator.
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+users = sa.table("users", sa.column("id", sa.Integer), sa.column("username", sa.String),
+                 sa.column("email", sa.String))
+
+
+def upgrade():
+    conn = op.get_bind()
+    stale = conn.execute(sa.select(users.c.id, users.c.username, users.c.email).where(sa.or_(
+        users.c.username != sa.func.trim(users.c.username),
+        users.c.email != sa.func.lower(sa.func.trim(users.c.email)),
+    )).order_by(users.c.id)).all()
+    for user_id, username, email in stale:
+        values = {}
+        for column, current, normalized in (("username", username, username.strip()),
+                                            ("email", email, email.strip().lower())):
+            if normalized == current:
+                continue
+            taken = conn.execute(sa.select(users.c.id).where(users.c[column] == normalized)).first()
+            if taken:
+                logger.warning("users.%s of user %s kept as %r: %r belongs to user %s",
+                               column, user_id, current, normalized, taken.id)
+                continue
+            values[column] = normalized
+        if values:
+            conn.execute(users.update().where(users.c.id == user_id).values(**values))
+
+
+def downgrade():
+    pass
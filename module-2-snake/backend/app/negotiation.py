@@ -0,0 +1,130 @@
+"""MessagePack content negotiation for the game-client routers.
+
+Routers built with ``route_class=NegotiatedRoute`` behave as follows:
+
+- ``Content-Type: application/msgpack`` request bodies are accepted and
+  validated against the same Pydantic schemas as JSON.
+- If the client prefers ``application/msgpack`` in ``Accept``, responses are
+  returned as MessagePack.
+
+Responses come from the same serialiser as JSON. FastAPI dumps the
+``response_model`` with pydantic-core, and that output is packed directly
+instead of going through ``json.dumps``. Datetimes are therefore ISO-8601
+strings, exactly as in JSON, and a client can switch codecs without changing
+its models.
+
+MessagePack support needs the optional ``msgpack`` package. Without it the
+routes serve JSON only and reject MessagePack bodies with ``415``.
+"""
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = frozenset({MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"})
+
+
+def packb(content) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content) -> bytes:
+        return packb(content)
+
+
+class MsgPackRequest(Request):
+    """Request whose body is MessagePack but is handed to FastAPI as if JSON"""
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body(), raw=False)
+        return self._json
+
+
+def _media_type(value: str) -> str:
+    return value.split(";", 1)[0].strip().lower()
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    return bool(content_type) and _media_type(content_type) in MSGPACK_MEDIA_TYPES
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """True if ``Accept`` ranks MessagePack at least as high as JSON.
+
+    Wildcards count for JSON only, so browsers keep getting JSON.
+    """
+    if msgpack is None or not accept:
+        return False
+    msgpack_q, json_q = 0.0, 0.0
+    for part in accept.split(","):
+        media, _, params = part.partition(";")
+        media = media.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media in ("application/json", "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def add_vary_accept(response: Response):
+    vary = response.headers.get("vary")
+    if not vary:
+        response.headers["vary"] = "Accept"
+    elif "accept" not in (token.strip().lower() for token in vary.split(",")):
+        response.headers["vary"] = f"{vary}, Accept"
+
+
+def _as_json_scope(scope: dict) -> dict:
+    headers = [(k, v) for k, v in scope["headers"] if k != b"content-type"]
+    headers.append((b"content-type", b"application/json"))
+    return dict(scope, headers=headers)
+
+
+class NegotiatedRoute(APIRoute):
+    """APIRoute that also speaks MessagePack, chosen per request"""
+
+    def get_route_handler(self):
+        json_handler = super().get_route_handler()
+        response_class = self.response_class
+        self.response_class = MsgPackResponse
+        try:
+            msgpack_handler = super().get_route_handler()
+        finally:
+            self.response_class = response_class
+
+        async def handler(request: Request) -> Response:
+            if is_msgpack(request.headers.get("content-type")):
+                if msgpack is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                        detail="MessagePack is not supported by this server"
+                    )
+                request = MsgPackRequest(_as_json_scope(request.scope), request.receive)
+            if wants_msgpack(request.headers.get("accept")):
+                response = await msgpack_handler(request)
+            else:
+                response = await json_handler(request)
+            if msgpack is not None:
+                add_vary_accept(response)
+            return response
+
+        return handler
@@ -0,0 +1,431 @@
+"""Score percentiles per game mode and time window from mergeable histograms.
+
+Scores are counted in fixed log-linear buckets, in the style of HdrHistogram:
+
+- Every score below 64 has its own bucket.
+- Above 64, each power of two is split into 32 equal buckets, so a bucket is
+  never wider than 1/32 of its lower bound.
+
+A histogram is at most ``NUM_BUCKETS`` counters whatever the number of
+games. Two histograms merge by adding their counters, so shards, workers and
+time slots combine exactly.
+
+Error bounds:
+
+- ``percentile(score)`` is exact for scores below 64. Above that, scores that
+  share the caller's bucket are interpolated linearly, and the result is off
+  by at most that bucket's share of all games (returned as ``error``).
+- ``quantile(q)`` returns a score within 1/64 (about 1.6%) of the true one.
+
+Games are kept in hourly and daily slots so ``day`` (24 hours), ``week`` and
+``month`` (7 and 30 days) windows roll forward. Each window's running total
+is a Fenwick tree, so a lookup is O(log buckets), a few microseconds.
+
+Workers record into memory. Every ``SCORE_SKETCH_FLUSH_SECONDS`` they add
+their pending counts to ``score_sketches`` rows on the primary and reload the
+merged totals, so every worker sees every other worker's games within one
+flush. Migration 0003 backfills the table from ``leaderboard``. With
+``DATABASE_SHARD_URLS`` set, run ``python -m app.percentiles rebuild`` once
+instead.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import select, text
+
+from app.database import SessionLocal
+from app.db_models import ScoreSketchRow
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SCORE_SKETCH_FLUSH_SECONDS = float(os.getenv("SCORE_SKETCH_FLUSH_SECONDS", "10"))
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS          # 32 buckets per power of two
+EXACT_LIMIT = SUB_BUCKETS * 2               # scores below this are exact
+NUM_BUCKETS = SUB_BUCKETS * 28              # covers scores up to 2**32
+_TREE_SIZE = 1024                           # power of two >= NUM_BUCKETS
+
+HOUR, DAY = 3600, 86400
+WINDOWS = {
+    # window -> (slot granularity, slot length in seconds, number of slots)
+    "day": ("hour", HOUR, 24),
+    "week": ("day", DAY, 7),
+    "month": ("day", DAY, 30),
+}
+RETENTION = {"hour": 48, "day": 31}  # slots kept per granularity
+
+
+def bucket_index(score: int) -> int:
+    score = max(0, int(score))
+    if score < EXACT_LIMIT:
+        return score
+    shift = score.bit_length() - (SUB_BUCKET_BITS + 1)
+    return min(NUM_BUCKETS - 1, SUB_BUCKETS * (shift + 1) + (score >> shift) - SUB_BUCKETS)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """``[low, high)`` scores counted in bucket ``index``"""
+    if index < EXACT_LIMIT:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    low = (index % SUB_BUCKETS + SUB_BUCKETS) << shift
+    return low, low + (1 << shift)
+
+
+class ScoreHistogram:
+    """Bucket counters with Fenwick-tree prefix sums"""
+
+    __slots__ = ("tree", "total")
+
+    def __init__(self):
+        self.tree = [0] * (_TREE_SIZE + 1)
+        self.total = 0
+
+    def add_bucket(self, index: int, count: int = 1):
+        self.total += count
+        i = index + 1
+        while i <= _TREE_SIZE:
+            self.tree[i] += count
+            i += i & -i
+
+    def add(self, score: int, count: int = 1):
+        self.add_bucket(bucket_index(score), count)
+
+    def merge(self, counts: Dict[int, int], sign: int = 1):
+        for index, count in counts.items():
+            self.add_bucket(index, sign * count)
+
+    def below(self, index: int) -> int:
+        """Games in buckets before ``index``"""
+        total, i = 0, index
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def bucket(self, index: int) -> int:
+        return self.below(index + 1) - self.below(index)
+
+    def percentile(self, score: int) -> Tuple[float, float]:
+        """``(percent of games scoring below score, error bound in percent)``"""
+        if self.total <= 0:
+            return 0.0, 0.0
+        index = bucket_index(score)
+        below = self.below(index)
+        low, high = bucket_bounds(index)
+        in_bucket = self.bucket(index)
+        error = 0.0
+        if high - low > 1 and in_bucket:
+            below += in_bucket * (max(0, int(score)) - low) / (high - low)
+            error = in_bucket / self.total * 100
+        return below / self.total * 100, error
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Score at quantile ``q`` (0-1), interpolated within its bucket"""
+        if self.total <= 0:
+            return None
+        rank = min(self.total - 1, max(0, int(q * self.total)))
+        # Fenwick descent: largest prefix whose sum is <= rank
+        pos, remaining, step = 0, rank, _TREE_SIZE
+        while step:
+            nxt = pos + step
+            if nxt <= _TREE_SIZE and self.tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= self.tree[nxt]
+            step >>= 1
+        low, high = bucket_bounds(min(pos, NUM_BUCKETS - 1))
+        in_bucket = self.bucket(pos) or 1
+        return low + (high - low) * remaining / in_bucket
+
+    def counts(self) -> Dict[int, int]:
+        return {i: c for i in range(NUM_BUCKETS) if (c := self.bucket(i))}
+
+
+def _add_counts(target: Dict[int, int], counts: Dict[int, int], sign: int = 1):
+    for index, count in counts.items():
+        value = target.get(index, 0) + sign * count
+        if value:
+            target[index] = value
+        else:
+            target.pop(index, None)
+
+
+SlotKey = Tuple[str, str, int]  # (mode, granularity, slot number); granularity "all" has slot 0
+
+
+def slot_keys(mode: str, when: float) -> List[SlotKey]:
+    return [(mode, "all", 0), (mode, "hour", int(when // HOUR)), (mode, "day", int(when // DAY))]
+
+
+class _ModeSketch:
+    """Slots and rolling window totals for one game mode"""
+
+    def __init__(self):
+        self.slots: Dict[Tuple[str, int], Dict[int, int]] = {}
+        self.windows: Dict[str, ScoreHistogram] = {name: ScoreHistogram() for name in ("all", *WINDOWS)}
+        self.window_start: Dict[str, int] = {name: 0 for name in WINDOWS}
+
+    def add(self, granularity: str, slot: int, counts: Dict[int, int]):
+        _add_counts(self.slots.setdefault((granularity, slot), {}), counts)
+        if granularity == "all":
+            self.windows["all"].merge(counts)
+            return
+        for name, (window_granularity, _, _) in WINDOWS.items():
+            if window_granularity == granularity and slot >= self.window_start[name]:
+                self.windows[name].merge(counts)
+
+    def roll(self, now: float):
+        """Subtract slots that have left each rolling window"""
+        rolled = False
+        for name, (granularity, length, size) in WINDOWS.items():
+            first = int(now // length) - size + 1
+            if not self.window_start[name]:
+                self.window_start[name] = first
+            while self.window_start[name] < first:
+                expired = self.slots.get((granularity, self.window_start[name]))
+                if expired:
+                    self.windows[name].merge(expired, sign=-1)
+                self.window_start[name] += 1
+                rolled = True
+        if rolled:
+            # Forget slots no window covers any more
+            oldest = {}
+            for name, (granularity, _, _) in WINDOWS.items():
+                oldest[granularity] = min(oldest.get(granularity, self.window_start[name]), self.window_start[name])
+            for key in [k for k in self.slots if k[0] in oldest and k[1] < oldest[k[0]]]:
+                del self.slots[key]
+
+
+class ScoreSketches:
+    """Per-mode percentile sketches shared through ``score_sketches``"""
+
+    def __init__(self, session_factory: Callable = SessionLocal,
+                 flush_interval: float = SCORE_SKETCH_FLUSH_SECONDS):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._modes: Dict[str, _ModeSketch] = {}
+        self._pending: Dict[SlotKey, Dict[int, int]] = {}
+        self._loaded = False
+
+    def reset(self):
+        with self._lock:
+            self._modes, self._pending, self._loaded = {}, {}, False
+
+    def _mode(self, mode: str, now: float) -> _ModeSketch:
+        sketch = self._modes.get(mode)
+        if sketch is None:
+            sketch = self._modes[mode] = _ModeSketch()
+            sketch.roll(now)
+        return sketch
+
+    def _apply(self, key: SlotKey, counts: Dict[int, int], now: float):
+        mode, granularity, slot = key
+        self._mode(mode, now).add(granularity, slot, counts)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        try:
+            self.reload()
+        except Exception:
+            # Serve this worker's games for now; the next flush reloads
+            logger.warning("Could not load score sketches", exc_info=True)
+            self._loaded = True
+
+    def record(self, mode: str, score: int, when: Optional[float] = None):
+        """Count one finished game"""
+        now = time.time()
+        when = now if when is None else when
+        counts = {bucket_index(score): 1}
+        with self._lock:
+            self._ensure_loaded()
+            for key in slot_keys(mode, when):
+                _add_counts(self._pending.setdefault(key, {}), counts)
+                self._apply(key, counts, now)
+
+    def histogram(self, mode: str, window: str = "all") -> ScoreHistogram:
+        now = time.time()
+        with self._lock:
+            self._ensure_loaded()
+            sketch = self._mode(mode, now)
+            sketch.roll(now)
+            return sketch.windows[window]
+
+    def percentile(self, mode: str, score: int, window: str = "all") -> Tuple[float, float, int]:
+        """``(percent below score, error bound, games in window)``"""
+        histogram = self.histogram(mode, window)
+        with self._lock:
+            percent, error = histogram.percentile(score)
+            return percent, error, histogram.total
+
+    def reload(self):
+        """Replace in-memory state with the stored totals plus unflushed games"""
+        now = time.time()
+        with self.session_factory() as db:
+            rows = db.execute(select(ScoreSketchRow.mode, ScoreSketchRow.granularity,
+                                     ScoreSketchRow.slot, ScoreSketchRow.counts)).all()
+        with self._lock:
+            self._modes = {}
+            for mode, granularity, slot, counts in rows:
+                self._apply((mode, granularity, slot), decode_counts(counts), now)
+            for key, counts in self._pending.items():
+                self._apply(key, counts, now)
+            self._loaded = True
+
+    def flush(self):
+        """Add pending counts to the stored rows, prune expired slots and reload"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            try:
+                if pending:
+                    with self.session_factory() as db:
+                        _store(db, pending)
+                        _prune(db, time.time())
+                        db.commit()
+            except Exception:
+                with self._lock:
+                    for key, counts in pending.items():
+                        _add_counts(self._pending.setdefault(key, {}), counts)
+                raise
+            self.reload()
+
+    async def flush_periodically(self):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception:
+                logger.warning("Could not flush score sketches", exc_info=True)
+
+
+def decode_counts(counts: str) -> Dict[int, int]:
+    return {int(index): count for index, count in json.loads(counts).items()}
+
+
+def encode_counts(counts: Dict[int, int]) -> str:
+    return json.dumps({str(index): count for index, count in sorted(counts.items())}, separators=(",", ":"))
+
+
+def _lock_for_update(db):
+    """Take the database's write lock before reading rows that will be rewritten.
+
+    ``FOR UPDATE`` does nothing on SQLite, and pysqlite only opens a
+    transaction at the first write. Two workers could then read the same
+    counts and each write back their own sum, losing the other's games.
+    ``BEGIN IMMEDIATE`` makes the second flush wait until the first commits.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(text("BEGIN IMMEDIATE"))
+
+
+def _store(db, pending: Dict[SlotKey, Dict[int, int]]):
+    _lock_for_update(db)
+    for (mode, granularity, slot), counts in pending.items():
+        row = db.execute(
+            select(ScoreSketchRow).where(ScoreSketchRow.mode == mode, ScoreSketchRow.granularity == granularity,
+                                         ScoreSketchRow.slot == slot).with_for_update()
+        ).scalar_one_or_none()
+        if row is None:
+            db.add(ScoreSketchRow(mode=mode, granularity=granularity, slot=slot, counts=encode_counts(counts),
+                                  total=sum(counts.values())))
+            db.flush()
+            continue
+        merged = decode_counts(row.counts)
+        _add_counts(merged, counts)
+        row.counts = encode_counts(merged)
+        row.total = sum(merged.values())
+
+
+def _prune(db, now: float):
+    for granularity, keep in RETENTION.items():
+        length = HOUR if granularity == "hour" else DAY
+        db.query(ScoreSketchRow).filter(ScoreSketchRow.granularity == granularity,
+                                        ScoreSketchRow.slot < int(now // length) - keep) \
+            .delete(synchronize_session=False)
+
+
+def epoch(timestamp: Optional[datetime]) -> float:
+    """Seconds since the epoch for a stored timestamp (naive means UTC)"""
+    if timestamp is None:
+        return 0.0
+    return timestamp.replace(tzinfo=timestamp.tzinfo or timezone.utc).timestamp()
+
+
+def build_slots(games: Iterable[Tuple[str, int, Optional[datetime]]], now: float) -> Dict[SlotKey, Dict[int, int]]:
+    """Slot counts for ``(mode, score, timestamp)`` rows, dropping slots past retention"""
+    slots: Dict[SlotKey, Dict[int, int]] = {}
+    oldest = {"hour": int(now // HOUR) - RETENTION["hour"], "day": int(now // DAY) - RETENTION["day"]}
+    for mode, score, timestamp in games:
+        mode = mode or "walls"
+        index = bucket_index(score)
+        for key in slot_keys(mode, epoch(timestamp)):
+            if key[1] != "all" and key[2] < oldest[key[1]]:
+                continue
+            counts = slots.setdefault(key, {})
+            counts[index] = counts.get(index, 0) + 1
+    return slots
+
+
+def rebuild(db, score_sessions: Iterable) -> int:
+    """Replace every stored sketch with counts from the given leaderboard sessions"""
+    from app.db_models import LeaderboardEntryDB
+
+    slots: Dict[SlotKey, Dict[int, int]] = {}
+    games = 0
+    for session in score_sessions:
+        rows = session.query(LeaderboardEntryDB.mode, LeaderboardEntryDB.score,
+                             LeaderboardEntryDB.timestamp).yield_per(10000)
+        for key, counts in build_slots(rows, time.time()).items():
+            _add_counts(slots.setdefault(key, {}), counts)
+    db.query(ScoreSketchRow).delete(synchronize_session=False)
+    for (mode, granularity, slot), counts in slots.items():
+        db.add(ScoreSketchRow(mode=mode, granularity=granularity, slot=slot, counts=encode_counts(counts),
+                              total=sum(counts.values())))
+        if granularity == "all":
+            games += sum(counts.values())
+    db.commit()
+    return games
+
+
+score_sketches = ScoreSketches()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score percentile sketches")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="recount every sketch from the leaderboard (main db or all shards)")
+    parser.parse_args(argv)
+
+    from app.sharding import shards
+
+    with SessionLocal() as db:
+        if shards.enabled:
+            sessions = [factory() for factory in shards.sessions]
+            try:
+                games = rebuild(db, sessions)
+            finally:
+                for session in sessions:
+                    session.close()
+        else:
+            games = rebuild(db, [db])
+    print(f"rebuilt score sketches from {games} leaderboard entries")
+
+
+if __name__ == "__main__":
+    main()
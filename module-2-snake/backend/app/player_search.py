@@ -0,0 +1,111 @@
+"""In-memory prefix index of usernames for player search.
+
+Usernames are kept case-folded in one sorted list, with the display name and
+user id in parallel arrays. A prefix lookup is one binary search (about 20
+string comparisons at a million users) followed by a scan of at most
+``limit`` entries, with no database work.
+
+As with the availability filter, the index is loaded from ``users`` on first
+use, off the event loop. After that it reads only rows with a higher id, at most every
+``PLAYER_INDEX_REFRESH_SECONDS``, and signups on this worker are inserted
+right away.
+"""
+from array import array
+from bisect import bisect_left
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from app.db_models import User
+
+load_dotenv()
+
+PLAYER_INDEX_REFRESH_SECONDS = float(os.getenv("PLAYER_INDEX_REFRESH_SECONDS", "5"))
+
+
+def _fold(username: str) -> str:
+    key = username.casefold()
+    # Share the string object in the common all-lowercase case
+    return username if key == username else key
+
+
+class PlayerIndex:
+    """Sorted ``(casefolded username, username, user id)`` arrays"""
+
+    def __init__(self, refresh_seconds: float = PLAYER_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.keys: List[str] = []
+            self.names: List[str] = []
+            self.ids = array("q")
+            self.last_id = 0
+            self.synced_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _insert(self, user_id: int, username: str):
+        key = _fold(username)
+        pos = bisect_left(self.keys, key)
+        # Ties on the folded name are ordered by id, so re-adding is a no-op
+        while pos < len(self.keys) and self.keys[pos] == key and self.ids[pos] < user_id:
+            pos += 1
+        if pos < len(self.keys) and self.keys[pos] == key and self.ids[pos] == user_id:
+            return
+        self.keys.insert(pos, key)
+        self.names.insert(pos, username)
+        self.ids.insert(pos, user_id)
+
+    def add(self, user_id: int, username: str):
+        with self._lock:
+            self._insert(user_id, username)
+
+    def _load(self, rows):
+        # Initial load: append everything, sort once
+        entries = sorted((_fold(username), user_id, username) for user_id, username in rows)
+        self.keys = [key for key, _, _ in entries]
+        self.names = [username for _, _, username in entries]
+        self.ids = array("q", (user_id for _, user_id, _ in entries))
+
+    def sync(self, db: Session, force: bool = False):
+        """Pick up users created since the last sync, if it is due"""
+        now = time.monotonic()
+        if not force and self.synced_at is not None and now - self.synced_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if not force and self.synced_at is not None and now - self.synced_at < self.refresh_seconds:
+                return
+            rows = db.query(User.id, User.username).filter(User.id > self.last_id) \
+                .order_by(User.id).all()
+            if rows:
+                if self.synced_at is None:
+                    self._load(rows)
+                else:
+                    for user_id, username in rows:
+                        self._insert(user_id, username)
+                self.last_id = rows[-1][0]
+            self.synced_at = now
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """Up to ``limit`` ``(user_id, username)`` whose name starts with ``prefix``"""
+        key = prefix.casefold()
+        with self._lock:
+            start = bisect_left(self.keys, key)
+            end = min(start + limit, len(self.keys))
+            matches = []
+            for pos in range(start, end):
+                if not self.keys[pos].startswith(key):
+                    break
+                matches.append((self.ids[pos], self.names[pos]))
+        return matches
+
+
+player_index = PlayerIndex()
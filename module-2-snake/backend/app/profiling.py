@@ -0,0 +1,247 @@
+"""On-demand request profiler.
+
+A request is profiled when it carries ``X-Profile: 1`` together with a valid
+``X-Admin-Token``, or when it is picked by ``PROFILE_SAMPLE_RATE``. While at
+least one profiled request is in flight, a background thread samples the
+serving thread's Python stack every ``PROFILE_INTERVAL_MS`` and attributes
+each sample to the request whose middleware frame appears in it. SQL
+statements executed by the request are recorded with their timings. The
+slowest ``PROFILE_KEEP`` profiles are retained for the admin endpoints.
+
+Handlers here are ``async def`` and run their (blocking) ORM calls on the
+event loop thread, so samples cover CPU work and blocking database I/O;
+time spent suspended at an ``await`` shows up in the duration only.
+
+When neither ``ADMIN_TOKEN`` nor a sample rate is configured the middleware
+and SQL hooks are not installed at all.
+"""
+from collections import Counter
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+from app.auth import ADMIN_TOKEN, is_admin_token
+
+load_dotenv()
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+PROFILE_MAX_STATEMENTS = 500
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("current_profile", default=None)
+_profile_ids = itertools.count(1)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """Stack samples and SQL statements captured for one request"""
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = next(_profile_ids)
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.samples: Counter = Counter()
+        self.statements: List[tuple] = []
+        self.dropped_statements = 0
+
+    def record_statement(self, statement: str, duration: float):
+        if len(self.statements) < PROFILE_MAX_STATEMENTS:
+            self.statements.append((statement, duration))
+        else:
+            self.dropped_statements += 1
+
+    def collapsed(self) -> str:
+        """Samples in Brendan Gregg's collapsed-stack format for flamegraph.pl"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "samples": sum(self.samples.values()),
+            "sql_count": len(self.statements) + self.dropped_statements,
+            "sql_ms": round(sum(d for _, d in self.statements) * 1000, 3),
+        }
+
+    def detail(self) -> dict:
+        data = self.summary()
+        data["statements"] = [
+            {"sql": sql, "duration_ms": round(duration * 1000, 3)}
+            for sql, duration in self.statements
+        ]
+        data["dropped_statements"] = self.dropped_statements
+        data["top_stacks"] = [
+            {"stack": list(stack), "samples": count}
+            for stack, count in self.samples.most_common(10)
+        ]
+        return data
+
+
+class Profiler:
+    """Owns the sampler thread and the slowest-request buffer"""
+
+    def __init__(self, admin_token: Optional[str] = ADMIN_TOKEN,
+                 sample_rate: float = PROFILE_SAMPLE_RATE,
+                 interval_ms: float = PROFILE_INTERVAL_MS, keep: int = PROFILE_KEEP):
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000.0
+        self.keep = keep
+        self._lock = threading.Lock()
+        # id(middleware frame) -> (frame, thread id, profile)
+        self._active: Dict[int, tuple] = {}
+        self._slowest: List[tuple] = []
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.admin_token) or self.sample_rate > 0
+
+    def begin(self, profile: RequestProfile, frame):
+        with self._lock:
+            self._active[id(frame)] = (frame, threading.get_ident(), profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._thread.start()
+
+    def end(self, profile: RequestProfile, frame):
+        with self._lock:
+            self._active.pop(id(frame), None)
+            entry = (profile.duration, profile.id, profile)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = dict(self._active)
+            frames = sys._current_frames()
+            for thread_id in {tid for _, tid, _ in active.values()}:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    owner = active.get(id(frame))
+                    if owner is not None and owner[0] is frame:
+                        stack.reverse()
+                        owner[2].samples[tuple(stack)] += 1
+                        break
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+
+    def profiles(self) -> List[RequestProfile]:
+        """Retained profiles, slowest first"""
+        with self._lock:
+            return [entry[2] for entry in sorted(self._slowest, reverse=True)]
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        for profile in self.profiles():
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._slowest.clear()
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Profile requests selected by admin header or by sampling rate"""
+
+    def __init__(self, app, profiler: Profiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    def _reason(self, scope) -> Optional[str]:
+        profiler = self.profiler
+        if profiler.admin_token:
+            wants_profile = False
+            token = None
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    wants_profile = value in (b"1", b"true")
+                elif name == b"x-admin-token":
+                    token = value.decode("latin-1")
+            if wants_profile and is_admin_token(token, profiler.admin_token):
+                return "header"
+        if profiler.sample_rate and random.random() < profiler.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        reason = self._reason(scope) if scope["type"] == "http" else None
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], reason)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-profile-id", str(profile.id).encode())
+                ]
+            await send(message)
+
+        frame = sys._getframe()
+        token = _current_profile.set(profile)
+        self.profiler.begin(profile, frame)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.duration = time.perf_counter() - started
+            self.profiler.end(profile, frame)
+            _current_profile.reset(token)
+
+
+def instrument_engine(engine):
+    """Record statements of profiled requests executed on this engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            context._profile_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        if profile is not None:
+            started = getattr(context, "_profile_started", None)
+            if started is not None:
+                profile.record_statement(statement, time.perf_counter() - started)
+
+    return engine
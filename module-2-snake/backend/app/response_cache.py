@@ -0,0 +1,116 @@
+"""Short-lived cache of serialised JSON responses for hot, public GETs.
+
+An entry holds the JSON body bytes. On first request it also fills in a
+MessagePack copy and one compressed copy per format and content encoding.
+A hit skips the queries, the pydantic/JSON serialisation and the
+compression. Entries expire after
+``RESPONSE_CACHE_SECONDS`` and are dropped immediately when this worker
+writes to the data behind them (``invalidate``). Other workers' writes
+show up within the TTL.
+"""
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app import compression, metrics, negotiation
+
+load_dotenv()
+
+RESPONSE_CACHE_SECONDS = float(os.getenv("RESPONSE_CACHE_SECONDS", "2"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+
+class CachedBody:
+    """A JSON body and its MessagePack and compressed variants"""
+
+    __slots__ = ("body", "packed", "variants", "expires_at")
+
+    def __init__(self, body: bytes, expires_at: float):
+        self.body = body
+        self.packed: Optional[bytes] = None
+        self.variants: Dict[Tuple[str, str], bytes] = {}
+        self.expires_at = expires_at
+
+    def raw(self, media: str = "json") -> bytes:
+        if media == "json":
+            return self.body
+        if self.packed is None:
+            self.packed = negotiation.packb(json.loads(self.body))
+        return self.packed
+
+    def encoded(self, encoding: str, media: str = "json") -> bytes:
+        data = self.variants.get((media, encoding))
+        if data is None:
+            data = self.variants[(media, encoding)] = compression.compress(self.raw(media), encoding)
+        return data
+
+
+class ResponseCache:
+    """LRU of ``CachedBody`` keyed by ``(namespace, *params)``"""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_SECONDS, maxsize: int = RESPONSE_CACHE_SIZE,
+                 minimum_size: int = compression.COMPRESSION_MIN_BYTES):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.minimum_size = minimum_size
+        self._entries: "OrderedDict[Tuple[Hashable, ...], CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, build: Callable[[], Any]) -> CachedBody:
+        """The cached body for ``key``, serialising ``build()`` on a miss"""
+        now = time.monotonic()
+        namespace = str(key[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                metrics.RESPONSE_CACHE.inc((namespace, "hit"))
+                return entry
+        metrics.RESPONSE_CACHE.inc((namespace, "miss"))
+        body = JSONResponse(jsonable_encoder(build())).body
+        entry = CachedBody(body, now + self.ttl)
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, request: Request, key: tuple, build: Callable[[], Any]) -> Response:
+        """Response for ``key`` in the client's format, precompressed for its Accept-Encoding"""
+        entry = self.get(key, build)
+        media = "msgpack" if negotiation.wants_msgpack(request.headers.get("accept")) else "json"
+        media_type = negotiation.MSGPACK_MEDIA_TYPE if media == "msgpack" else "application/json"
+        headers = {"Vary": "Accept-Encoding"}
+        body = entry.raw(media)
+        if len(body) >= self.minimum_size:
+            encoding = compression.choose_encoding(request.headers.get("accept-encoding"))
+            if encoding is not None:
+                headers["Content-Encoding"] = encoding
+                body = entry.encoded(encoding, media)
+        return Response(body, media_type=media_type, headers=headers)
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Drop every entry in ``namespace``, or everything"""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache()
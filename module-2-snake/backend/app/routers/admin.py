@@ -0,0 +1,164 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.analytics import analytics
+from app.auth import require_admin
+from app.database import replicas
+from app.load_shedding import lag_monitor, route_limits
+from app.profiling import profiler
+from app.schemas import AnalyticsTable, CohortPeriod, GameMode
+from app.slow_queries import slow_query_log
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """List retained request profiles, slowest first"""
+    return [profile.summary() for profile in profiler.profiles()]
+
+
+@router.get("/profiles/collapsed", response_class=PlainTextResponse)
+async def all_profiles_collapsed():
+    """Collapsed stacks of all retained profiles, for flamegraph.pl"""
+    return "".join(profile.collapsed() for profile in profiler.profiles())
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: int):
+    """Get one profile with its SQL statements and hottest stacks"""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile.detail()
+
+
+@router.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+async def get_profile_collapsed(profile_id: int):
+    """Collapsed stacks of one profile, for flamegraph.pl"""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile.collapsed()
+
+
+@router.delete("/profiles", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_profiles():
+    """Drop all retained profiles"""
+    profiler.clear()
+
+
+@router.get("/slow-queries")
+async def slow_query_stats():
+    """Slow statements grouped by fingerprint, with percentiles and EXPLAIN plans"""
+    return slow_query_log.stats()
+
+
+@router.get("/slow-queries/recent")
+async def recent_slow_queries():
+    """Most recent slow statements, newest first"""
+    return list(reversed(slow_query_log.recent))
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_queries():
+    """Reset the slow-query log"""
+    slow_query_log.clear()
+
+
+@router.get("/replicas")
+async def replica_status():
+    """Health and heartbeat lag of each read replica"""
+    return {"max_lag_seconds": replicas.max_lag, "replicas": replicas.describe()}
+
+
+@router.get("/load-shedding")
+async def load_shedding_status():
+    """Concurrency limits, queue depth and event loop lag per route class"""
+    return {
+        "standing_lag_ms": round(lag_monitor.standing_lag * 1000, 3),
+        "classes": [route_class.describe() for route_class in route_limits.values()],
+    }
+
+
+# Analytics routes are plain ``def`` so refreshes and reports run in the
+# threadpool instead of blocking the event loop
+
+
+def _require_numpy():
+    if not analytics.available:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analytics needs numpy"
+        )
+
+
+@router.get("/analytics")
+def analytics_status():
+    """Snapshot sizes, watermarks and last refresh per table"""
+    _require_numpy()
+    return analytics.status()
+
+
+@router.post("/analytics/refresh")
+def refresh_analytics():
+    """Append rows written since the last refresh"""
+    _require_numpy()
+    return {"added": analytics.refresh()}
+
+
+@router.get("/analytics/scores")
+def score_distribution_report(
+    table: AnalyticsTable = AnalyticsTable.GAMES,
+    mode: Optional[GameMode] = None,
+    bins: int = Query(20, ge=1, le=200)
+):
+    """Score statistics, percentiles and histogram per mode"""
+    _require_numpy()
+    return analytics.report("scores", table=table.value, mode=mode.value if mode else None, bins=bins)
+
+
+@router.get("/analytics/durations")
+def duration_curve_report(
+    table: AnalyticsTable = AnalyticsTable.GAMES,
+    mode: Optional[GameMode] = None,
+    bins: int = Query(10, ge=1, le=100)
+):
+    """Mean and median score by game duration"""
+    _require_numpy()
+    return analytics.report("durations", table=table.value, mode=mode.value if mode else None, bins=bins)
+
+
+@router.get("/analytics/retention")
+def retention_report(
+    table: AnalyticsTable = AnalyticsTable.GAMES,
+    mode: Optional[GameMode] = None,
+    period: CohortPeriod = CohortPeriod.WEEK,
+    periods: int = Query(8, ge=1, le=104)
+):
+    """Share of each first-play cohort still playing in later periods"""
+    _require_numpy()
+    return analytics.report("retention", table=table.value, mode=mode.value if mode else None,
+                            period=period.value, periods=periods)
+
+
+@router.get("/analytics/trends")
+def user_trends_report(
+    table: AnalyticsTable = AnalyticsTable.GAMES,
+    mode: Optional[GameMode] = None,
+    min_games: int = Query(5, ge=2),
+    limit: int = Query(20, ge=1, le=500),
+    user_id: Optional[int] = None
+):
+    """Players whose scores improve fastest per game played"""
+    _require_numpy()
+    return analytics.report("trends", table=table.value, mode=mode.value if mode else None,
+                            min_games=min_games, limit=limit, user_id=user_id)
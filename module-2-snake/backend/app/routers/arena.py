@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.orm import Session
+
+from app.arena.manager import arena_manager
+from app.auth import verify_token
+from app.database import get_db
+from app.db_models import User
+from app.schemas import GameMode
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/rooms")
+async def list_rooms():
+    """List arena rooms hosted by this worker with their tick statistics"""
+    return arena_manager.describe()
+
+
+@router.websocket("/ws")
+async def arena_socket(
+    websocket: WebSocket,
+    token: str = Query(...),
+    mode: GameMode = GameMode.WALLS,
+    db: Session = Depends(get_db)
+):
+    """Join a multiplayer arena room.
+
+    Clients send ``{"dir": "up"|"down"|"left"|"right"}`` to steer and
+    ``{"action": "respawn"}`` after dying; the server streams snapshot and
+    delta frames (see ``app.arena.protocol``).
+    """
+    token_data = verify_token(token)
+    user = None
+    if token_data is not None:
+        user = db.query(User).filter(User.id == token_data.user_id).first()
+    # Release the connection now; the socket may stay open for minutes
+    db.close()
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    player = arena_manager.join(user.id, user.username, mode.value)
+    if player is None:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    async def pump():
+        while True:
+            frame = await player.outbox.get()
+            await websocket.send_text(frame)
+
+    async def read():
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except KeyError:
+                # A binary frame: the protocol is JSON text only
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                return
+            if not isinstance(message, dict):
+                continue
+            if "dir" in message:
+                # Anything but a string (a list, say) cannot be a direction
+                if isinstance(message["dir"], str):
+                    player.steer(message["dir"])
+            elif message.get("action") == "respawn" and player.room is not None:
+                player.room.respawn(player)
+
+    # Whichever side stops first (the client left, sent garbage, or a send
+    # failed) ends the session
+    tasks = [asyncio.create_task(read()), asyncio.create_task(pump())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        arena_manager.leave(player)
+        for task in tasks:
+            task.cancel()
+    # Only a task that finished on its own can hold an exception; awaiting the
+    # cancelled one would give a shutdown a second chance to interrupt us
+    for task in tasks:
+        error = task.exception() if task.done() and not task.cancelled() else None
+        # A disconnect or undecodable JSON is how a client normally leaves
+        if error is not None and not isinstance(error, (WebSocketDisconnect, ValueError)):
+            logger.warning("Arena socket for user %s failed", user.id, exc_info=error)
+            try:
+                await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+            except Exception:  # the connection may be gone already
+                pass
+            return
@@ -1,62 +1,121 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from app import metrics
+from app.availability import availability, normalize_email, normalize_username
 from app.database import get_db
 from app.db_models import User
-from app.schemas import UserCreate, UserLogin, UserResponse, AuthResponse
-from app.auth import create_access_token, get_current_user
+from app.player_search import player_index
+from app.schemas import UserCreate, UserLogin, UserResponse, AuthResponse, AvailabilityResponse
+from app.auth import create_access_token, get_current_user_primary
 
 router = APIRouter()
 
 
+# The unique indexes on users: PostgreSQL reports the index name,
+# SQLite "UNIQUE constraint failed: users.<column>"
+_UNIQUE_FIELDS = {
+    "ix_users_username": "username",
+    "ix_users_email": "email",
+    "users.username": "username",
+    "users.email": "email",
+}
+
+
+def _duplicate_field(db: Session, error: IntegrityError, username: str, email: str) -> str:
+    """Which unique column a failed signup INSERT collided with"""
+    # Not the whole message: PostgreSQL's DETAIL line quotes the clashing value
+    diag = getattr(error.orig, "diag", None)
+    field = _UNIQUE_FIELDS.get(getattr(diag, "constraint_name", None) or "")
+    if field is None:
+        field = _UNIQUE_FIELDS.get(str(error.orig).rsplit(": ", 1)[-1].strip())
+    if field is not None:
+        return field
+    # Constraint names not recognised; fall back to asking the database
+    if db.query(User.id).filter(User.username == username).first():
+        return "username"
+    return "email"
+
+
 @router.post("/signup", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
 async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
-    # Check if username already exists
-    if db.query(User).filter(User.username == user_data.username).first():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already exists"
-        )
-    
-    # Check if email already exists
-    if db.query(User).filter(User.email == user_data.email).first():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already exists"
-        )
-    
-    # Create new user
     user = User(
-        username=user_data.username.strip(),
-        email=user_data.email.strip().lower()
+        username=normalize_username(user_data.username),
+        email=normalize_email(user_data.email)
     )
     user.set_password(user_data.password)
-    
+
+    # A single INSERT; the unique indexes on username and email decide
+    # duplicates atomically instead of racing SELECTs
     db.add(user)
-    db.commit()
-    db.refresh(user)
-    
-    # Create access token - sub must be a string
-    access_token = create_access_token(data={"sub": str(user.id)})
-    
-    return AuthResponse(
-        message="User created successfully",
-        access_token=access_token,
-        user=UserResponse(
+    try:
+        db.flush()
+        response_user = UserResponse(
             id=user.id,
             username=user.username,
             email=user.email,
             created_at=user.created_at
         )
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        field = _duplicate_field(db, e, user.username, user.email)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already exists" if field == "username" else "Email already exists"
+        )
+    availability.add(response_user.id, response_user.username, response_user.email)
+    player_index.add(response_user.id, response_user.username)
+
+    # Create access token - sub must be a string
+    access_token = create_access_token(data={"sub": str(response_user.id)})
+
+    return AuthResponse(
+        message="User created successfully",
+        access_token=access_token,
+        user=response_user
     )
 
 
+@router.get("/available", response_model=AvailabilityResponse)
+async def check_availability(
+    username: Optional[str] = Query(None, min_length=1, max_length=80),
+    email: Optional[str] = Query(None, min_length=1, max_length=120),
+    db: Session = Depends(get_db)
+):
+    """Whether a username and/or email is still free, for live signup form feedback"""
+    if username is None and email is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass username or email"
+        )
+    result = AvailabilityResponse()
+    # The first check in a worker loads every user into the filter; keep that off the event loop
+    if username is not None:
+        result.username_available, checked = await run_in_threadpool(availability.username_available, db, username)
+        metrics.AVAILABILITY_CHECKS.inc(("username", _outcome(result.username_available, checked)))
+    if email is not None:
+        result.email_available, checked = await run_in_threadpool(availability.email_available, db, email)
+        metrics.AVAILABILITY_CHECKS.inc(("email", _outcome(result.email_available, checked)))
+    return result
+
+
+def _outcome(available: bool, checked_database: bool) -> str:
+    if not checked_database:
+        return "filter_miss"
+    return "false_positive" if available else "taken"
+
+
 @router.post("/login", response_model=AuthResponse)
 async def login(login_data: UserLogin, db: Session = Depends(get_db)):
     """Login user"""
-    # Find user by username
-    user = db.query(User).filter(User.username == login_data.username).first()
+    # Find user by username, stored as signup normalised it
+    user = db.query(User).filter(User.username == normalize_username(login_data.username)).first()
     
     if not user or not user.check_password(login_data.password):
         raise HTTPException(
@@ -80,8 +139,8 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
-    """Get current user info"""
+async def get_current_user_info(current_user: User = Depends(get_current_user_primary)):
+    """Get current user info (from the primary, so it is current right after signup)"""
     return UserResponse(
         id=current_user.id,
         username=current_user.username,
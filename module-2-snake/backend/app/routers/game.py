@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func
 from datetime import datetime
@@ -8,8 +8,11 @@ from app.database import get_db
 from app.db_models import User, Game
 from app.schemas import GameResponse, GameEnd, LeaderboardEntry, UserStats
 from app.auth import get_current_user
+from app.negotiation import NegotiatedRoute
+from app.response_cache import response_cache
+from app.sharding import player_names, shards
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 @router.post("/start", response_model=GameResponse, status_code=status.HTTP_201_CREATED)
@@ -18,21 +21,23 @@ async def start_game(
     db: Session = Depends(get_db)
 ):
     """Start a new game"""
-    # End any active games for this user
-    active_games = db.query(Game).filter(
-        Game.user_id == current_user.id,
-        Game.is_active == True
-    ).all()
-    
-    for game in active_games:
-        game.is_active = False
-        game.ended_at = datetime.utcnow()
-    
-    # Create new game
-    game = Game(user_id=current_user.id)
-    db.add(game)
-    db.commit()
-    db.refresh(game)
+    with shards.for_user(db, current_user.id) as games_db:
+        # End any active games for this user
+        active_games = games_db.query(Game).filter(
+            Game.user_id == current_user.id,
+            Game.is_active == True
+        ).all()
+        
+        for game in active_games:
+            game.is_active = False
+            game.ended_at = datetime.utcnow()
+        
+        # Create new game
+        game = Game(user_id=current_user.id)
+        games_db.add(game)
+        games_db.commit()
+        games_db.refresh(game)
+    response_cache.invalidate("games")
     
     return GameResponse(
         id=game.id,
@@ -54,28 +59,31 @@ async def end_game(
     db: Session = Depends(get_db)
 ):
     """End a game and save score"""
-    game = db.query(Game).filter(Game.id == game_id).first()
-    
-    if not game:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Game not found"
-        )
-    
-    if game.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Unauthorized"
-        )
-    
-    # Update game
-    game.score = game_data.score
-    game.duration = game_data.duration or 0
-    game.is_active = False
-    game.ended_at = datetime.utcnow()
-    
-    db.commit()
-    db.refresh(game)
+    # With sharding, game ids are per shard: look on the caller's own shard
+    with shards.for_user(db, current_user.id) as games_db:
+        game = games_db.query(Game).filter(Game.id == game_id).first()
+        
+        if not game:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Game not found"
+            )
+        
+        if game.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Unauthorized"
+            )
+        
+        # Update game
+        game.score = game_data.score
+        game.duration = game_data.duration or 0
+        game.is_active = False
+        game.ended_at = datetime.utcnow()
+        
+        games_db.commit()
+        games_db.refresh(game)
+    response_cache.invalidate("games")
     
     return GameResponse(
         id=game.id,
@@ -92,9 +100,10 @@ async def end_game(
 @router.get("/active", response_model=List[GameResponse])
 async def get_active_games(db: Session = Depends(get_db)):
     """Get all active games for spectating"""
-    games = db.query(Game).filter(
+    games = shards.top(db, lambda s: s.query(Game).filter(
         Game.is_active == True
-    ).order_by(desc(Game.score)).limit(20).all()
+    ).order_by(desc(Game.score)), 20)
+    names = player_names(db, games)
     
     result = []
     for game in games:
@@ -106,7 +115,7 @@ async def get_active_games(db: Session = Depends(get_db)):
         result.append(GameResponse(
             id=game.id,
             user_id=game.user_id,
-            username=game.player.username if game.player else None,
+            username=names.get(game.user_id),
             score=game.score,
             duration=duration,
             is_active=game.is_active,
@@ -118,18 +127,23 @@ async def get_active_games(db: Session = Depends(get_db)):
 
 
 @router.get("/leaderboard", response_model=List[LeaderboardEntry])
-async def get_leaderboard(limit: int = 50, db: Session = Depends(get_db)):
+async def get_leaderboard(request: Request, limit: int = 50, db: Session = Depends(get_db)):
     """Get top scores leaderboard"""
+    return response_cache.respond(request, ("games", limit), lambda: _top_games(db, limit))
+
+
+def _top_games(db: Session, limit: int) -> List[LeaderboardEntry]:
     # Get top scores
-    top_games = db.query(Game).filter(
+    top_games = shards.top(db, lambda s: s.query(Game).filter(
         Game.is_active == False
-    ).order_by(desc(Game.score)).limit(limit).all()
+    ).order_by(desc(Game.score)), limit)
+    names = player_names(db, top_games)
     
     leaderboard = []
     for rank, game in enumerate(top_games, 1):
         leaderboard.append(LeaderboardEntry(
             rank=rank,
-            username=game.player.username if game.player else "Unknown",
+            username=names.get(game.user_id, "Unknown"),
             score=game.score,
             duration=game.duration,
             played_at=game.ended_at
@@ -150,10 +164,11 @@ async def get_user_stats(user_id: int, db: Session = Depends(get_db)):
         )
     
     # Get user's completed games
-    games = db.query(Game).filter(
-        Game.user_id == user_id,
-        Game.is_active == False
-    ).all()
+    with shards.for_user(db, user_id) as games_db:
+        games = games_db.query(Game).filter(
+            Game.user_id == user_id,
+            Game.is_active == False
+        ).all()
     
     games_played = len(games)
     high_score = max((g.score for g in games), default=0)
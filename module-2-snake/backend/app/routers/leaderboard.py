@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from typing import List, Optional
@@ -7,25 +7,37 @@ import uuid
 
 from app.database import get_db
 from app.db_models import User, LeaderboardEntryDB
-from app.schemas import LeaderboardEntry, SubmitScoreRequest, GameMode
+from app.schemas import (
+    LeaderboardEntry, SubmitScoreRequest, GameMode, SketchWindow, ScorePercentile, ScoreDistribution
+)
 from app.auth import get_current_user
+from app.negotiation import NegotiatedRoute
+from app.percentiles import score_sketches
+from app.response_cache import response_cache
+from app.sharding import shards
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 @router.get("", response_model=List[LeaderboardEntry])
 async def get_leaderboard_entries(
+    request: Request,
     mode: Optional[GameMode] = None,
     limit: int = Query(10, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
     """Get leaderboard entries, optionally filtered by game mode"""
-    query = db.query(LeaderboardEntryDB)
-    
-    if mode:
-        query = query.filter(LeaderboardEntryDB.mode == mode.value)
+    return response_cache.respond(request, ("leaderboard", mode, limit), lambda: _top_entries(db, mode, limit))
+
+
+def _top_entries(db: Session, mode: Optional[GameMode], limit: int) -> List[LeaderboardEntry]:
+    def top_query(session: Session):
+        query = session.query(LeaderboardEntryDB)
+        if mode:
+            query = query.filter(LeaderboardEntryDB.mode == mode.value)
+        return query.order_by(desc(LeaderboardEntryDB.score))
     
-    entries = query.order_by(desc(LeaderboardEntryDB.score)).limit(limit).all()
+    entries = shards.top(db, top_query, limit)
     
     result = []
     for rank, entry in enumerate(entries, 1):
@@ -59,11 +71,16 @@ async def submit_score(
         timestamp=datetime.now(timezone.utc)
     )
     
-    db.add(entry)
-    db.commit()
-    db.refresh(entry)
+    with shards.for_user(db, current_user.id) as scores_db:
+        scores_db.add(entry)
+        scores_db.commit()
+        scores_db.refresh(entry)
+    response_cache.invalidate("leaderboard")
+    # Share of earlier games in this mode that the new score beats
+    percentile, _, _ = score_sketches.percentile(request.mode.value, request.score)
+    score_sketches.record(request.mode.value, request.score)
     
-    return {"message": "Score submitted successfully", "id": entry.id}
+    return {"message": "Score submitted successfully", "id": entry.id, "percentile": round(percentile, 1)}
 
 
 @router.get("/user/{user_id}", response_model=List[LeaderboardEntry])
@@ -73,9 +90,10 @@ async def get_user_scores(
     db: Session = Depends(get_db)
 ):
     """Get a specific user's leaderboard entries"""
-    entries = db.query(LeaderboardEntryDB).filter(
-        LeaderboardEntryDB.user_id == user_id
-    ).order_by(desc(LeaderboardEntryDB.score)).limit(limit).all()
+    with shards.for_user(db, user_id) as scores_db:
+        entries = scores_db.query(LeaderboardEntryDB).filter(
+            LeaderboardEntryDB.user_id == user_id
+        ).order_by(desc(LeaderboardEntryDB.score)).limit(limit).all()
     
     result = []
     for rank, entry in enumerate(entries, 1):
@@ -95,28 +113,36 @@ async def get_user_scores(
 
 @router.get("/top", response_model=List[LeaderboardEntry])
 async def get_top_scores(
+    request: Request,
     mode: Optional[GameMode] = None,
     db: Session = Depends(get_db)
 ):
     """Get top 10 scores"""
-    query = db.query(LeaderboardEntryDB)
-    
-    if mode:
-        query = query.filter(LeaderboardEntryDB.mode == mode.value)
-    
-    entries = query.order_by(desc(LeaderboardEntryDB.score)).limit(10).all()
-    
-    result = []
-    for rank, entry in enumerate(entries, 1):
-        result.append(LeaderboardEntry(
-            id=entry.id,
-            rank=rank,
-            username=entry.username,
-            score=entry.score,
-            mode=GameMode(entry.mode) if entry.mode else GameMode.WALLS,
-            duration=entry.duration or 0,
-            timestamp=entry.timestamp,
-            played_at=entry.timestamp
-        ))
-    
-    return result
+    return response_cache.respond(request, ("leaderboard", mode, 10), lambda: _top_entries(db, mode, 10))
+
+
+QUANTILES = {"p10": 0.1, "p25": 0.25, "p50": 0.5, "p75": 0.75, "p90": 0.9, "p99": 0.99}
+
+
+@router.get("/percentile", response_model=ScorePercentile)
+async def get_score_percentile(
+    score: int = Query(..., ge=0),
+    mode: GameMode = GameMode.WALLS,
+    window: SketchWindow = SketchWindow.ALL
+):
+    """Get the percentage of games in a mode and window that scored below a score"""
+    percentile, error, games = score_sketches.percentile(mode.value, score, window.value)
+    return ScorePercentile(mode=mode, window=window, score=score, percentile=round(percentile, 2),
+                           error=round(error, 2), games=games)
+
+
+@router.get("/distribution", response_model=ScoreDistribution)
+async def get_score_distribution(
+    mode: GameMode = GameMode.WALLS,
+    window: SketchWindow = SketchWindow.ALL
+):
+    """Get score quantiles for a mode and window"""
+    histogram = score_sketches.histogram(mode.value, window.value)
+    quantiles = {name: histogram.quantile(q) for name, q in QUANTILES.items()}
+    return ScoreDistribution(mode=mode, window=window, games=histogram.total,
+                             quantiles={name: round(v, 1) if v is not None else None for name, v in quantiles.items()})
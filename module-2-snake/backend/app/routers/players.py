@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List
+
+from app.database import get_db
+from app.db_models import LeaderboardEntryDB
+from app.player_search import player_index
+from app.schemas import PlayerSearchResult
+from app.sharding import shards
+
+router = APIRouter()
+
+
+@router.get("/search", response_model=List[PlayerSearchResult])
+async def search_players(
+    # At least one non-space character; a blank prefix would list every player
+    q: str = Query(..., min_length=1, max_length=80, pattern=r"\S"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """Players whose username starts with ``q`` (case-insensitive), with their best score"""
+    # The first search in a worker loads every user; keep that off the event loop
+    await run_in_threadpool(player_index.sync, db)
+    matches = player_index.search(q.strip(), limit)
+    if not matches:
+        return []
+
+    def best_scores(session: Session, user_ids: List[int]):
+        return session.query(LeaderboardEntryDB.user_id, func.max(LeaderboardEntryDB.score)) \
+            .filter(LeaderboardEntryDB.user_id.in_(user_ids)) \
+            .group_by(LeaderboardEntryDB.user_id).all()
+
+    best = dict(shards.for_users(db, [user_id for user_id, _ in matches], best_scores))
+    return [
+        PlayerSearchResult(id=user_id, username=username, best_score=best.get(user_id))
+        for user_id, username in matches
+    ]
@@ -0,0 +1,150 @@
+"""Database schema versioning.
+
+Migrations live in ``app/migrations`` and are applied with Alembic. On boot a
+worker only reads ``alembic_version`` and compares it with
+``SCHEMA_REVISION``. That is a single-row SELECT, where ``create_all`` had to
+reflect every table. Alembic is imported only when an upgrade is actually
+needed.
+
+Revision ids are zero-padded sequence numbers, so "the database is ahead of
+this code" (an old worker during a rolling deploy) is a string comparison.
+
+    python -m app.schema upgrade    # apply pending migrations (main db and shards)
+    python -m app.schema check      # exit 1 unless every database is current
+"""
+from contextlib import contextmanager
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import exc, inspect
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Head of app/migrations/versions - bump together with every new migration
+SCHEMA_REVISION = "0004"
+# Head of app/shard_migrations/versions, for DATABASE_SHARD_URLS databases
+SHARD_SCHEMA_REVISION = "s0001"
+# Revision matching the tables ``create_all`` used to build on boot
+BASELINE_REVISION = "0001"
+
+# Workers apply pending migrations themselves unless this is turned off, in
+# which case they refuse to start on an out-of-date schema
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1").lower() not in ("0", "false", "no")
+
+_PG_LOCK_KEY = 0x534E414B45  # "SNAKE"
+
+
+def current_revision(engine) -> Optional[str]:
+    """Revision recorded in the database, or None if it was never migrated"""
+    with engine.connect() as conn:
+        try:
+            return conn.exec_driver_sql("SELECT version_num FROM alembic_version").scalar()
+        except exc.DBAPIError:
+            return None
+
+
+@contextmanager
+def _migration_lock(engine):
+    """Serialise upgrades across the workers of one or more hosts"""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.exec_driver_sql(f"SELECT pg_advisory_lock({_PG_LOCK_KEY})")
+            try:
+                yield
+            finally:
+                conn.exec_driver_sql(f"SELECT pg_advisory_unlock({_PG_LOCK_KEY})")
+        return
+    try:
+        import fcntl
+    except ImportError:  # not POSIX; single-process development only
+        yield
+        return
+    digest = hashlib.sha1(str(engine.url).encode()).hexdigest()[:12]
+    with open(os.path.join(tempfile.gettempdir(), f"snake-migrate-{digest}.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _alembic_config(shard: bool = False):
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", "app:shard_migrations" if shard else "app:migrations")
+    return config
+
+
+def upgrade(engine, revision: str = "head", shard: bool = False):
+    """Apply pending migrations, adopting databases built by ``create_all``"""
+    from alembic import command
+
+    expected = SHARD_SCHEMA_REVISION if shard else SCHEMA_REVISION
+    with _migration_lock(engine):
+        # Another worker may have finished while we waited for the lock
+        before = current_revision(engine)
+        if before == expected and revision == "head":
+            return
+        config = _alembic_config(shard)
+        with engine.begin() as conn:
+            config.attributes["connection"] = conn
+            if not shard and before is None and inspect(conn).has_table("users"):
+                logger.info("Stamping pre-migration database at %s", BASELINE_REVISION)
+                command.stamp(config, BASELINE_REVISION)
+            command.upgrade(config, revision)
+
+
+def ensure_schema(engine, migrate: bool = MIGRATE_ON_STARTUP, shard: bool = False) -> str:
+    """Make sure the schema is usable by this code before serving requests.
+
+    Returns ``"current"``, ``"ahead"`` or ``"upgraded"``; raises RuntimeError
+    if the schema is behind and ``migrate`` is off.
+    """
+    expected = SHARD_SCHEMA_REVISION if shard else SCHEMA_REVISION
+    revision = current_revision(engine)
+    if revision == expected:
+        return "current"
+    if revision is not None and revision > expected:
+        logger.warning("Database schema %s is newer than this build (%s)", revision, expected)
+        return "ahead"
+    if not migrate:
+        raise RuntimeError(
+            f"Database schema is at {revision or 'no revision'}, expected {expected}; "
+            "run `python -m app.schema upgrade`"
+        )
+    upgrade(engine, shard=shard)
+    return "upgraded"
+
+
+def main(argv=None):
+    from app.database import engine
+    from app.sharding import shards
+
+    targets = [(engine, False)] + [(shard_engine, True) for shard_engine in shards.engines]
+    command = (argv or sys.argv[1:] or ["check"])[0]
+    if command == "upgrade":
+        for target, shard in targets:
+            upgrade(target, shard=shard)
+            print(f"{target.url.render_as_string()} at revision {current_revision(target)}")
+    elif command == "check":
+        behind = 0
+        for target, shard in targets:
+            revision = current_revision(target)
+            expected = SHARD_SCHEMA_REVISION if shard else SCHEMA_REVISION
+            print(f"{target.url.render_as_string()} at revision {revision}, code expects {expected}")
+            behind += revision != expected
+        sys.exit(1 if behind else 0)
+    else:
+        sys.exit(f"Unknown command {command!r}; expected 'upgrade' or 'check'")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -35,6 +35,17 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class AvailabilityResponse(BaseModel):
+    username_available: Optional[bool] = None
+    email_available: Optional[bool] = None
+
+
+class PlayerSearchResult(BaseModel):
+    id: int
+    username: str
+    best_score: Optional[int] = None
+
+
 class AuthResponse(BaseModel):
     message: str
     access_token: str
@@ -90,6 +101,39 @@ class SubmitScoreRequest(BaseModel):
     mode: GameMode = GameMode.WALLS
 
 
+class SketchWindow(str, Enum):
+    ALL = "all"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class ScorePercentile(BaseModel):
+    mode: GameMode
+    window: SketchWindow
+    score: int
+    percentile: float
+    error: float
+    games: int
+
+
+class ScoreDistribution(BaseModel):
+    mode: GameMode
+    window: SketchWindow
+    games: int
+    quantiles: Dict[str, Optional[float]]
+
+
+class AnalyticsTable(str, Enum):
+    GAMES = "games"
+    LEADERBOARD = "leaderboard"
+
+
+class CohortPeriod(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+
+
 class UserStats(BaseModel):
     user_id: int
     username: str
@@ -0,0 +1,18 @@
+"""Alembic environment for shard databases (see ``app.sharding``).
+
+Always run through ``app.schema`` with a connection, once per shard URL.
+"""
+from alembic import context
+
+from app.sharding import shard_metadata
+
+config = context.config
+
+connection = config.attributes["connection"]
+context.configure(
+    connection=connection,
+    target_metadata=shard_metadata,
+    render_as_batch=connection.dialect.name == "sqlite",
+)
+with context.begin_transaction():
+    context.run_migrations()
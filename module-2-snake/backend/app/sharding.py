@@ -0,0 +1,231 @@
+"""Optional hash sharding of games and leaderboard entries by user.
+
+With ``DATABASE_SHARD_URLS`` set, ``Game`` and ``LeaderboardEntryDB`` rows
+live on the shard chosen by a jump consistent hash of their ``user_id``.
+Users stay in the main database. Per-user reads and writes touch exactly one
+shard. Global top-N queries run the same query on every shard in parallel
+and k-way merge the already-sorted per-shard results, so at most N rows
+per shard are read.
+
+Shards hold only the ``games`` and ``leaderboard`` tables, without foreign
+keys to ``users`` (see ``app/shard_migrations``). ORM relationships to
+``User`` can't be loaded from a shard session; use ``player_names``.
+Game ids are assigned per shard, so only ``(user_id, id)`` is globally
+unique.
+
+Jump hash moves only ~1/N of users when a shard is appended to the list.
+Rebalance after changing it:
+
+    python -m app.sharding rebalance --from sqlite:///s0.db,sqlite:///s1.db \\
+        --to sqlite:///s0.db,sqlite:///s1.db,sqlite:///s2.db [--dry-run]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+import argparse
+import heapq
+import itertools
+import os
+from typing import Callable, Dict, Iterable, List
+
+from dotenv import load_dotenv
+from sqlalchemy import Column, MetaData, Table, create_engine
+from sqlalchemy.orm import Query, Session, sessionmaker
+
+from app.db_models import Game, LeaderboardEntryDB, User
+
+load_dotenv()
+
+DATABASE_SHARD_URLS = [url.strip() for url in os.getenv("DATABASE_SHARD_URLS", "").split(",") if url.strip()]
+
+SHARDED_MODELS = (Game, LeaderboardEntryDB)
+
+
+def _shard_table(table: Table, metadata: MetaData) -> Table:
+    # Same columns and indexes, minus the foreign keys into ``users``
+    return Table(table.name, metadata, *[
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable,
+               index=c.index, unique=c.unique)
+        for c in table.columns
+    ])
+
+
+shard_metadata = MetaData()
+for _model in SHARDED_MODELS:
+    _shard_table(_model.__table__, shard_metadata)
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Lamping & Veach jump consistent hash of a non-negative integer key"""
+    b, j = -1, 0
+    key &= 0xFFFFFFFFFFFFFFFF
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def _create_engine(url: str):
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(url)
+
+
+class ShardSet:
+    """The configured shards and the helpers routers use to reach them"""
+
+    def __init__(self, urls: List[str]):
+        self.urls = list(urls)
+        self.engines = [_create_engine(url) for url in self.urls]
+        self.sessions = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in self.engines]
+        self._pool = ThreadPoolExecutor(max_workers=len(self.urls), thread_name_prefix="shard") \
+            if len(self.urls) > 1 else None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.urls)
+
+    def shard_for(self, user_id: int) -> int:
+        return jump_hash(user_id, len(self.urls))
+
+    @contextmanager
+    def _session(self, index: int):
+        db = self.sessions[index]()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def for_user(self, db: Session, user_id: int):
+        """Context manager for the session holding ``user_id``'s games and scores.
+
+        Yields ``db`` itself when sharding is off.
+        """
+        if not self.enabled:
+            return nullcontext(db)
+        return self._session(self.shard_for(user_id))
+
+    def scatter(self, fn: Callable[[Session], list]) -> List[list]:
+        """Run ``fn`` against every shard concurrently; results in shard order"""
+        def run(index):
+            with self._session(index) as db:
+                return fn(db)
+
+        if self._pool is None:
+            return [run(index) for index in range(len(self.urls))]
+        return list(self._pool.map(run, range(len(self.urls))))
+
+    def for_users(self, db: Session, user_ids: Iterable[int], fn: Callable[[Session, List[int]], list]) -> list:
+        """Concatenated ``fn(session, ids)`` over the shards holding ``user_ids``"""
+        if not self.enabled:
+            return list(fn(db, list(user_ids)))
+        groups: Dict[int, List[int]] = {}
+        for user_id in user_ids:
+            groups.setdefault(self.shard_for(user_id), []).append(user_id)
+        results = []
+        for index, ids in sorted(groups.items()):
+            with self._session(index) as shard_db:
+                results.extend(fn(shard_db, ids))
+        return results
+
+    def top(self, db: Session, query: Callable[[Session], Query], limit: int,
+            key: Callable = lambda row: row.score) -> list:
+        """Top ``limit`` rows of ``query`` (already ordered by ``key`` descending).
+
+        Without sharding this is just ``query(db).limit(limit)``; with it,
+        each shard returns its own top ``limit`` and the sorted lists are
+        heap-merged.
+        """
+        if not self.enabled:
+            return query(db).limit(limit).all()
+        per_shard = self.scatter(lambda shard_db: query(shard_db).limit(limit).all())
+        return list(itertools.islice(heapq.merge(*per_shard, key=key, reverse=True), limit))
+
+
+shards = ShardSet(DATABASE_SHARD_URLS)
+
+
+def player_names(db: Session, rows: Iterable) -> Dict[int, str]:
+    """Usernames for the ``user_id`` of each row, in one query on the main database"""
+    user_ids = {row.user_id for row in rows}
+    if not user_ids:
+        return {}
+    return dict(db.query(User.id, User.username).filter(User.id.in_(user_ids)).all())
+
+
+def _copy_row(row, model, keep_id: bool) -> dict:
+    data = {column.name: getattr(row, column.name) for column in model.__table__.columns}
+    if not keep_id:
+        data.pop("id")
+    return data
+
+
+def rebalance(old_urls: List[str], new_urls: List[str], dry_run: bool = False,
+              log: Callable[[str], None] = print) -> Dict[tuple, int]:
+    """Move every user's rows to the shard the new URL list assigns them.
+
+    Moves are per user and idempotent: the user's rows on the target are
+    replaced, then deleted from the source, so an interrupted run can simply
+    be repeated. Pause writes while it runs. Game ids are reassigned by the
+    target shard; leaderboard ids (UUIDs) are kept.
+    """
+    engines = {url: _create_engine(url) for url in dict.fromkeys(old_urls + new_urls)}
+    factories = {url: sessionmaker(bind=engine) for url, engine in engines.items()}
+    moved: Dict[tuple, int] = {}
+    try:
+        for source_url in dict.fromkeys(old_urls):
+            with factories[source_url]() as source:
+                user_ids = sorted({uid for model in SHARDED_MODELS
+                                   for (uid,) in source.query(model.user_id).distinct()})
+            for user_id in user_ids:
+                target_url = new_urls[jump_hash(user_id, len(new_urls))]
+                if target_url == source_url:
+                    continue
+                moved[(source_url, target_url)] = moved.get((source_url, target_url), 0) + 1
+                if dry_run:
+                    continue
+                with factories[source_url]() as source, factories[target_url]() as target:
+                    for model in SHARDED_MODELS:
+                        rows = source.query(model).filter(model.user_id == user_id).all()
+                        target.query(model).filter(model.user_id == user_id).delete(synchronize_session=False)
+                        if rows:
+                            target.execute(model.__table__.insert(), [
+                                _copy_row(row, model, keep_id=model is not Game) for row in rows
+                            ])
+                    target.commit()
+                    for model in SHARDED_MODELS:
+                        source.query(model).filter(model.user_id == user_id).delete(synchronize_session=False)
+                    source.commit()
+        for (source_url, target_url), users in sorted(moved.items()):
+            log(f"{'would move' if dry_run else 'moved'} {users} users: {source_url} -> {target_url}")
+        if not moved:
+            log("every user is already on its shard")
+        return moved
+    finally:
+        for engine in engines.values():
+            engine.dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shard maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rb = sub.add_parser("rebalance", help="move users to the shards a new URL list assigns")
+    rb.add_argument("--from", dest="old", required=True, help="current comma-separated shard URLs")
+    rb.add_argument("--to", dest="new", required=True, help="new comma-separated shard URLs")
+    rb.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    from app import schema
+
+    old_urls = [url.strip() for url in args.old.split(",") if url.strip()]
+    new_urls = [url.strip() for url in args.new.split(",") if url.strip()]
+    if not args.dry_run:
+        for url in new_urls:
+            engine = _create_engine(url)
+            schema.upgrade(engine, shard=True)
+            engine.dispose()
+    rebalance(old_urls, new_urls, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
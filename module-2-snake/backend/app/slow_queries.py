@@ -0,0 +1,226 @@
+"""Slow-query log with automatic EXPLAIN capture.
+
+Statements slower than ``SLOW_QUERY_MS`` are recorded with their normalised
+SQL, the shape (not the values) of their parameters, the duration and the
+route that issued them, and are aggregated by fingerprint. The first time a
+fingerprint is seen, and again after ``SLOW_QUERY_EXPLAIN_TTL`` seconds, a
+background thread runs ``EXPLAIN QUERY PLAN`` (SQLite) or ``EXPLAIN``
+(PostgreSQL) for it on its own connection, so plan changes show up as the
+tables grow without adding latency to the request.
+"""
+from collections import deque
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from typing import Deque, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+from app.metrics import current_route
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_KEEP = int(os.getenv("SLOW_QUERY_KEEP", "200"))
+SLOW_QUERY_EXPLAIN_TTL = float(os.getenv("SLOW_QUERY_EXPLAIN_TTL", "600"))
+SAMPLES_PER_FINGERPRINT = 256
+
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+    "mysql": "EXPLAIN ",
+}
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_NAMED_PARAM = re.compile(r"%\(\w+\)s|:\w+\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalise SQL so that executions differing only in literals group together"""
+    sql = _STRING.sub("?", statement)
+    sql = _NAMED_PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _SPACE.sub(" ", sql).strip()
+    return _IN_LIST.sub("(?+)", sql)
+
+
+def params_shape(parameters, executemany: bool) -> str:
+    """Describe parameter types without exposing values"""
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x {params_shape(rows[0], False)}" if rows else "0 x ()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    if parameters:
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return "()"
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class _Fingerprint:
+    __slots__ = ("sql", "count", "total", "max", "samples", "routes", "plan", "plan_at")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=SAMPLES_PER_FINGERPRINT)
+        self.routes: Dict[str, int] = {}
+        self.plan: Optional[List[str]] = None
+        self.plan_at = 0.0
+
+    def as_dict(self) -> dict:
+        ordered = sorted(self.samples)
+        return {
+            "fingerprint": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+            "routes": dict(sorted(self.routes.items(), key=lambda kv: -kv[1])),
+            "plan": self.plan,
+        }
+
+
+class SlowQueryLog:
+    """Collects slow statements from one or more engines"""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, keep: int = SLOW_QUERY_KEEP,
+                 explain_ttl: float = SLOW_QUERY_EXPLAIN_TTL):
+        self.threshold = threshold_ms / 1000.0
+        self.explain_ttl = explain_ttl
+        self.recent: Deque[dict] = deque(maxlen=keep)
+        self._fingerprints: Dict[str, _Fingerprint] = {}
+        self._fingerprint_cache: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._explain_queue: queue.Queue = queue.Queue(maxsize=100)
+        self._worker: Optional[threading.Thread] = None
+
+    def attach(self, engine):
+        """Listen for statements on ``engine``"""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            context._slow_query_started = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            duration = time.perf_counter() - context._slow_query_started
+            if duration >= self.threshold and not conn.info.get("explain_worker"):
+                self.record(engine, statement, parameters, executemany, duration)
+
+        return engine
+
+    def _fingerprint(self, statement: str) -> str:
+        sql = self._fingerprint_cache.get(statement)
+        if sql is None:
+            sql = fingerprint(statement)
+            if len(self._fingerprint_cache) < 4096:
+                self._fingerprint_cache[statement] = sql
+        return sql
+
+    def record(self, engine, statement: str, parameters, executemany: bool, duration: float):
+        sql = self._fingerprint(statement)
+        route = current_route.get()
+        now = time.time()
+        with self._lock:
+            entry = self._fingerprints.get(sql)
+            if entry is None:
+                entry = self._fingerprints[sql] = _Fingerprint(sql)
+            entry.count += 1
+            entry.total += duration
+            entry.max = max(entry.max, duration)
+            entry.samples.append(duration)
+            entry.routes[route] = entry.routes.get(route, 0) + 1
+            self.recent.append({
+                "fingerprint": sql,
+                "params": params_shape(parameters, executemany),
+                "duration_ms": round(duration * 1000, 3),
+                "route": route,
+                "at": now,
+            })
+            wants_plan = (
+                not executemany
+                and now - entry.plan_at >= self.explain_ttl
+                and statement.lstrip()[:6].upper().startswith(EXPLAINABLE)
+                and engine.dialect.name in EXPLAIN_PREFIXES
+            )
+            if wants_plan:
+                # Claim the refresh now so concurrent slow runs don't queue duplicates
+                entry.plan_at = now
+        if wants_plan:
+            self._queue_explain(engine, sql, statement, parameters)
+
+    def _queue_explain(self, engine, sql, statement, parameters):
+        try:
+            self._explain_queue.put_nowait((engine, sql, statement, parameters))
+        except queue.Full:
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._explain_loop, name="slow-query-explain",
+                                                daemon=True)
+                self._worker.start()
+
+    def _explain_loop(self):
+        while True:
+            engine, sql, statement, parameters = self._explain_queue.get()
+            try:
+                plan = self._explain(engine, statement, parameters)
+                with self._lock:
+                    self._fingerprints[sql].plan = plan
+            except Exception:
+                logger.warning("EXPLAIN failed", extra={"fingerprint": sql}, exc_info=True)
+            finally:
+                self._explain_queue.task_done()
+
+    @staticmethod
+    def _explain(engine, statement: str, parameters) -> List[str]:
+        prefix = EXPLAIN_PREFIXES[engine.dialect.name]
+        with engine.connect() as conn:
+            conn.info["explain_worker"] = True
+            try:
+                rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+            finally:
+                conn.info.pop("explain_worker", None)
+        if engine.dialect.name == "sqlite":
+            # (id, parent, notused, detail)
+            return [str(row[-1]) for row in rows]
+        return [" | ".join(str(col) for col in row) for row in rows]
+
+    def wait_for_plans(self):
+        """Block until queued EXPLAINs have run"""
+        self._explain_queue.join()
+
+    def stats(self) -> List[dict]:
+        """Fingerprints ordered by total time spent"""
+        with self._lock:
+            entries = [entry.as_dict() for entry in self._fingerprints.values()]
+        return sorted(entries, key=lambda e: -e["total_ms"])
+
+    def clear(self):
+        with self._lock:
+            self._fingerprints.clear()
+            self.recent.clear()
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,41 @@
+"""Analytics report latency over a large synthetic game history.
+
+Builds ``--games`` rows of synthetic columns in memory (no database) and
+times each report in ``app.analytics`` on them.
+
+    python -m benchmarks.analytics_bench --games 5000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.analytics import REPORTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=5_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    now = time.time()
+    columns = {
+        "user_id": rng.integers(1, args.users + 1, args.games),
+        "score": rng.exponential(400, args.games).astype("int64"),
+        "duration": rng.exponential(60, args.games).astype("int64") + 1,
+        "mode": rng.integers(0, 2, args.games).astype("int16"),
+        "at": now - rng.uniform(0, args.days * 86400, args.games),
+    }
+    modes = ["walls", "pass-through"]
+
+    for name, report in REPORTS.items():
+        t = time.perf_counter()
+        report(columns, modes)
+        print(f"{name}: {(time.perf_counter() - t) * 1000:.0f}ms over {args.games} games")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Headless load test for the multiplayer arena.
+
+Runs many rooms full of random-steering bots on a single event loop (one
+core), with no sockets and no database, and reports whether every room kept
+its tick rate.
+
+    python -m benchmarks.arena_load --rooms 50 --players 16 --hz 15
+    python -m benchmarks.arena_load --sweep --players 16 --hz 20 --pin
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from app.arena.manager import ArenaManager
+from app.arena.room import Player
+
+
+class BotPlayer(Player):
+    """Player whose frames are counted instead of written to a socket"""
+
+    def __init__(self, name: str):
+        super().__init__(None, name)
+        self.frames = 0
+        self.bytes = 0
+
+    def deliver(self, frame: str) -> bool:
+        self.frames += 1
+        self.bytes += len(frame)
+        return True
+
+
+async def drive_bots(bots, period: float, stop: asyncio.Event):
+    directions = ["up", "down", "left", "right"]
+    while not stop.is_set():
+        for bot in bots:
+            if bot.snake is None:
+                bot.room.respawn(bot)
+            elif random.random() < 0.2:
+                bot.steer(random.choice(directions))
+        await asyncio.sleep(period)
+
+
+async def run_once(rooms: int, players: int, hz: float, seconds: float) -> dict:
+    manager = ArenaManager(tick_rate=hz, capacity=players, result_sink=None)
+    bots = []
+    for r in range(rooms):
+        room = manager.open_room("walls")
+        for p in range(players):
+            bot = BotPlayer(f"bot-{r}-{p}")
+            if room.add_player(bot):
+                bots.append(bot)
+
+    stop = asyncio.Event()
+    driver = asyncio.create_task(drive_bots(bots, 1.0 / hz, stop))
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    stop.set()
+    await driver
+
+    described = manager.describe()
+    await manager.shutdown()
+
+    expected = hz * wall
+    achieved = [room["tick"] / wall for room in described]
+    late = sum(room["late_ticks"] for room in described)
+    total_ticks = sum(room["tick"] for room in described)
+    return {
+        "rooms": rooms,
+        "players": len(bots),
+        "hz": hz,
+        "tick_rate_min": min(achieved),
+        "tick_rate_mean": statistics.fmean(achieved),
+        "late_pct": 100.0 * late / max(total_ticks, 1),
+        "tick_ms_max": max(room["tick_ms_max"] for room in described),
+        "tick_ms_ewma_mean": statistics.fmean(room["tick_ms_ewma"] for room in described),
+        "coalescing_rooms": sum(1 for room in described if room["coalesce"] > 1),
+        "cpu_pct": 100.0 * cpu / wall,
+        "kb_per_s": sum(b.bytes for b in bots) / wall / 1024,
+        "sustained": min(achieved) >= 0.95 * hz and late <= 0.05 * total_ticks and expected > 0,
+    }
+
+
+def report(result: dict):
+    print(
+        f"rooms={result['rooms']:4d} players={result['players']:5d} hz={result['hz']:.0f} "
+        f"tick_rate(min/mean)={result['tick_rate_min']:.1f}/{result['tick_rate_mean']:.1f} "
+        f"late={result['late_pct']:.1f}% tick_ms(ewma/max)={result['tick_ms_ewma_mean']:.2f}/"
+        f"{result['tick_ms_max']:.2f} coalescing={result['coalescing_rooms']} "
+        f"cpu={result['cpu_pct']:.0f}% out={result['kb_per_s']:.0f}KiB/s "
+        f"{'OK' if result['sustained'] else 'FAIL'}"
+    )
+
+
+async def sweep(players: int, hz: float, seconds: float):
+    rooms = 1
+    best = None
+    while True:
+        result = await run_once(rooms, players, hz, seconds)
+        report(result)
+        if not result["sustained"]:
+            break
+        best = result
+        rooms *= 2
+    if best is None:
+        print("Could not sustain a single room")
+        return
+    # Refine between the last good and first bad power of two
+    low, high = best["rooms"], rooms
+    while high - low > max(1, low // 8):
+        mid = (low + high) // 2
+        result = await run_once(mid, players, hz, seconds)
+        report(result)
+        if result["sustained"]:
+            low, best = mid, result
+        else:
+            high = mid
+    print(f"\nOne core sustains {best['rooms']} rooms / {best['players']} players at {hz:.0f} Hz")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--players", type=int, default=16, help="bots per room")
+    parser.add_argument("--hz", type=float, default=15.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--sweep", action="store_true", help="find the max sustained room count")
+    parser.add_argument("--pin", action="store_true", help="pin the process to CPU 0")
+    args = parser.parse_args()
+
+    if args.pin and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {0})
+
+    if args.sweep:
+        asyncio.run(sweep(args.players, args.hz, args.seconds))
+    else:
+        report(asyncio.run(run_once(args.rooms, args.players, args.hz, args.seconds)))
+
+
+if __name__ == "__main__":
+    main()
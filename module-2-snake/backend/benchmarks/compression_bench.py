@@ -0,0 +1,100 @@
+"""CPU per request for JSON responses, uncompressed vs compressed vs cached.
+
+Drives a minimal FastAPI app directly through ASGI (no sockets) that returns
+``--sizes`` leaderboard-shaped rows. Each size is served four ways:
+
+- plain: serialised, no compression;
+- gzip: serialised and compressed by ``CompressionMiddleware``;
+- cached: served precompressed from ``ResponseCache``;
+- br/zstd: the same as gzip, when those packages are installed.
+
+CPU time is process time, so it is what a busy worker actually pays per
+request.
+
+    python -m benchmarks.compression_bench --sizes 10,100,1000,5000
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import time
+
+from fastapi import FastAPI, Request
+
+from app import compression
+from app.response_cache import ResponseCache
+
+
+def rows(n: int):
+    now = datetime.now(timezone.utc)
+    return [{"id": f"{i:08x}-0000-4000-8000-000000000000", "rank": i + 1, "username": f"player{i}",
+             "score": 10000 - i, "mode": "walls", "duration": 120, "timestamp": now, "played_at": now}
+            for i in range(n)]
+
+
+def build_app(n: int, compress: bool) -> FastAPI:
+    app = FastAPI()
+    cache = ResponseCache(ttl=3600)
+    data = rows(n)
+
+    @app.get("/fresh")
+    async def fresh():
+        return data
+
+    @app.get("/cached")
+    async def cached(request: Request):
+        return cache.respond(request, ("bench",), lambda: data)
+
+    if compress:
+        app.add_middleware(compression.CompressionMiddleware)
+    return app
+
+
+async def drive(app, path: str, accept: bytes, requests: int):
+    """(CPU microseconds per request, response body bytes)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"accept-encoding", accept)] if accept else [],
+        "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    for _ in range(20):
+        await app(dict(scope), receive, send)
+    size = 0
+    started = time.process_time()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.process_time() - started) / requests * 1e6, size // requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,5000", help="comma-separated row counts")
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    encodings = [e for e in compression.ENCODERS]
+    print(f"encodings available: {', '.join(encodings)}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        plain_app, compressed_app = build_app(n, False), build_app(n, True)
+        requests = max(20, args.requests * 100 // max(n, 100))
+        runs = [("plain", plain_app, "/fresh", b"")]
+        runs += [(e, compressed_app, "/fresh", e.encode()) for e in encodings]
+        runs += [(f"cached {e}", compressed_app, "/cached", e.encode()) for e in encodings]
+        print(f"\n{n} rows")
+        for label, app, path, accept in runs:
+            cpu, size = asyncio.run(drive(app, path, accept, requests))
+            print(f"  {label:12s} {cpu:9.1f}us cpu/request  {size:9d} bytes")
+
+
+if __name__ == "__main__":
+    main()
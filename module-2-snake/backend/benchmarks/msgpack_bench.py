@@ -0,0 +1,73 @@
+"""Payload size and codec time: MessagePack vs JSON for the game-client schemas.
+
+Builds realistic ``LeaderboardEntry`` lists and a single ``GameResponse``
+(the heartbeat-sized reply), dumps them with pydantic-core exactly as
+FastAPI does for a ``response_model``, then times encoding and decoding
+with ``json`` and ``msgpack``.
+
+    python -m benchmarks.msgpack_bench --sizes 1,10,100,1000
+"""
+import argparse
+from datetime import datetime, timezone
+import json
+import time
+from typing import List
+
+import msgpack
+from pydantic import TypeAdapter
+
+from app.schemas import GameMode, GameResponse, LeaderboardEntry
+
+
+def entries(n: int) -> List[LeaderboardEntry]:
+    now = datetime.now(timezone.utc)
+    return [LeaderboardEntry(id=f"{i:08x}-0000-4000-8000-000000000000", rank=i + 1, username=f"player{i}",
+                             score=10000 - i, mode=GameMode.WALLS, duration=120, timestamp=now, played_at=now)
+            for i in range(n)]
+
+
+def best_us(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        best = min(best, (time.perf_counter() - started) / repeats)
+    return best * 1e6
+
+
+def compare(label: str, adapter: TypeAdapter, value, repeats: int):
+    content = adapter.dump_python(value, mode="json")  # what FastAPI hands the response class
+    as_json = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+    as_msgpack = msgpack.packb(content, use_bin_type=True)
+
+    json_encode = best_us(lambda: json.dumps(adapter.dump_python(value, mode="json"),
+                                             ensure_ascii=False, separators=(",", ":")).encode(), repeats)
+    msgpack_encode = best_us(lambda: msgpack.packb(adapter.dump_python(value, mode="json"),
+                                                   use_bin_type=True), repeats)
+    json_decode = best_us(lambda: json.loads(as_json), repeats)
+    msgpack_decode = best_us(lambda: msgpack.unpackb(as_msgpack), repeats)
+
+    print(f"{label:22s} size json={len(as_json):8d}B msgpack={len(as_msgpack):8d}B "
+          f"({len(as_msgpack) / len(as_json) * 100:3.0f}%)  "
+          f"encode {json_encode:8.1f}/{msgpack_encode:8.1f}us  "
+          f"decode {json_decode:8.1f}/{msgpack_decode:8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,10,100,1000", help="comma-separated leaderboard lengths")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    print("encode/decode columns are json/msgpack")
+    game = GameResponse(id=1, user_id=7, username="player7", score=120, duration=30, is_active=False,
+                        started_at=datetime.now(timezone.utc), ended_at=datetime.now(timezone.utc))
+    compare("GameResponse", TypeAdapter(GameResponse), game, args.repeats * 10)
+    adapter = TypeAdapter(List[LeaderboardEntry])
+    for n in (int(s) for s in args.sizes.split(",")):
+        compare(f"LeaderboardEntry x{n}", adapter, entries(n), max(5, args.repeats * 10 // n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Score percentile lookup latency and accuracy against exact ranks.
+
+Fills a ``ScoreHistogram`` with ``--games`` exponentially distributed
+scores in memory (no database), then times ``percentile`` and ``quantile``
+and compares them with the exact answer from the sorted scores.
+
+    python -m benchmarks.percentile_bench --games 1000000
+"""
+import argparse
+import bisect
+import random
+import statistics
+import time
+
+from app.percentiles import ScoreHistogram
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=1_000_000)
+    parser.add_argument("--mean-score", type=float, default=400)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    scores = [int(rng.expovariate(1 / args.mean_score)) for _ in range(args.games)]
+
+    histogram = ScoreHistogram()
+    t = time.perf_counter()
+    for score in scores:
+        histogram.add(score)
+    print(f"add {args.games} games: {(time.perf_counter() - t) * 1e6 / args.games:.2f}us each")
+    scores.sort()
+
+    timings, worst, worst_bound = [], 0.0, 0.0
+    for _ in range(args.queries):
+        score = int(rng.expovariate(1 / args.mean_score))
+        t = time.perf_counter()
+        percent, error = histogram.percentile(score)
+        timings.append(time.perf_counter() - t)
+        exact = bisect.bisect_left(scores, score) / len(scores) * 100
+        worst = max(worst, abs(percent - exact))
+        worst_bound = max(worst_bound, error)
+    timings.sort()
+    print(f"percentile: mean={statistics.mean(timings) * 1e6:.1f}us "
+          f"p99={timings[int(len(timings) * 0.99)] * 1e6:.1f}us")
+    print(f"percentile error: worst={worst:.3f} points, worst reported bound={worst_bound:.3f}")
+
+    for q in (0.5, 0.9, 0.99):
+        estimate, exact = histogram.quantile(q), scores[int(q * len(scores))]
+        print(f"p{q * 100:g}: estimate={estimate:.1f} exact={exact} "
+              f"relative error={abs(estimate - exact) / max(exact, 1):.2%}")
+    print(f"memory: {len(histogram.counts())} non-empty buckets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Player prefix search latency at a large user count.
+
+Builds a ``PlayerIndex`` of ``--users`` synthetic usernames in memory (no
+database) and times ``search`` for random 1-4 character prefixes, the
+shape of autocomplete traffic.
+
+    python -m benchmarks.player_search_bench --users 1000000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+
+from app.player_search import PlayerIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    alphabet = string.ascii_letters + string.digits + "_"
+    rows = [(i, "".join(rng.choices(alphabet, k=rng.randint(4, 14)))) for i in range(1, args.users + 1)]
+
+    index = PlayerIndex()
+    t = time.perf_counter()
+    index._load(rows)
+    print(f"load {args.users} users: {time.perf_counter() - t:.2f}s")
+
+    t = time.perf_counter()
+    for i in range(1000):
+        index.add(args.users + 1 + i, "".join(rng.choices(alphabet, k=8)))
+    print(f"incremental insert: {(time.perf_counter() - t) * 1e6 / 1000:.0f}us each")
+
+    prefixes = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 4))) for _ in range(args.queries)]
+    timings = []
+    for prefix in prefixes:
+        t = time.perf_counter()
+        index.search(prefix, args.limit)
+        timings.append(time.perf_counter() - t)
+    timings.sort()
+    print(f"search: mean={statistics.mean(timings) * 1e6:.1f}us "
+          f"p99={timings[int(len(timings) * 0.99)] * 1e6:.1f}us max={timings[-1] * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Worker start-up time: process spawn to first successful request.
+
+Starts ``--workers`` independent uvicorn processes at once against a
+temporary SQLite database, the way an autoscaler brings up fresh containers.
+For each one it reports the time from spawn until ``GET /health`` first
+answers 200. It then compares the per-boot schema work in-process: the
+``alembic_version`` check against the ``create_all`` it replaced, both on an
+already-current database.
+
+    python -m benchmarks.startup_bench --workers 4
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from sqlalchemy import create_engine
+
+
+def wait_ready(port: int, proc: subprocess.Popen, timeout: float) -> float:
+    """Poll /health until it answers; returns the monotonic time it did"""
+    url = f"http://127.0.0.1:{port}/health"
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"worker on port {port} exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=0.5) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"worker on port {port} not ready after {timeout}s")
+
+
+def time_to_first_request(workers: int, base_port: int, database_url: str, timeout: float):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    procs = []
+    started = time.perf_counter()
+    for i in range(workers):
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--port", str(base_port + i), "--log-level", "warning"],
+            env=env,
+        ))
+    try:
+        return [wait_ready(base_port + i, proc, timeout) - started for i, proc in enumerate(procs)]
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+def import_seconds() -> float:
+    """Wall time of ``import app.main`` in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    return float(subprocess.check_output([sys.executable, "-c", code]).decode())
+
+
+def schema_check_ms(database_url: str, repeats: int):
+    from app import schema
+    from app.database import Base
+
+    engine = create_engine(database_url)
+    schema.ensure_schema(engine, migrate=True)
+
+    def best(fn):
+        times = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t)
+        return min(times) * 1e3
+
+    check = best(lambda: schema.ensure_schema(engine, migrate=False))
+    create_all = best(lambda: Base.metadata.create_all(bind=engine))
+    engine.dispose()
+    return check, create_all
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--base-port", type=int, default=18100)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        imports = [import_seconds() for _ in range(3)]
+        print(f"import app.main: {min(imports) * 1e3:.0f}ms (best of 3)")
+
+        cold = time_to_first_request(args.workers, args.base_port, database_url, args.timeout)
+        print(f"cold (migrates): {' '.join(f'{t * 1e3:.0f}' for t in cold)} ms  "
+              f"max={max(cold) * 1e3:.0f}ms")
+        warm = time_to_first_request(args.workers, args.base_port, database_url, args.timeout)
+        print(f"warm (current):  {' '.join(f'{t * 1e3:.0f}' for t in warm)} ms  "
+              f"mean={statistics.mean(warm) * 1e3:.0f}ms max={max(warm) * 1e3:.0f}ms")
+
+        check, create_all = schema_check_ms(database_url, args.repeats)
+        print(f"per-boot schema work: version check={check:.2f}ms  create_all={create_all:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
-from app import create_app, socketio
+"""Run the API under uvicorn: ``python run.py``"""
+import os
 
-app = create_app()
+import uvicorn
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
@@ -9,9 +9,11 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_primary_db, get_read_db
 from app.db_models import User
 from app.auth import create_access_token
+from app.percentiles import score_sketches
+from app.response_cache import response_cache
 
 # Test database URL - uses SQLite file for integration tests
 TEST_DATABASE_URL = "sqlite:///./test_integration.db"
@@ -23,6 +25,7 @@ engine = create_engine(
     poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+score_sketches.session_factory = TestingSessionLocal
 
 
 def override_get_db():
@@ -39,6 +42,7 @@ def test_db():
     """Create a fresh database for each test"""
     # Create all tables
     Base.metadata.create_all(bind=engine)
+    score_sketches.reset()
     
     db = TestingSessionLocal()
     yield db
@@ -52,6 +56,10 @@ def test_db():
 def client(test_db):
     """Create a test client with overridden database"""
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_primary_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    # Cached responses would outlive the per-test database
+    response_cache.invalidate()
     
     with TestClient(app) as test_client:
         yield test_client
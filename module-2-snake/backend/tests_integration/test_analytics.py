@@ -0,0 +1,170 @@
+"""Integration tests for the columnar analytics snapshots and reports"""
+from datetime import datetime, timedelta
+import uuid
+
+import pytest
+
+from app import auth
+from app.db_models import Game, LeaderboardEntryDB
+from app.routers import admin
+from tests_integration.conftest import TestingSessionLocal
+
+np = pytest.importorskip("numpy")
+
+from app.analytics import MAX_PARTS, Analytics  # noqa: E402
+
+
+def add_game(db, user_id, score, duration=30, mode="walls", days_ago=0.0, active=False):
+    ended = datetime.utcnow() - timedelta(days=days_ago)
+    game = Game(user_id=user_id, score=score, duration=duration, mode=mode, is_active=active,
+                started_at=ended - timedelta(seconds=duration), ended_at=None if active else ended)
+    db.add(game)
+    db.commit()
+    return game
+
+
+def add_entry(db, user_id, score, minutes_ago=10.0):
+    db.add(LeaderboardEntryDB(id=str(uuid.uuid4()), user_id=user_id, username=f"user{user_id}", score=score,
+                              mode="walls", timestamp=datetime.utcnow() - timedelta(minutes=minutes_ago)))
+    db.commit()
+
+
+@pytest.fixture
+def engine(test_db, tmp_path):
+    return Analytics(directory=str(tmp_path), sources=lambda: [("main", TestingSessionLocal)],
+                     refresh_interval=3600, chunk_rows=3)
+
+
+class TestSnapshots:
+    """Tests for incremental, on-disk column snapshots"""
+
+    def test_refresh_reads_only_new_rows(self, engine, test_db):
+        for score in range(7):
+            add_game(test_db, 1, score)
+
+        first = engine.refresh()
+        add_game(test_db, 2, 100)
+        second = engine.refresh()
+
+        assert first == {"games": 7, "leaderboard": 0}
+        assert second == {"games": 1, "leaderboard": 0}
+        assert engine.snapshot("games").columns["score"].tolist() == [0, 1, 2, 3, 4, 5, 6, 100]
+
+    def test_snapshot_survives_a_restart(self, engine, test_db, tmp_path):
+        add_game(test_db, 1, 10)
+        add_game(test_db, 1, 20, mode="pass-through")
+        engine.refresh()
+
+        reopened = Analytics(directory=str(tmp_path), sources=lambda: [], refresh_interval=3600)
+        snapshot = reopened.snapshot("games")
+
+        assert snapshot.rows == 2
+        assert snapshot.meta["watermarks"]["main"] == 2
+
+    def test_active_games_are_picked_up_when_they_finish(self, engine, test_db):
+        game = add_game(test_db, 1, 0, active=True)
+        add_game(test_db, 1, 5)
+        engine.refresh()
+        assert engine.snapshot("games").rows == 1
+
+        game.is_active, game.score, game.ended_at = False, 70, datetime.utcnow()
+        test_db.commit()
+        engine.refresh()
+
+        assert sorted(engine.snapshot("games").columns["score"].tolist()) == [5, 70]
+        assert engine.status()["tables"]["games"]["open_games"] == 0
+
+    def test_recent_leaderboard_rows_wait_to_settle(self, engine, test_db):
+        for score in (1, 2, 3, 4):
+            add_entry(test_db, 1, score)
+        add_entry(test_db, 1, 99, minutes_ago=0)
+
+        assert engine.refresh()["leaderboard"] == 4
+        assert engine.refresh()["leaderboard"] == 0
+
+    def test_parts_are_compacted(self, engine, test_db):
+        for score in range(MAX_PARTS + 2):
+            add_game(test_db, 1, score)
+            engine.refresh(["games"])
+
+        snapshot = engine.snapshot("games")
+
+        assert len(snapshot.meta["parts"]) <= 2
+        assert snapshot.columns["score"].tolist() == list(range(MAX_PARTS + 2))
+
+
+class TestReports:
+    """Tests for the vectorised reports against straightforward Python"""
+
+    def test_score_distribution(self, engine, test_db):
+        scores = [3, 8, 15, 40, 41, 90, 120, 300]
+        for score in scores:
+            add_game(test_db, 1, score)
+        add_game(test_db, 1, 7, mode="pass-through")
+
+        report = engine.report("scores")["modes"]
+
+        assert report["walls"]["games"] == len(scores)
+        assert report["walls"]["mean"] == round(sum(scores) / len(scores), 2)
+        assert report["walls"]["percentiles"]["p50"] == float(np.percentile(scores, 50))
+        assert sum(report["walls"]["histogram"]["counts"]) == len(scores)
+        assert report["pass-through"]["max"] == 7
+
+    def test_duration_curve(self, engine, test_db):
+        for duration in range(1, 101):
+            add_game(test_db, 1, duration * 3, duration=duration)
+
+        bins = engine.report("durations", bins=4)["bins"]
+
+        assert [b["games"] for b in bins] == [25, 25, 25, 25]
+        assert bins[0]["median_score"] == 39.0
+        assert bins[-1]["mean_score"] == round(sum(d * 3 for d in range(76, 101)) / 25, 2)
+
+    def test_retention_cohorts(self, engine, test_db):
+        for user_id in (1, 2, 3, 4):
+            add_game(test_db, user_id, 10, days_ago=2)
+        for user_id in (1, 2):
+            add_game(test_db, user_id, 10, days_ago=1)
+        add_game(test_db, 1, 10, days_ago=0)
+        add_game(test_db, 5, 10, days_ago=0)
+
+        cohorts = engine.report("retention", period="day", periods=3)["cohorts"]
+
+        assert [(c["users"], c["retention"]) for c in cohorts] == [(4, [1.0, 0.5, 0.25]), (1, [1.0])]
+
+    def test_user_trends(self, engine, test_db):
+        for i, score in enumerate([10, 20, 30, 40, 50]):
+            add_game(test_db, 1, score, days_ago=5 - i)
+        for i, score in enumerate([50, 40, 30, 30, 30]):
+            add_game(test_db, 2, score, days_ago=5 - i)
+        add_game(test_db, 3, 500)
+
+        report = engine.report("trends", min_games=5)
+
+        assert report["players"] == 2
+        assert [(u["user_id"], u["slope"]) for u in report["users"]] == [(1, 10.0), (2, -5.0)]
+        assert report["users"][0]["best_score"] == 50
+
+
+class TestAnalyticsAdmin:
+    """Tests for the /api/admin/analytics routes"""
+
+    def test_requires_admin_token(self, client, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_TOKEN", "secret")
+
+        assert client.get("/api/admin/analytics/scores").status_code == 403
+
+    def test_reports_over_http(self, client, engine, test_db, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_TOKEN", "secret")
+        monkeypatch.setattr(admin, "analytics", engine)
+        headers = {"X-Admin-Token": "secret"}
+        add_game(test_db, 1, 25)
+        add_game(test_db, 1, 35, mode="pass-through")
+
+        refreshed = client.post("/api/admin/analytics/refresh", headers=headers)
+        scores = client.get("/api/admin/analytics/scores", params={"mode": "walls"}, headers=headers)
+
+        assert refreshed.json()["added"]["games"] == 2
+        assert scores.json()["rows"] == 1
+        assert list(scores.json()["modes"]) == ["walls"]
+        assert client.get("/api/admin/analytics", headers=headers).json()["tables"]["games"]["rows"] == 2
@@ -0,0 +1,196 @@
+"""Integration tests for the multiplayer arena"""
+import json
+
+import pytest
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from app.arena.engine import FOOD_SCORE, SpatialHash, Snake, World
+from app.arena.manager import arena_manager, persist_results
+from app.arena.protocol import (
+    apply_message, decode, encode_delta, encode_full, new_client_state, snapshot_state,
+)
+from app.arena.room import ArenaResult, Player
+from app.db_models import Game, LeaderboardEntryDB
+
+
+def place(world, snake_id, body, direction):
+    """Put a snake with a fixed body into the world"""
+    snake = Snake(snake_id, f"s{snake_id}", body, direction, world.tick)
+    world.snakes[snake_id] = snake
+    return snake
+
+
+class TestSpatialHash:
+    """Tests for the bucketed occupancy index"""
+
+    def test_get_and_neighbourhood(self):
+        grid = SpatialHash(bucket_size=4)
+        grid.insert(7, 3, 1)
+        grid.insert(8, 3, 2)
+
+        assert grid.get(7, 3) == 1
+        assert grid.get(8, 3) == 2
+        assert grid.get(9, 3) is None
+        assert grid.any_within(10, 5, 2)
+        assert not grid.any_within(20, 20, 3)
+
+
+class TestWorld:
+    """Tests for the arena simulation step"""
+
+    def test_head_into_body_dies(self):
+        world = World(width=20, height=20, seed=1)
+        place(world, 1, [(5, 5), (4, 5), (3, 5)], "right")
+        place(world, 2, [(6, 4), (6, 3), (6, 2)], "down")
+
+        events = world.step()
+
+        # Snake 2 moves onto (6, 5) at the same time snake 1's head does
+        assert {s.id for s in events.died} == {1, 2}
+
+    def test_tail_cell_is_free_after_move(self):
+        world = World(width=20, height=20, seed=1)
+        place(world, 1, [(5, 5), (5, 6), (4, 6), (4, 5)], "left")
+
+        events = world.step()
+
+        # Head moves into the cell the tail is vacating in the same tick
+        assert events.died == []
+        assert world.snakes[1].head == (4, 5)
+
+    def test_walls_and_wrap(self):
+        walls = World(width=10, height=10, seed=1)
+        place(walls, 1, [(9, 5), (8, 5), (7, 5)], "right")
+        assert [s.id for s in walls.step().died] == [1]
+
+        wrap = World(width=10, height=10, wrap=True, seed=1)
+        place(wrap, 1, [(9, 5), (8, 5), (7, 5)], "right")
+        wrap.step()
+        assert wrap.snakes[1].head == (0, 5)
+
+    def test_eating_grows_and_scores(self):
+        world = World(width=20, height=20, seed=1)
+        place(world, 1, [(5, 5), (4, 5), (3, 5)], "right")
+        world.food = {(6, 5)}
+
+        world.step()
+
+        snake = world.snakes[1]
+        assert len(snake.body) == 4
+        assert snake.score == FOOD_SCORE
+
+    def test_reverse_steer_ignored(self):
+        world = World(width=20, height=20, seed=1)
+        snake = place(world, 1, [(5, 5), (4, 5), (3, 5)], "right")
+        snake.steer("left")
+        world.step()
+        assert snake.head == (6, 5)
+
+
+class TestProtocol:
+    """Tests for snapshot and delta frames"""
+
+    def test_deltas_reconstruct_server_state(self):
+        world = World(width=32, height=32, wrap=True, seed=7)
+        for i in range(1, 9):
+            world.spawn(i, f"p{i}")
+
+        client = apply_message(new_client_state(), decode(encode_full(world)))
+        next_id = 9
+        for tick in range(200):
+            if tick % 25 == 0:
+                world.spawn(next_id, f"p{next_id}")
+                next_id += 1
+            if tick % 40 == 0 and world.snakes:
+                world.remove(next(iter(world.snakes)))
+            for snake in world.snakes.values():
+                snake.steer(world.rng.choice(["up", "down", "left", "right"]))
+            apply_message(client, decode(encode_delta(world.step())))
+
+        server = snapshot_state(world)
+        assert client["tick"] == server["tick"]
+        assert client["food"] == server["food"]
+        assert client["snakes"] == server["snakes"]
+
+    def test_delta_smaller_than_snapshot(self):
+        world = World(width=48, height=48, seed=3)
+        for i in range(1, 17):
+            world.spawn(i, f"p{i}")
+        world.step()
+        assert len(encode_delta(world.step())) < len(encode_full(world)) / 2
+
+
+class TestPersistResults:
+    """Tests for writing arena results through the existing models"""
+
+    def test_writes_game_and_leaderboard(self, test_db, test_user):
+        from tests_integration.conftest import TestingSessionLocal
+        from datetime import datetime
+
+        player = Player(test_user["id"], test_user["username"])
+        player.started_at = datetime(2025, 1, 1, 12, 0, 0)
+        results = [
+            ArenaResult(player, "walls", 70, datetime(2025, 1, 1, 12, 1, 30)),
+            ArenaResult(Player(None, "bot"), "walls", 500, datetime(2025, 1, 1, 12, 2)),
+        ]
+
+        persist_results(results, TestingSessionLocal)
+
+        games = test_db.query(Game).all()
+        entries = test_db.query(LeaderboardEntryDB).all()
+        assert len(games) == 1 and len(entries) == 1
+        assert games[0].score == 70 and games[0].duration == 90
+        assert games[0].is_active is False
+        assert entries[0].username == test_user["username"]
+
+
+class TestArenaSocket:
+    """Tests for the /api/arena/ws endpoint"""
+
+    @pytest.fixture(autouse=True)
+    def no_result_writes(self, monkeypatch):
+        monkeypatch.setattr(arena_manager, "result_sink", None)
+
+    def test_join_receives_hello_and_snapshot(self, client, test_user):
+        with client.websocket_connect(f"/api/arena/ws?token={test_user['token']}") as ws:
+            hello = ws.receive_json()
+            snapshot = ws.receive_json()
+            assert hello["t"] == "hello"
+            assert snapshot["t"] == "f"
+            assert hello["id"] in [s[0] for s in snapshot["s"]]
+
+            ws.send_text(json.dumps({"dir": ["up"]}))
+            ws.send_text(json.dumps({"dir": "up"}))
+            assert ws.receive_json()["t"] in ("d", "b", "f")
+
+            rooms = client.get("/api/arena/rooms").json()
+            assert len(rooms) == 1
+            assert rooms[0]["players"] == 1
+
+    def test_binary_frame_closes_with_unsupported_data(self, client, test_user):
+        with client.websocket_connect(f"/api/arena/ws?token={test_user['token']}") as ws:
+            ws.receive_json()
+            ws.send_bytes(b"\x00")
+            with pytest.raises(WebSocketDisconnect) as closed:
+                while True:
+                    ws.receive_text()
+
+        assert closed.value.code == 1003
+        assert sum(room["players"] for room in client.get("/api/arena/rooms").json()) == 0
+
+    def test_send_failure_ends_the_session_and_is_logged(self, client, test_user, monkeypatch, caplog):
+        async def broken_send(self, data):
+            raise RuntimeError("send failed")
+
+        monkeypatch.setattr(WebSocket, "send_text", broken_send)
+        with client.websocket_connect(f"/api/arena/ws?token={test_user['token']}") as ws:
+            with pytest.raises(WebSocketDisconnect):
+                ws.receive_text()
+
+        assert sum(room["players"] for room in client.get("/api/arena/rooms").json()) == 0
+        assert "Arena socket for user" in caplog.text
+
+    def test_invalid_token_rejected(self, client):
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect("/api/arena/ws?token=invalid") as ws:
+                ws.receive_json()
@@ -1,6 +1,15 @@
 """Integration tests for authentication endpoints"""
 import pytest
 
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app.auth import _MISS, TokenCache, create_access_token, token_cache, verify_token
+from app.availability import ScalableBloomFilter, availability
+from app.routers.auth import _duplicate_field
+from app.schemas import TokenData
+from tests_integration.conftest import engine as test_engine
+
 
 class TestSignup:
     """Tests for POST /api/auth/signup"""
@@ -69,6 +78,16 @@ class TestLogin:
         assert "access_token" in data
         assert data["user"]["username"] == test_user["username"]
     
+    def test_login_normalizes_username_like_signup(self, client):
+        client.post("/api/auth/signup", json={"username": " padded ", "email": "padded@example.com",
+                                              "password": "password123"})
+
+        for username in ("padded", "  padded"):
+            response = client.post("/api/auth/login", json={"username": username, "password": "password123"})
+
+            assert response.status_code == 200
+            assert response.json()["user"]["username"] == "padded"
+
     def test_login_wrong_password(self, client, test_user):
         """Test login with wrong password"""
         response = client.post("/api/auth/login", json={
@@ -114,3 +133,198 @@ class TestGetCurrentUser:
         })
         
         assert response.status_code == 401
+
+
+class TestTokenCache:
+    """Tests for the verified-token cache behind verify_token"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self):
+        token_cache.clear()
+        yield
+        token_cache.clear()
+
+    def test_repeat_verification_hits_cache(self):
+        token = create_access_token(data={"sub": "42"})
+
+        first = verify_token(token)
+        second = verify_token(token)
+
+        assert first.user_id == 42
+        assert second is first
+        assert token_cache.hits == 1
+        assert token_cache.misses == 1
+
+    def test_expired_entry_is_evicted(self):
+        cache = TokenCache(maxsize=4)
+        key = TokenCache.key("token")
+        cache.put(key, TokenData(user_id=1), expires_at=100.0)
+
+        assert cache.get(key, now=99.0).user_id == 1
+        assert cache.get(key, now=100.0) is _MISS
+        assert len(cache) == 0
+
+    def test_lru_is_bounded(self):
+        cache = TokenCache(maxsize=2)
+        for name in ("a", "b"):
+            cache.put(TokenCache.key(name), TokenData(user_id=1), expires_at=1e12)
+        cache.get(TokenCache.key("a"), now=0)
+        cache.put(TokenCache.key("c"), TokenData(user_id=1), expires_at=1e12)
+
+        assert len(cache) == 2
+        assert cache.get(TokenCache.key("b"), now=0) is _MISS
+        assert cache.get(TokenCache.key("a"), now=0) is not _MISS
+
+    def test_rejected_token_is_cached(self):
+        assert verify_token("not-a-jwt") is None
+        assert verify_token("not-a-jwt") is None
+        assert token_cache.rejected_hits == 1
+
+    def test_rejection_admission_is_rate_limited(self):
+        cache = TokenCache(rejected_rate=5)
+        admitted = [cache.reject(TokenCache.key(f"bad-{i}"), now=0) for i in range(20)]
+
+        assert admitted.count(True) == 5
+        assert cache.get(TokenCache.key("bad-19"), now=0) is _MISS
+
+
+@pytest.fixture
+def fresh_availability():
+    """The filter is process-wide; start each test from an empty one"""
+    availability.reset()
+    yield availability
+    availability.reset()
+
+
+class TestSignupStatements:
+    """Tests for the single-INSERT signup"""
+
+    def test_signup_is_one_statement(self, client):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0].upper())
+
+        event.listen(test_engine, "before_cursor_execute", record)
+        try:
+            response = client.post("/api/auth/signup", json={
+                "username": "onetrip",
+                "email": "onetrip@example.com",
+                "password": "password123"
+            })
+        finally:
+            event.remove(test_engine, "before_cursor_execute", record)
+
+        assert response.status_code == 201
+        assert response.json()["user"]["created_at"] is not None
+        assert statements == ["INSERT"]
+
+    def test_duplicate_email_is_case_insensitive(self, client, test_user):
+        response = client.post("/api/auth/signup", json={
+            "username": "differentuser",
+            "email": test_user["email"].upper(),
+            "password": "password123"
+        })
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Email already exists"
+
+    def test_duplicate_username_reports_username(self, client, test_user):
+        response = client.post("/api/auth/signup", json={
+            "username": f"  {test_user['username']} ",
+            "email": "other@example.com",
+            "password": "password123"
+        })
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Username already exists"
+
+
+class TestDuplicateField:
+    """Tests for telling which unique index a signup hit"""
+
+    class PostgresError(Exception):
+        def __init__(self, constraint_name):
+            super().__init__('duplicate key value violates unique constraint\n'
+                             'DETAIL:  Key (email)=(username@example.com) already exists.')
+            self.diag = type("Diag", (), {"constraint_name": constraint_name})()
+
+    def test_postgres_constraint_name_wins_over_message(self, test_db):
+        error = IntegrityError("INSERT", {}, self.PostgresError("ix_users_email"))
+
+        assert _duplicate_field(test_db, error, "someone", "username@example.com") == "email"
+
+    def test_sqlite_column(self, test_db):
+        error = IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed: users.username"))
+
+        assert _duplicate_field(test_db, error, "someone", "someone@example.com") == "username"
+
+
+class TestAvailability:
+    """Tests for GET /api/auth/available"""
+
+    def test_free_username_skips_database_after_warm_up(self, client, test_user, fresh_availability):
+        client.get("/api/auth/available", params={"username": "warmup"})
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(test_engine, "before_cursor_execute", record)
+        try:
+            response = client.get("/api/auth/available", params={"username": "brandnew"})
+        finally:
+            event.remove(test_engine, "before_cursor_execute", record)
+
+        assert response.json()["username_available"] is True
+        assert statements == []
+
+    def test_taken_username_and_email_confirmed(self, client, test_user, fresh_availability):
+        response = client.get("/api/auth/available", params={
+            "username": test_user["username"],
+            "email": test_user["email"].upper()
+        })
+
+        assert response.status_code == 200
+        assert response.json() == {"username_available": False, "email_available": False}
+
+    def test_signup_updates_filter(self, client, fresh_availability):
+        client.get("/api/auth/available", params={"username": "warmup"})
+        client.post("/api/auth/signup", json={
+            "username": "justjoined",
+            "email": "justjoined@example.com",
+            "password": "password123"
+        })
+
+        response = client.get("/api/auth/available", params={"username": "justjoined"})
+
+        assert response.json()["username_available"] is False
+
+    def test_sync_does_not_count_signups_twice(self, client, fresh_availability):
+        client.get("/api/auth/available", params={"username": "warmup"})
+        for name in ("first", "second"):
+            client.post("/api/auth/signup", json={
+                "username": name,
+                "email": f"{name}@example.com",
+                "password": "password123"
+            })
+
+        fresh_availability.synced_at = None
+        client.get("/api/auth/available", params={"username": "warmup"})
+
+        assert len(fresh_availability.usernames) == 2
+        assert fresh_availability.last_id > 0
+
+    def test_requires_a_field(self, client):
+        assert client.get("/api/auth/available").status_code == 400
+
+    def test_scalable_filter_has_no_false_negatives(self):
+        bloom = ScalableBloomFilter(capacity=100, error_rate=0.01)
+        names = [f"player{i}" for i in range(1000)]
+        for name in names:
+            bloom.add(name)
+
+        assert len(bloom.layers) > 1
+        assert all(name in bloom for name in names)
+        false_positives = sum(f"stranger{i}" in bloom for i in range(10000))
+        assert false_positives < 10000 * 0.02
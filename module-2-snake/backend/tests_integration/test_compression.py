@@ -0,0 +1,146 @@
+"""Integration tests for response compression and the cached JSON responses"""
+import gzip
+import json
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import metrics
+from app.compression import CompressionMiddleware, choose_encoding
+from app.response_cache import ResponseCache
+from tests_integration.conftest import engine as test_engine
+
+
+def build_app(minimum_size=100):
+    app = FastAPI()
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/large")
+    async def large():
+        return {"rows": [{"id": i, "name": f"player{i}"} for i in range(200)]}
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(50):
+                yield json.dumps({"id": i}).encode() + b"\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/text-stream")
+    async def text_stream():
+        async def lines():
+            for i in range(50):
+                yield f"line {i}\n".encode()
+        return StreamingResponse(lines(), media_type="text/plain")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    return TestClient(app)
+
+
+class TestNegotiation:
+    """Tests for Accept-Encoding parsing"""
+
+    def test_prefers_server_order_among_accepted(self):
+        assert choose_encoding("gzip, br", available=["br", "gzip"]) == "br"
+        assert choose_encoding("gzip;q=0.5, br;q=0", available=["br", "gzip"]) == "gzip"
+
+    def test_identity_and_wildcards(self):
+        assert choose_encoding(None) is None
+        assert choose_encoding("identity") is None
+        assert choose_encoding("*", available=["gzip"]) == "gzip"
+        assert choose_encoding("*, gzip;q=0", available=["gzip"]) is None
+
+
+class TestCompressionMiddleware:
+    """Tests for compressing responses on the way out"""
+
+    def test_large_json_is_gzipped(self):
+        response = build_app().get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(response.content)
+        assert len(response.json()["rows"]) == 200
+
+    def test_small_and_unrequested_bodies_pass_through(self):
+        client = build_app()
+
+        small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in small.headers
+        assert "content-encoding" not in plain.headers
+        assert len(plain.json()["rows"]) == 200
+
+    def test_streaming_text_is_compressed_incrementally(self):
+        response = build_app().get("/text-stream", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text.splitlines()[-1] == "line 49"
+
+    def test_other_media_types_are_left_alone(self):
+        response = build_app().get("/stream", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert len(response.text.splitlines()) == 50
+
+
+class TestResponseCache:
+    """Tests for cached, precompressed leaderboard responses"""
+
+    def test_variants_are_compressed_once(self):
+        cache = ResponseCache(ttl=60, minimum_size=0)
+        entry = cache.get(("t",), lambda: [{"score": i} for i in range(100)])
+        again = cache.get(("t",), lambda: 1 / 0)
+
+        assert again is entry
+        assert entry.encoded("gzip") is entry.encoded("gzip")
+        assert json.loads(gzip.decompress(entry.encoded("gzip"))) == json.loads(entry.body)
+
+    def test_lru_is_bounded(self):
+        cache = ResponseCache(ttl=60, maxsize=2)
+        for name in ("a", "b", "c"):
+            cache.get((name,), lambda: [])
+
+        assert len(cache) == 2
+
+    def test_repeated_leaderboard_hits_skip_the_database(self, client, test_user, auth_headers):
+        for score in range(60):
+            client.post("/api/leaderboard", headers=auth_headers, json={"score": score, "mode": "walls"})
+        first = client.get("/api/leaderboard", params={"limit": 50}, headers={"Accept-Encoding": "gzip"})
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        hits = metrics.RESPONSE_CACHE.values.get(("leaderboard", "hit"), 0.0)
+        event.listen(test_engine, "before_cursor_execute", record)
+        try:
+            second = client.get("/api/leaderboard", params={"limit": 50}, headers={"Accept-Encoding": "gzip"})
+        finally:
+            event.remove(test_engine, "before_cursor_execute", record)
+
+        assert second.headers["content-encoding"] == "gzip"
+        assert second.json() == first.json()
+        assert [e["score"] for e in second.json()][:3] == [59, 58, 57]
+        assert statements == []
+        assert metrics.RESPONSE_CACHE.values[("leaderboard", "hit")] == hits + 1
+
+    def test_submitting_a_score_invalidates(self, client, test_user, auth_headers):
+        assert client.get("/api/leaderboard/top").json() == []
+        client.post("/api/leaderboard", headers=auth_headers, json={"score": 10, "mode": "walls"})
+
+        assert [e["score"] for e in client.get("/api/leaderboard/top").json()] == [10]
+
+    def test_ending_a_game_invalidates(self, client, test_user, auth_headers):
+        game_id = client.post("/api/game/start", headers=auth_headers).json()["id"]
+        # Cached after the start, so only the end can invalidate it
+        assert client.get("/api/game/leaderboard").json() == []
+        client.post(f"/api/game/{game_id}/end", headers=auth_headers, json={"score": 33, "duration": 5})
+
+        assert [e["score"] for e in client.get("/api/game/leaderboard").json()] == [33]
@@ -0,0 +1,183 @@
+"""Integration tests for per-route-class admission control"""
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app import auth, metrics
+from app.load_shedding import LagMonitor, LoadShedMiddleware, RouteClass
+
+
+def build_app(write=(1, 1, 1.0, 1.0), read=(1, 1, 1.0, 0.1)):
+    """A tiny app whose handlers block until ``gate`` is set"""
+    app = FastAPI()
+    gate = asyncio.Event()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/items")
+    async def items():
+        await gate.wait()
+        return {"items": []}
+
+    @app.post("/items/{item_id}/end")
+    async def end(item_id: int):
+        await gate.wait()
+        return {"id": item_id}
+
+    monitor = LagMonitor()
+    classes = {
+        "write": RouteClass("write", *write),
+        "read": RouteClass("read", *read),
+    }
+    app.add_middleware(LoadShedMiddleware, classes=classes, monitor=monitor,
+                       route_classes={("POST", "/items/{item_id}/end"): "write"})
+    app.add_middleware(metrics.MetricsMiddleware, router=app.router)
+    return app, gate, classes, monitor
+
+
+def decisions(name, decision):
+    return metrics.LOAD_SHED_DECISIONS.values.get((name, decision), 0.0)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def run(app, scenario):
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+class TestAdmission:
+    """Tests for concurrency limits and queue budgets"""
+
+    def test_queue_full_sheds_with_retry_after(self):
+        app, gate, classes, _ = build_app()
+        before = decisions("read", "shed_queue_full")
+
+        async def scenario(client):
+            first = asyncio.create_task(client.get("/items"))
+            await settle()
+            second = asyncio.create_task(client.get("/items"))
+            await settle()
+            assert classes["read"].active == 1 and len(classes["read"].waiters) == 1
+            third = await client.get("/items")
+            gate.set()
+            return third, await first, await second
+
+        third, first, second = run(app, scenario)
+
+        assert third.status_code == 503
+        assert third.headers["retry-after"] == "1"
+        assert "overloaded" in third.json()["detail"]
+        assert first.status_code == second.status_code == 200
+        assert decisions("read", "shed_queue_full") == before + 1
+        assert classes["read"].active == 0 and not classes["read"].waiters
+
+    def test_queue_budget_exceeded_sheds(self):
+        app, gate, classes, _ = build_app(read=(1, 4, 0.05, 0.1))
+        before = decisions("read", "shed_queue_timeout")
+
+        async def scenario(client):
+            first = asyncio.create_task(client.get("/items"))
+            await settle()
+            waited = await client.get("/items")
+            gate.set()
+            return waited, await first
+
+        waited, first = run(app, scenario)
+
+        assert waited.status_code == 503
+        assert first.status_code == 200
+        assert decisions("read", "shed_queue_timeout") == before + 1
+        assert classes["read"].active == 0 and not classes["read"].waiters
+
+    def test_queued_request_gets_slot_when_released(self):
+        app, gate, classes, _ = build_app(write=(1, 4, 2.0, 1.0))
+        before = decisions("write", "queued")
+
+        async def scenario(client):
+            first = asyncio.create_task(client.post("/items/1/end"))
+            await settle()
+            second = asyncio.create_task(client.post("/items/2/end"))
+            await settle()
+            gate.set()
+            return await first, await second
+
+        first, second = run(app, scenario)
+
+        assert (first.status_code, second.status_code) == (200, 200)
+        assert second.json() == {"id": 2}
+        assert decisions("write", "queued") == before + 1
+
+
+class TestPriority:
+    """Tests for shedding reads before writes"""
+
+    def test_standing_lag_sheds_reads_but_admits_writes(self):
+        app, gate, _, monitor = build_app()
+        monitor.standing_lag = 0.5  # above the read target, below the write target
+        gate.set()
+
+        async def scenario(client):
+            return await client.get("/items"), await client.post("/items/1/end"), await client.get("/health")
+
+        read, write, health = run(app, scenario)
+
+        assert read.status_code == 503
+        assert write.status_code == 200
+        assert health.status_code == 200
+
+    def test_reads_yield_to_queued_writes(self):
+        app, gate, _, _ = build_app(write=(1, 4, 2.0, 1.0))
+        before = decisions("read", "shed_priority")
+
+        async def scenario(client):
+            writes = [asyncio.create_task(client.post(f"/items/{i}/end")) for i in (1, 2)]
+            await settle()
+            read = await client.get("/items")
+            gate.set()
+            return read, [await w for w in writes]
+
+        read, writes = run(app, scenario)
+
+        assert read.status_code == 503
+        assert [w.status_code for w in writes] == [200, 200]
+        assert decisions("read", "shed_priority") == before + 1
+
+    def test_lag_monitor_reports_blocked_loop(self):
+        async def scenario():
+            monitor = LagMonitor(interval=0.01, window=0.05)
+            monitor.start()
+            for _ in range(10):
+                await asyncio.sleep(0)
+                time.sleep(0.03)  # every sample in the window lands late
+            monitor.stop()
+            return monitor.standing_lag
+
+        assert asyncio.run(scenario()) > 0.01
+
+
+class TestLoadSheddingAdmin:
+    """Tests for GET /api/admin/load-shedding"""
+
+    def test_requires_admin_token(self, client, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_TOKEN", "secret")
+
+        assert client.get("/api/admin/load-shedding").status_code == 403
+
+    def test_lists_route_classes(self, client, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_TOKEN", "secret")
+
+        response = client.get("/api/admin/load-shedding", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert {c["class"] for c in response.json()["classes"]} == {"write", "auth", "read"}
@@ -0,0 +1,98 @@
+"""Integration tests for the /metrics endpoint and instrumentation"""
+import json
+import os
+
+from sqlalchemy import create_engine, text
+
+from app import metrics
+
+
+def sample(body: str, prefix: str) -> float:
+    """Return the value of the first exposition line starting with prefix"""
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not found")
+
+
+class TestMetricsEndpoint:
+    """Tests for GET /metrics"""
+
+    def test_counts_requests_by_route_template(self, client, auth_headers):
+        before = client.get("/metrics").text
+        start = client.post("/api/game/start", headers=auth_headers).json()
+        client.post(f"/api/game/{start['id']}/end", headers=auth_headers,
+                    json={"score": 10, "duration": 5})
+        client.get("/health")
+
+        body = client.get("/metrics").text
+
+        assert body.startswith("# HELP")
+        end_prefix = 'http_requests_total{method="POST",route="/api/game/{game_id}/end",status="200"}'
+        assert sample(body, end_prefix) >= 1
+        health = 'http_requests_total{method="GET",route="/health",status="200"}'
+        try:
+            previous = sample(before, health)
+        except AssertionError:
+            previous = 0
+        assert sample(body, health) == previous + 1
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}' in body
+        assert f'route="/api/game/{start["id"]}/end"' not in body
+
+    def test_unknown_paths_share_one_label(self, client):
+        client.get("/no/such/path")
+        body = client.get("/metrics").text
+        assert sample(body, 'http_requests_total{method="GET",route="unmatched",status="404"}') >= 1
+
+
+class TestEngineHooks:
+    """Tests for SQLAlchemy query and pool instrumentation"""
+
+    def test_queries_and_pool_wait_recorded(self):
+        engine = metrics.instrument_engine(create_engine("sqlite://"))
+        before = metrics.DB_QUERIES.values.get(("SELECT",), 0)
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+        assert metrics.DB_QUERIES.values[("SELECT",)] == before + 2
+        assert metrics.DB_POOL_WAIT.values[()][-1] >= 0
+
+
+class TestAggregation:
+    """Tests for merging snapshots of several workers"""
+
+    def test_merges_worker_snapshots(self, tmp_path):
+        registry = metrics.Registry()
+        requests = registry.counter("reqs_total", "Requests", ("route",))
+        in_flight = registry.gauge("busy", "Busy")
+        latency = registry.histogram("lat_seconds", "Latency", (), buckets=(0.1, 1.0))
+        requests.inc(("/a",), 3)
+        in_flight.inc((), 2)
+        latency.observe((), 0.05)
+        latency.observe((), 0.5)
+
+        merged = metrics.merge_snapshots([registry.snapshot(), registry.snapshot()])
+        body = metrics.render(merged)
+
+        assert 'reqs_total{route="/a"} 6' in body
+        assert "busy 4" in body
+        assert 'lat_seconds_bucket{le="0.1"} 2' in body
+        assert 'lat_seconds_bucket{le="+Inf"} 4' in body
+        assert "lat_seconds_count 4" in body
+
+    def test_collect_drops_gauges_of_dead_workers(self, tmp_path):
+        dead = {"type": "gauge", "help": "h", "labels": ["method", "route"],
+                "samples": [[["GET", "/x"], 5.0]]}
+        counted = {"type": "counter", "help": "h", "labels": [], "samples": [[[], 7.0]]}
+        # PIDs this large are never allocated on Linux
+        with open(os.path.join(tmp_path, "metrics-999999999.json"), "w") as f:
+            json.dump({"pid": 999999999,
+                       "metrics": {"old_gauge": dead, "old_total": counted}}, f)
+
+        body = metrics.collect(str(tmp_path))
+
+        assert "old_total 7" in body
+        assert "old_gauge" not in body
+        assert os.path.exists(os.path.join(tmp_path, f"metrics-{os.getpid()}.json"))
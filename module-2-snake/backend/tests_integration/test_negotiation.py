@@ -0,0 +1,78 @@
+"""Integration tests for MessagePack content negotiation"""
+import pytest
+
+from app.negotiation import wants_msgpack
+
+msgpack = pytest.importorskip("msgpack")
+
+MSGPACK = "application/msgpack"
+
+
+def packed(data) -> dict:
+    return {"content": msgpack.packb(data), "headers": {"Content-Type": MSGPACK, "Accept": MSGPACK}}
+
+
+class TestAcceptParsing:
+    """Tests for choosing MessagePack from the Accept header"""
+
+    def test_explicit_preference(self):
+        assert wants_msgpack(MSGPACK)
+        assert wants_msgpack("application/msgpack, application/json;q=0.5")
+        assert not wants_msgpack("application/json, application/msgpack;q=0.5")
+
+    def test_wildcards_mean_json(self):
+        assert not wants_msgpack("*/*")
+        assert not wants_msgpack("application/json, text/plain, */*")
+        assert not wants_msgpack(None)
+
+
+class TestMsgPackEndpoints:
+    """Tests for MessagePack bodies and responses on the game-client routes"""
+
+    def test_game_lifecycle(self, client, auth_headers):
+        started = client.post("/api/game/start", headers={**auth_headers, "Accept": MSGPACK})
+        game = msgpack.unpackb(started.content)
+
+        request = packed({"score": 42, "duration": 9})
+        ended = client.post(f"/api/game/{game['id']}/end",
+                            headers={**auth_headers, **request["headers"]}, content=request["content"])
+
+        assert started.headers["content-type"] == MSGPACK
+        assert "Accept" in started.headers["vary"]
+        assert ended.status_code == 200
+        result = msgpack.unpackb(ended.content)
+        assert result["score"] == 42 and result["is_active"] is False
+        assert isinstance(result["ended_at"], str)
+
+    def test_submit_score_and_read_back(self, client, auth_headers):
+        request = packed({"score": 300, "mode": "walls"})
+        submitted = client.post("/api/leaderboard", headers={**auth_headers, **request["headers"]},
+                                content=request["content"])
+
+        as_msgpack = client.get("/api/leaderboard/top", headers={"Accept": MSGPACK})
+        as_json = client.get("/api/leaderboard/top")
+
+        assert submitted.status_code == 201
+        assert msgpack.unpackb(submitted.content)["id"]
+        assert as_msgpack.headers["content-type"] == MSGPACK
+        assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+        assert len(as_msgpack.content) < len(as_json.content)
+
+    def test_schema_validation_applies(self, client, auth_headers):
+        request = packed({"score": "lots", "mode": "walls"})
+        response = client.post("/api/leaderboard", headers={**auth_headers, **request["headers"]},
+                               content=request["content"])
+
+        assert response.status_code == 422
+
+    def test_malformed_body_is_rejected(self, client, auth_headers):
+        response = client.post("/api/leaderboard", content=b"\xc1",
+                               headers={**auth_headers, "Content-Type": MSGPACK})
+
+        assert response.status_code == 400
+
+    def test_browsers_still_get_json(self, client):
+        response = client.get("/api/game/active", headers={"Accept": "application/json, text/plain, */*"})
+
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == []
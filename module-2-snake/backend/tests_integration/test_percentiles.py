@@ -0,0 +1,165 @@
+"""Integration tests for the score percentile sketches"""
+import random
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.percentiles import (
+    DAY, HOUR, NUM_BUCKETS, ScoreHistogram, ScoreSketches, bucket_bounds, bucket_index
+)
+from app.db_models import ScoreSketchRow
+from tests_integration.conftest import TestingSessionLocal
+
+
+def exact_percentile(scores, score):
+    return sum(1 for s in scores if s < score) / len(scores) * 100
+
+
+class TestScoreHistogram:
+    """Tests for the bucketed histogram and its error bounds"""
+
+    def test_buckets_are_narrow(self):
+        for score in [0, 1, 63, 64, 65, 1000, 123456, 2 ** 31]:
+            low, high = bucket_bounds(bucket_index(score))
+
+            assert low <= score < high
+            assert high - low <= max(1, low / 32)
+        assert bucket_index(2 ** 40) == NUM_BUCKETS - 1
+
+    def test_percentile_within_reported_error(self):
+        rng = random.Random(7)
+        scores = [int(rng.expovariate(1 / 400)) for _ in range(20000)]
+        histogram = ScoreHistogram()
+        for score in scores:
+            histogram.add(score)
+
+        for score in [0, 10, 63, 100, 400, 1500, 5000]:
+            percent, error = histogram.percentile(score)
+
+            assert abs(percent - exact_percentile(scores, score)) <= error + 1e-9
+        assert histogram.percentile(50)[1] == 0.0
+
+    def test_quantile_is_within_a_bucket(self):
+        scores = list(range(1, 10001))
+        histogram = ScoreHistogram()
+        for score in scores:
+            histogram.add(score)
+
+        for q in (0.1, 0.5, 0.9, 0.99):
+            true = scores[int(q * len(scores))]
+
+            assert abs(histogram.quantile(q) - true) <= true / 32 + 1
+        assert ScoreHistogram().quantile(0.5) is None
+
+    def test_merge_equals_adding_everything(self):
+        left, right, combined = ScoreHistogram(), ScoreHistogram(), ScoreHistogram()
+        for score in range(0, 3000, 7):
+            (left if score % 2 else right).add(score)
+            combined.add(score)
+
+        left.merge(right.counts())
+
+        assert left.counts() == combined.counts()
+        assert left.total == combined.total
+
+
+class TestScoreSketches:
+    """Tests for windows and sharing sketches through the database"""
+
+    def test_flush_merges_workers(self, test_db):
+        first, second = ScoreSketches(TestingSessionLocal), ScoreSketches(TestingSessionLocal)
+        for score in (10, 20, 30):
+            first.record("walls", score)
+        second.record("walls", 40)
+        second.record("pass-through", 5)
+
+        first.flush()
+        second.flush()
+        first.reload()
+
+        assert first.histogram("walls").total == 4
+        assert first.percentile("walls", 35) == (75.0, 0.0, 4)
+        assert first.histogram("pass-through").total == 1
+
+    def test_concurrent_flushes_keep_every_game(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'sketches.db'}", connect_args={"check_same_thread": False})
+        ScoreSketchRow.__table__.create(engine)
+        factory = sessionmaker(bind=engine)
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def pause_after_reading(conn, cursor, statement, parameters, context, executemany):
+            # Widen the gap between reading a row's counts and writing them back
+            if statement.startswith("SELECT score_sketches.id"):
+                time.sleep(0.05)
+
+        workers = [ScoreSketches(factory) for _ in range(5)]
+        for sketches in workers:
+            sketches.record("walls", 10)
+        workers[0].flush()
+        threads = [threading.Thread(target=sketches.flush) for sketches in workers[1:]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        workers[0].reload()
+
+        assert workers[0].histogram("walls").total == 5
+        engine.dispose()
+
+    def test_rolling_windows(self, test_db):
+        sketches = ScoreSketches(TestingSessionLocal)
+        now = time.time()
+        sketches.record("walls", 10, when=now)
+        sketches.record("walls", 20, when=now - 2 * HOUR)
+        sketches.record("walls", 30, when=now - 3 * DAY)
+        sketches.record("walls", 40, when=now - 20 * DAY)
+        sketches.record("walls", 50, when=now - 60 * DAY)
+
+        totals = {window: sketches.histogram("walls", window).total for window in ("all", "day", "week", "month")}
+
+        assert totals == {"all": 5, "day": 2, "week": 3, "month": 4}
+
+    def test_windows_roll_forward(self, test_db):
+        sketches = ScoreSketches(TestingSessionLocal)
+        now = time.time()
+        sketches.record("walls", 10, when=now - 6 * DAY)
+        sketches.histogram("walls", "week")
+        sketch = sketches._modes["walls"]
+
+        sketch.roll(now + 2 * DAY)
+
+        assert sketch.windows["week"].total == 0
+        assert sketch.windows["month"].total == 1
+        assert sketch.windows["all"].total == 1
+
+
+class TestPercentileEndpoints:
+    """Tests for the percentile and distribution routes"""
+
+    def test_submit_reports_percentile(self, client, auth_headers):
+        for score in (10, 20, 30, 40):
+            client.post("/api/leaderboard", headers=auth_headers, json={"score": score, "mode": "walls"})
+
+        response = client.post("/api/leaderboard", headers=auth_headers, json={"score": 35, "mode": "walls"})
+
+        assert response.json()["percentile"] == 75.0
+
+    def test_percentile_and_distribution(self, client, auth_headers):
+        for score in range(0, 100, 10):
+            client.post("/api/leaderboard", headers=auth_headers, json={"score": score, "mode": "walls"})
+
+        percentile = client.get("/api/leaderboard/percentile",
+                                params={"score": 55, "mode": "walls", "window": "day"}).json()
+        distribution = client.get("/api/leaderboard/distribution", params={"mode": "walls"}).json()
+
+        assert percentile == {"mode": "walls", "window": "day", "score": 55,
+                              "percentile": 60.0, "error": 0.0, "games": 10}
+        assert distribution["games"] == 10
+        assert distribution["quantiles"]["p50"] == 50.0
+
+    def test_unknown_window_is_rejected(self, client):
+        response = client.get("/api/leaderboard/percentile", params={"score": 5, "window": "year"})
+
+        assert response.status_code == 422
@@ -0,0 +1,79 @@
+"""Integration tests for player search"""
+import pytest
+
+from app.db_models import LeaderboardEntryDB, User
+from app.player_search import PlayerIndex, player_index
+
+
+@pytest.fixture
+def fresh_index():
+    """The index is process-wide; start each test from an empty one"""
+    player_index.reset()
+    yield player_index
+    player_index.reset()
+
+
+def make_user(db, username):
+    user = User(username=username, email=f"{username.lower()}@example.com")
+    user.set_password("password123")
+    db.add(user)
+    db.commit()
+    return user
+
+
+class TestPlayerIndex:
+    """Tests for the sorted prefix index"""
+
+    def test_prefix_is_case_insensitive_and_ordered(self):
+        index = PlayerIndex()
+        for user_id, name in enumerate(["bob", "Alice", "alfred", "ALBERT", "carol"], 1):
+            index.add(user_id, name)
+
+        assert index.search("al") == [(4, "ALBERT"), (3, "alfred"), (2, "Alice")]
+        assert index.search("AL", limit=1) == [(4, "ALBERT")]
+        assert index.search("z") == []
+
+    def test_readding_is_a_no_op(self):
+        index = PlayerIndex()
+        index.add(1, "dave")
+        index.add(1, "dave")
+
+        assert len(index) == 1
+
+
+class TestSearchEndpoint:
+    """Tests for GET /api/players/search"""
+
+    def test_returns_ids_and_best_scores(self, client, test_db, fresh_index):
+        snake = make_user(test_db, "SnakeKing")
+        make_user(test_db, "snail")
+        make_user(test_db, "turtle")
+        for score in (40, 90):
+            test_db.add(LeaderboardEntryDB(id=f"s{score}", user_id=snake.id, username="SnakeKing",
+                                           score=score, mode="walls"))
+        test_db.commit()
+
+        response = client.get("/api/players/search", params={"q": "sn"})
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": snake.id + 1, "username": "snail", "best_score": None},
+            {"id": snake.id, "username": "SnakeKing", "best_score": 90},
+        ]
+
+    def test_signup_is_searchable_immediately(self, client, test_user, fresh_index):
+        client.get("/api/players/search", params={"q": "warm"})
+        response = client.post("/api/auth/signup", json={
+            "username": "Newcomer",
+            "email": "newcomer@example.com",
+            "password": "password123"
+        })
+
+        results = client.get("/api/players/search", params={"q": "new"}).json()
+
+        assert [r["id"] for r in results] == [response.json()["user"]["id"]]
+
+    def test_requires_query(self, client):
+        assert client.get("/api/players/search").status_code == 422
+        assert client.get("/api/players/search", params={"q": " "}).status_code == 422
+        assert client.get("/api/players/search", params={"q": " a"}).status_code == 200
@@ -0,0 +1,120 @@
+"""Integration tests for the request profiler and admin profile endpoints"""
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app import auth, profiling
+from app.profiling import Profiler, ProfilingMiddleware, RequestProfile
+
+
+def busy_work(seconds: float):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+@pytest.fixture
+def profiled_app():
+    """A small app with the profiler installed and one SQL-running route"""
+    profiler = Profiler(admin_token="secret", interval_ms=1, keep=5)
+    engine = profiling.instrument_engine(create_engine("sqlite://"))
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 42"))
+        busy_work(0.05)
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    with TestClient(app) as client:
+        yield client, profiler
+
+
+class TestProfilingMiddleware:
+    """Tests for selecting and capturing profiled requests"""
+
+    def test_admin_header_captures_samples_and_sql(self, profiled_app):
+        client, profiler = profiled_app
+
+        response = client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        profile = profiler.get(int(response.headers["x-profile-id"]))
+        assert profile.reason == "header"
+        assert profile.status == 200
+        assert [sql for sql, _ in profile.statements] == ["SELECT 42"]
+        assert sum(profile.samples.values()) > 0
+        assert "busy_work" in profile.collapsed()
+
+    def test_unprofiled_requests_are_not_kept(self, profiled_app):
+        client, profiler = profiled_app
+
+        plain = client.get("/work")
+        wrong_token = client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "nope"})
+        non_ascii = client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "nöpe".encode("latin-1")})
+
+        assert "x-profile-id" not in plain.headers
+        assert "x-profile-id" not in wrong_token.headers
+        assert non_ascii.status_code == 200 and "x-profile-id" not in non_ascii.headers
+        assert profiler.profiles() == []
+
+    def test_sample_rate_selects_requests(self, profiled_app):
+        client, profiler = profiled_app
+        profiler.sample_rate = 1.0
+
+        response = client.get("/work")
+
+        assert profiler.get(int(response.headers["x-profile-id"])).reason == "sampled"
+
+
+class TestSlowestBuffer:
+    """Tests for keeping only the slowest N profiles"""
+
+    def test_keeps_slowest(self):
+        profiler = Profiler(admin_token="secret", keep=2)
+        for duration in (0.3, 0.1, 0.5, 0.2):
+            profile = RequestProfile("GET", "/x", "header")
+            profile.duration = duration
+            profiler.end(profile, object())
+
+        assert [p.duration for p in profiler.profiles()] == [0.5, 0.3]
+
+
+class TestAdminProfiles:
+    """Tests for GET /api/admin/profiles"""
+
+    def test_requires_admin_token(self, client, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_TOKEN", "secret")
+
+        assert client.get("/api/admin/profiles").status_code == 403
+        assert client.get("/api/admin/profiles",
+                          headers={"X-Admin-Token": "wrong"}).status_code == 403
+        # Headers are decoded as latin-1, so a token need not be ASCII
+        assert client.get("/api/admin/profiles",
+                          headers={"X-Admin-Token": "sécret".encode("latin-1")}).status_code == 403
+
+    def test_lists_and_exports_profiles(self, client, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_TOKEN", "secret")
+        headers = {"X-Admin-Token": "secret"}
+        profile = RequestProfile("GET", "/api/game/user/1/stats", "header")
+        profile.duration = 0.2
+        profile.samples[("get_user_stats (game.py:1)", "query (query.py:1)")] = 3
+        profiling.profiler.end(profile, object())
+
+        try:
+            listed = client.get("/api/admin/profiles", headers=headers).json()
+            collapsed = client.get(f"/api/admin/profiles/{profile.id}/collapsed", headers=headers)
+            missing = client.get("/api/admin/profiles/999999", headers=headers)
+        finally:
+            profiling.profiler.clear()
+
+        assert listed[0]["id"] == profile.id
+        assert collapsed.text == "get_user_stats (game.py:1);query (query.py:1) 3\n"
+        assert missing.status_code == 404
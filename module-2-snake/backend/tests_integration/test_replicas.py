@@ -0,0 +1,169 @@
+"""Integration tests for read-replica routing using a primary/replica SQLite file pair"""
+import shutil
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import auth, database, schema
+from app.database import ReplicaRouter, get_db, get_read_db
+from app.db_models import User
+
+
+@pytest.fixture
+def pair(tmp_path):
+    """A migrated primary and a router over one replica copied from it"""
+    primary_path, replica_path = tmp_path / "primary.db", tmp_path / "replica.db"
+    primary = create_engine(f"sqlite:///{primary_path}")
+    schema.upgrade(primary)
+    router = ReplicaRouter(primary, [f"sqlite:///{replica_path}"], max_lag=5)
+
+    def replicate():
+        """Copy the primary over the replica, as a caught-up replica would be"""
+        shutil.copyfile(primary_path, replica_path)
+        router.replicas[0].engine.dispose()
+
+    yield primary, router, replicate
+    primary.dispose()
+    router.replicas[0].engine.dispose()
+
+
+class TestReplicaHealth:
+    """Tests for heartbeat lag measurement and replica selection"""
+
+    def test_caught_up_replica_is_chosen(self, pair):
+        primary, router, replicate = pair
+        router.check()
+        replicate()
+
+        router.check()
+
+        replica = router.replicas[0]
+        assert replica.healthy and replica.lag < 5
+        assert router.choose() is replica
+        assert database.is_replica_session(router.read_session())
+
+    def test_lagging_replica_falls_back_to_primary(self, pair):
+        primary, router, replicate = pair
+        replicate()
+        with router.replicas[0].engine.begin() as conn:
+            conn.execute(text("INSERT INTO replication_heartbeat (id, written_at) VALUES (1, :t)"),
+                         {"t": time.time() - 60})
+
+        router.check()
+
+        assert router.replicas[0].lag > 5
+        assert router.choose() is None
+        assert not database.is_replica_session(router.read_session())
+
+    def test_unreachable_replica_is_unhealthy(self, tmp_path):
+        primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+        schema.upgrade(primary)
+        router = ReplicaRouter(primary, [f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"])
+
+        router.check()
+
+        assert router.describe()[0]["healthy"] is False
+        assert router.describe()[0]["error"] == "OperationalError"
+        assert router.choose() is None
+
+    def test_unchecked_replica_is_not_used(self, pair):
+        _, router, replicate = pair
+        replicate()
+
+        assert router.choose() is None
+
+    def test_replica_sessions_refuse_writes(self, pair):
+        _, router, replicate = pair
+        router.check()
+        replicate()
+        router.check()
+        db = router.read_session()
+
+        db.add(User(username="nope", email="nope@example.com", password_hash="x"))
+        with pytest.raises(RuntimeError, match="read-only"):
+            db.flush()
+        db.close()
+
+
+class TestRouting:
+    """Tests for which engine each dependency hands out"""
+
+    @pytest.fixture
+    def routed_app(self, pair, monkeypatch):
+        primary, router, replicate = pair
+        router.check()
+        replicate()
+        router.check()
+        monkeypatch.setattr(database, "replicas", router)
+        monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=primary))
+        app = FastAPI()
+
+        @app.get("/where")
+        def read_where(db: Session = Depends(get_db)):
+            return {"replica": database.is_replica_session(db)}
+
+        @app.post("/where")
+        def write_where(db: Session = Depends(get_db)):
+            return {"replica": database.is_replica_session(db)}
+
+        @app.post("/report")
+        def report(db: Session = Depends(get_read_db)):
+            return {"replica": database.is_replica_session(db)}
+
+        return TestClient(app)
+
+    def test_get_reads_from_replica_and_post_writes_to_primary(self, routed_app):
+        assert routed_app.get("/where").json() == {"replica": True}
+        assert routed_app.post("/where").json() == {"replica": False}
+
+    def test_explicit_read_dependency_uses_replica(self, routed_app):
+        assert routed_app.post("/report").json() == {"replica": True}
+
+
+class TestReadYourWrites:
+    """Tests for reading a just-created user while replicas lag"""
+
+    def test_user_missing_on_replica_is_loaded_from_primary(self, pair, monkeypatch):
+        primary, router, replicate = pair
+        router.check()
+        replicate()
+        router.check()
+        PrimarySession = sessionmaker(bind=primary)
+        with PrimarySession() as db:
+            user = User(username="fresh", email="fresh@example.com")
+            user.set_password("password123")
+            db.add(user)
+            db.commit()
+            user_id = user.id
+        monkeypatch.setattr(auth, "SessionLocal", PrimarySession)
+
+        with router.read_session() as replica_db:
+            assert replica_db.query(User).filter(User.id == user_id).first() is None
+            loaded = auth._load_user(replica_db, user_id)
+
+        assert loaded.username == "fresh"
+
+    def test_me_after_signup_reads_primary(self, client, tmp_path):
+        signup = client.post("/api/auth/signup", json={
+            "username": "newbie", "email": "newbie@example.com", "password": "password123",
+        })
+        token = signup.json()["access_token"]
+        # Route GETs to a replica that has not received the signup yet
+        stale = create_engine(f"sqlite:///{tmp_path / 'stale.db'}")
+        schema.upgrade(stale)
+        StaleSession = sessionmaker(bind=stale, info={"replica": "stale"})
+
+        def stale_db():
+            with StaleSession() as db:
+                yield db
+
+        client.app.dependency_overrides[get_db] = stale_db
+
+        me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+        assert me.status_code == 200
+        assert me.json()["username"] == "newbie"
@@ -0,0 +1,82 @@
+"""Integration tests for schema versioning and migrations"""
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from app import schema
+from app.database import Base
+from app.db_models import Game, LeaderboardEntryDB, User
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    yield engine
+    engine.dispose()
+
+
+class TestSchemaRevision:
+    """Tests for the pinned revision and the migration scripts"""
+
+    def test_pinned_revision_is_migration_head(self):
+        script = ScriptDirectory.from_config(schema._alembic_config())
+
+        assert script.get_current_head() == schema.SCHEMA_REVISION
+
+    def test_migrations_match_models(self, file_engine):
+        schema.upgrade(file_engine)
+
+        with file_engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+
+        assert diff == []
+
+
+class TestEnsureSchema:
+    """Tests for the boot-time schema check"""
+
+    def test_fresh_database_is_migrated_once(self, file_engine):
+        assert schema.ensure_schema(file_engine, migrate=True) == "upgraded"
+        assert schema.ensure_schema(file_engine, migrate=True) == "current"
+        assert schema.current_revision(file_engine) == schema.SCHEMA_REVISION
+        assert {"users", "games", "leaderboard"} <= set(inspect(file_engine).get_table_names())
+
+    def test_create_all_database_is_adopted(self, file_engine):
+        # The tables the old boot path created
+        Base.metadata.create_all(bind=file_engine,
+                                 tables=[User.__table__, Game.__table__, LeaderboardEntryDB.__table__])
+
+        assert schema.ensure_schema(file_engine, migrate=True) == "upgraded"
+        assert schema.current_revision(file_engine) == schema.SCHEMA_REVISION
+
+    def test_refuses_to_start_behind_without_migrate(self, file_engine):
+        with pytest.raises(RuntimeError, match="python -m app.schema upgrade"):
+            schema.ensure_schema(file_engine, migrate=False)
+
+    def test_newer_schema_is_tolerated(self, file_engine):
+        schema.upgrade(file_engine)
+        with file_engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE alembic_version SET version_num = '9999'")
+
+        assert schema.ensure_schema(file_engine, migrate=False) == "ahead"
+
+
+class TestMigrations:
+    """Tests for data migrations"""
+
+    def test_0004_normalizes_users_unless_taken(self, file_engine):
+        schema.upgrade(file_engine, revision="0003")
+        with file_engine.begin() as conn:
+            for username, email in ((" bob ", "Bob@Example.com"), ("alice", "alice@example.com"),
+                                    ("carol", " ALICE@example.com")):
+                conn.execute(text("INSERT INTO users (username, email, password_hash) VALUES (:u, :e, 'x')"),
+                             {"u": username, "e": email})
+
+        schema.upgrade(file_engine)
+
+        with file_engine.connect() as conn:
+            rows = conn.execute(text("SELECT username, email FROM users ORDER BY id")).all()
+        assert rows == [("bob", "bob@example.com"), ("alice", "alice@example.com"),
+                        ("carol", " ALICE@example.com")]
@@ -0,0 +1,195 @@
+"""Integration tests for hash-sharded games and leaderboard storage (N SQLite files)"""
+import uuid
+from datetime import datetime
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, desc
+
+from app import schema
+from app.arena.manager import persist_results
+from app.arena.room import ArenaResult, Player
+from app.db_models import Game, LeaderboardEntryDB
+from app.player_search import player_index
+from app.sharding import ShardSet, jump_hash, rebalance, shard_metadata
+
+
+def shard_urls(tmp_path, count):
+    return [f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(count)]
+
+
+def migrated(urls):
+    for url in urls:
+        engine = create_engine(url)
+        schema.upgrade(engine, shard=True)
+        engine.dispose()
+    return ShardSet(urls)
+
+
+def add_score(shard_set, user_id, score, mode="walls"):
+    with shard_set.for_user(None, user_id) as db:
+        db.add(LeaderboardEntryDB(id=str(uuid.uuid4()), user_id=user_id, username=f"user{user_id}",
+                                  score=score, mode=mode, timestamp=datetime.utcnow()))
+        db.commit()
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    """Three shard files wired into the routers"""
+    shard_set = migrated(shard_urls(tmp_path, 3))
+    for module in ("app.routers.game", "app.routers.leaderboard", "app.routers.players", "app.arena.manager"):
+        monkeypatch.setattr(f"{module}.shards", shard_set)
+    yield shard_set
+    for engine in shard_set.engines:
+        engine.dispose()
+
+
+class TestJumpHash:
+    """Tests for the shard placement function"""
+
+    def test_in_range_and_stable(self):
+        assert [jump_hash(uid, 4) for uid in range(1, 6)] == [jump_hash(uid, 4) for uid in range(1, 6)]
+        assert all(0 <= jump_hash(uid, 7) < 7 for uid in range(1000))
+
+    def test_adding_a_shard_only_moves_users_onto_it(self):
+        moved = [uid for uid in range(1, 4001) if jump_hash(uid, 3) != jump_hash(uid, 4)]
+
+        assert all(jump_hash(uid, 4) == 3 for uid in moved)
+        assert 0.2 < len(moved) / 4000 < 0.3
+
+
+class TestShardSchema:
+    """Tests for the shard migrations"""
+
+    def test_shard_migrations_match_metadata(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'shard.db'}")
+        schema.upgrade(engine, shard=True)
+
+        with engine.connect() as conn:
+            assert compare_metadata(MigrationContext.configure(conn), shard_metadata) == []
+        assert schema.ensure_schema(engine, migrate=False, shard=True) == "current"
+
+
+class TestScatterGather:
+    """Tests for the k-way merged top-N"""
+
+    def test_top_matches_global_order(self, tmp_path):
+        shard_set = migrated(shard_urls(tmp_path, 3))
+        scores = {user_id: [(user_id * 37) % 101, (user_id * 53) % 97] for user_id in range(1, 31)}
+        for user_id, user_scores in scores.items():
+            for score in user_scores:
+                add_score(shard_set, user_id, score)
+
+        top = shard_set.top(None, lambda s: s.query(LeaderboardEntryDB).order_by(
+            desc(LeaderboardEntryDB.score)), 10)
+
+        expected = sorted((s for user_scores in scores.values() for s in user_scores), reverse=True)[:10]
+        assert [entry.score for entry in top] == expected
+        assert len({shard_set.shard_for(uid) for uid in scores}) == 3
+
+    def test_disabled_shard_set_uses_the_given_session(self, test_db):
+        shard_set = ShardSet([])
+
+        with shard_set.for_user(test_db, 1) as db:
+            assert db is test_db
+
+
+class TestShardedEndpoints:
+    """Tests for the routers with sharding enabled"""
+
+    def test_scores_land_on_the_users_shard_and_merge(self, client, sharded, test_user, second_user,
+                                                      auth_headers):
+        second_headers = {"Authorization": f"Bearer {second_user['token']}"}
+        for score, headers in [(50, auth_headers), (300, second_headers), (200, auth_headers)]:
+            assert client.post("/api/leaderboard", headers=headers,
+                               json={"score": score, "mode": "walls"}).status_code == 201
+
+        top = client.get("/api/leaderboard/top").json()
+        mine = client.get(f"/api/leaderboard/user/{test_user['id']}").json()
+
+        assert [e["score"] for e in top] == [300, 200, 50]
+        assert [e["score"] for e in mine] == [200, 50]
+        with sharded.for_user(None, test_user["id"]) as db:
+            assert db.query(LeaderboardEntryDB).filter_by(user_id=test_user["id"]).count() == 2
+
+    def test_player_search_reads_best_scores_from_each_shard(self, client, sharded, test_user, second_user,
+                                                              auth_headers):
+        second_headers = {"Authorization": f"Bearer {second_user['token']}"}
+        for score, headers in [(70, auth_headers), (30, second_headers)]:
+            client.post("/api/leaderboard", headers=headers, json={"score": score, "mode": "walls"})
+        player_index.reset()
+
+        results = client.get("/api/players/search", params={"q": "s"}).json()
+        results += client.get("/api/players/search", params={"q": "t"}).json()
+
+        assert {r["username"]: r["best_score"] for r in results} == {"seconduser": 30, "testuser": 70}
+
+    def test_game_lifecycle_and_stats(self, client, sharded, test_user, auth_headers):
+        game_id = client.post("/api/game/start", headers=auth_headers).json()["id"]
+        active = client.get("/api/game/active").json()
+        ended = client.post(f"/api/game/{game_id}/end", headers=auth_headers,
+                            json={"score": 120, "duration": 30})
+        stats = client.get(f"/api/game/user/{test_user['id']}/stats").json()
+        board = client.get("/api/game/leaderboard").json()
+
+        assert [g["username"] for g in active] == ["testuser"]
+        assert ended.status_code == 200
+        assert stats["games_played"] == 1 and stats["high_score"] == 120
+        assert board[0]["username"] == "testuser"
+        with sharded.for_user(None, test_user["id"]) as db:
+            assert db.query(Game).count() == 1
+
+    def test_arena_results_are_written_to_each_players_shard(self, sharded):
+        ended = datetime(2025, 1, 1, 12, 0)
+        results = []
+        for user_id in range(1, 7):
+            player = Player(user_id, f"user{user_id}")
+            player.started_at = ended
+            results.append(ArenaResult(player, "walls", user_id * 10, ended))
+
+        persist_results(results)
+
+        for user_id in range(1, 7):
+            with sharded.for_user(None, user_id) as db:
+                assert db.query(Game).filter_by(user_id=user_id).one().score == user_id * 10
+                assert db.query(LeaderboardEntryDB).filter_by(user_id=user_id).count() == 1
+
+
+class TestRebalance:
+    """Tests for moving users after the shard list changes"""
+
+    def test_rebalance_onto_added_shard(self, tmp_path):
+        urls = shard_urls(tmp_path, 3)
+        old = migrated(urls[:2])
+        for user_id in range(1, 41):
+            add_score(old, user_id, user_id)
+            with old.for_user(None, user_id) as db:
+                db.add(Game(user_id=user_id, score=user_id, is_active=False))
+                db.commit()
+        migrated(urls[2:])
+
+        moved = rebalance(urls[:2], urls, log=lambda line: None)
+        again = rebalance(urls[:2], urls, log=lambda line: None)
+
+        new = ShardSet(urls)
+        assert sum(moved.values()) > 0 and again == {}
+        assert all(target == urls[2] for _, target in moved)
+        for user_id in range(1, 41):
+            with new.for_user(None, user_id) as db:
+                assert db.query(LeaderboardEntryDB).filter_by(user_id=user_id).count() == 1
+                assert db.query(Game).filter_by(user_id=user_id).one().score == user_id
+        total = sum(len(rows) for rows in new.scatter(lambda s: s.query(LeaderboardEntryDB).all()))
+        assert total == 40
+
+    def test_dry_run_moves_nothing(self, tmp_path):
+        urls = shard_urls(tmp_path, 3)
+        old = migrated(urls[:2])
+        for user_id in range(1, 21):
+            add_score(old, user_id, user_id)
+        migrated(urls[2:])
+
+        planned = rebalance(urls[:2], urls, dry_run=True, log=lambda line: None)
+
+        assert sum(planned.values()) > 0
+        assert rebalance(urls[:2], urls, dry_run=True, log=lambda line: None) == planned
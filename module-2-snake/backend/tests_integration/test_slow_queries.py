@@ -0,0 +1,90 @@
+"""Integration tests for the slow-query log and its admin endpoints"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import auth
+from app.slow_queries import SlowQueryLog, fingerprint, params_shape, slow_query_log
+from tests_integration.conftest import engine as test_engine
+
+
+@pytest.fixture(scope="module")
+def logged_test_engine():
+    """The app's log only listens to the production engine; tests use their own"""
+    slow_query_log.attach(test_engine)
+    return test_engine
+
+
+class TestFingerprint:
+    """Tests for SQL normalisation"""
+
+    def test_literals_and_params_collapse(self):
+        a = fingerprint("SELECT * FROM games WHERE user_id = 7 AND mode = 'walls'")
+        b = fingerprint("SELECT *\n  FROM games WHERE user_id = 12 AND mode = 'pass-through'")
+        c = fingerprint("SELECT * FROM games WHERE user_id = :user_id_1 AND mode = :mode_1")
+
+        assert a == b == c == "SELECT * FROM games WHERE user_id = ? AND mode = ?"
+
+    def test_in_lists_collapse(self):
+        assert fingerprint("SELECT id FROM users WHERE id IN (1, 2, 3)") == \
+            fingerprint("SELECT id FROM users WHERE id IN (?, ?)")
+
+    def test_params_shape_hides_values(self):
+        assert params_shape((3, "walls"), False) == "(int, str)"
+        assert params_shape({"score": 10}, False) == "{score: int}"
+        assert params_shape([(1,), (2,)], True) == "2 x (int)"
+
+
+class TestSlowQueryLog:
+    """Tests for recording, aggregation and EXPLAIN capture"""
+
+    def test_records_and_explains_slow_statements(self, tmp_path):
+        log = SlowQueryLog(threshold_ms=0, keep=10)
+        # A file database, so the EXPLAIN worker's own connection sees the table
+        engine = log.attach(create_engine(f"sqlite:///{tmp_path / 'slow.db'}"))
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE games (id INTEGER PRIMARY KEY, score INTEGER)"))
+        with engine.connect() as conn:
+            for score in (5, 9):
+                conn.execute(text("SELECT id FROM games WHERE score > :s ORDER BY score DESC"),
+                             {"s": score})
+        log.wait_for_plans()
+
+        stats = {entry["fingerprint"]: entry for entry in log.stats()}
+        select = stats["SELECT id FROM games WHERE score > ? ORDER BY score DESC"]
+        assert select["count"] == 2
+        assert select["routes"] == {"-": 2}
+        assert select["p50_ms"] <= select["p99_ms"] <= select["max_ms"]
+        assert any("SCAN" in line for line in select["plan"])
+        assert any("TEMP B-TREE" in line for line in select["plan"])
+        assert stats["CREATE TABLE games (id INTEGER PRIMARY KEY, score INTEGER)"]["plan"] is None
+        assert log.recent[-1]["params"] == "(int)"
+
+    def test_fast_statements_are_ignored(self):
+        log = SlowQueryLog(threshold_ms=10_000)
+        engine = log.attach(create_engine("sqlite://"))
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        assert log.stats() == []
+
+
+class TestAdminSlowQueries:
+    """Tests for GET /api/admin/slow-queries"""
+
+    def test_requires_admin_token(self, client, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_TOKEN", "secret")
+
+        assert client.get("/api/admin/slow-queries").status_code == 403
+
+    def test_reports_calling_route(self, client, test_user, logged_test_engine, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_TOKEN", "secret")
+        monkeypatch.setattr(slow_query_log, "threshold", 0.0)
+        slow_query_log.clear()
+        try:
+            client.get("/api/leaderboard/top")
+            stats = client.get("/api/admin/slow-queries", headers={"X-Admin-Token": "secret"}).json()
+        finally:
+            slow_query_log.clear()
+
+        routes = {route for entry in stats for route in entry["routes"]}
+        assert "/api/leaderboard/top" in routes